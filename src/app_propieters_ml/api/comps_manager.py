@@ -0,0 +1,171 @@
+from src.app_propieters_ml.ml.comps_index import CompsIndex, METADATA_FILE, fetch_comps_rows
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+
+import threading
+import logging
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: sem flock, o processo sempre grava (uso local, com um único worker)
+    fcntl = None
+
+# Crie uma instância do logger para este módulo
+logger = logging.getLogger(__name__)
+
+# Arquivo de trava, no diretório do índice, que elege o processo que grava o índice em disco
+WRITER_LOCK_FILE = ".writer.lock"
+
+
+class CompsIndexManager:
+    """
+    Mantém o índice de comparáveis servido pela API.
+
+    Na subida, carrega o índice do disco (ou cria a partir do banco, se ainda não existir)
+    e busca no banco os imóveis coletados ou atualizados depois da última sincronização.
+    Os jobs de coleta chamam `add_rows` com os imóveis salvos, então o índice do worker que
+    executou a coleta é atualizado na hora; os demais workers sincronizam a cada
+    `sync_interval` segundos.
+
+    Todos os workers mantêm o índice em memória, mas só um grava em disco: o que obtém a
+    trava exclusiva (flock) de WRITER_LOCK_FILE. Se ele parar, outro assume na próxima gravação.
+
+    Args:
+        session_factory (callable): Cria sessões do SQLAlchemy (ex: SessionLocal).
+        path (str): Diretório do índice em disco.
+        sync_interval (float): Intervalo, em segundos, entre as sincronizações com o banco (0 desativa).
+        lag_seconds (float): Janela relida antes do watermark a cada sincronização. O updated_at de
+                             um upsert é o início da transação, então um commit que chega depois da
+                             sincronização anterior pode ter updated_at menor que o watermark.
+    """
+
+    def __init__(self, session_factory, path: str, sync_interval: float = 300.0, lag_seconds: float = 900.0):
+        self.session_factory = session_factory
+        self.path = path
+        self.sync_interval = sync_interval
+        self.lag_seconds = lag_seconds
+
+        self.index = None
+        self.last_error = None
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._write_lock = threading.Lock()
+        self._writer_file = None
+
+    @property
+    def ready(self) -> bool:
+        return self.index is not None
+
+    def load(self):
+        """
+        Carrega o índice do disco, ou cria a partir do banco quando não há índice gravado.
+        """
+        if (Path(self.path) / METADATA_FILE).exists():
+            self.index = CompsIndex.load(self.path)
+        else:
+            synced_at = datetime.now(timezone.utc)
+            with self.session_factory() as session:
+                index = CompsIndex.build(fetch_comps_rows(session))
+            index.synced_at = synced_at.isoformat()
+            self.index = index
+            with self._write_lock:
+                self._save()
+
+    def _is_writer(self) -> bool:
+        # Tenta obter a trava sem bloquear; quem a obtém a mantém até o stop
+        if self._writer_file is not None or fcntl is None:
+            return True
+        root = Path(self.path)
+        root.mkdir(parents=True, exist_ok=True)
+        file = open(root / WRITER_LOCK_FILE, "a")
+        try:
+            fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            file.close()
+            return False
+        self._writer_file = file
+        logger.info(f"Este processo grava o índice de comparáveis em '{root}'.")
+        return True
+
+    def _save(self, keys: set = None):
+        # Chamado com _write_lock; nos demais processos o índice fica só em memória
+        if self._is_writer():
+            self.index.save(self.path, keys)
+
+    def sync(self) -> int:
+        """
+        Aplica ao índice os imóveis atualizados desde o watermark (maior updated_at já aplicado),
+        menos `lag_seconds`. As linhas relidas na janela sem alteração são ignoradas pelo `upsert`.
+
+        Sem watermark (índice gravado por uma versão anterior), lê a tabela inteira uma vez.
+
+        Returns:
+            int: Quantidade de imóveis lidos do banco.
+        """
+        synced_at = datetime.now(timezone.utc)
+        since = None
+        if self.index.watermark:
+            since = datetime.fromisoformat(self.index.watermark) - timedelta(seconds=self.lag_seconds)
+        with self.session_factory() as session:
+            rows = fetch_comps_rows(session, since)
+
+        with self._write_lock:
+            touched = self.index.upsert(rows)
+            self.index.synced_at = synced_at.isoformat()
+            self._save(touched)
+        if touched:
+            logger.info(f"Índice de comparáveis sincronizado: {len(rows)} imóveis lidos, {len(touched)} partições alteradas.")
+        return len(rows)
+
+    def add_rows(self, rows: list):
+        """
+        Atualiza o índice com imóveis recém-salvos no banco (chamado pelos jobs de coleta).
+        """
+        if self.index is None or not rows:
+            return
+        with self._write_lock:
+            touched = self.index.upsert(rows)
+            self._save(touched)
+
+    def query(self, queries: list, k: int, neighborhood_weight: float) -> list:
+        return self.index.query(queries, k=k, neighborhood_weight=neighborhood_weight)
+
+    def _watch(self):
+        while not self._stop_event.wait(self.sync_interval):
+            try:
+                self.sync()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"Falha ao sincronizar o índice de comparáveis: {e}")
+
+    def start(self):
+        """
+        Inicia a thread de sincronização periódica com o banco.
+        """
+        if self.sync_interval <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._watch, name="comps-index-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._thread = None
+        if self._writer_file is not None:
+            # Fechar o arquivo libera a trava para outro processo
+            self._writer_file.close()
+            self._writer_file = None
+
+    def status(self) -> dict:
+        return {
+            "ready": self.ready,
+            "path": self.path,
+            **(self.index.stats() if self.index is not None else {}),
+            "sync_interval_seconds": self.sync_interval,
+            "syncing": self._thread is not None and self._thread.is_alive(),
+            "last_error": self.last_error,
+        }
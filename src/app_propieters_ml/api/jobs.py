@@ -0,0 +1,445 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from datetime import datetime, timezone, timedelta
+from sqlalchemy import select, update, or_
+
+from src.app_propieters_ml.models.scrape_job_model import ScrapeJob
+from src.app_propieters_ml.core import property_repository, crawl_state
+from src.app_propieters_ml.core.metrics import SCRAPER_ROWS
+
+import threading
+import logging
+import socket
+import uuid
+import os
+
+# Crie uma instância do logger para este módulo
+logger = logging.getLogger(__name__)
+
+# Estados de um job de coleta
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+FINISHED_STATUSES = {JOB_SUCCEEDED, JOB_FAILED, JOB_CANCELLED}
+
+scrape_jobs_table = ScrapeJob.__table__
+
+
+def _job_to_dict(row) -> dict:
+    return {column.name: row[column.name] for column in scrape_jobs_table.columns}
+
+
+class ScrapeJobManager:
+    """
+    Fila de jobs de coleta executados em segundo plano, com estado salvo no banco.
+
+    O endpoint de coleta só registra o job e devolve o seu id; um pool de
+    `max_concurrent` threads executa os jobs na ordem de chegada, o que limita
+    quantos scrapings (e navegadores) rodam ao mesmo tempo.
+
+    Cada página coletada é salva no banco assim que chega, em blocos de `chunk_size`
+    linhas com uma transação por bloco, e o progresso (páginas, anúncios, linhas
+    salvas e a última página concluída) é gravado na tabela `scrape_jobs`. Jobs que
+    estavam na fila quando a aplicação parou são executados na próxima subida, e jobs
+    com falha podem ser retomados; em ambos os casos a coleta recomeça na página
+    seguinte ao checkpoint.
+
+    Vários processos (workers do uvicorn) podem compartilhar a tabela. Um job só é
+    executado por quem o reivindica com um UPDATE condicional (status 'queued' -> 'running'),
+    e o dono renova um lease (`lease_until`) a cada `lease_seconds / 3` segundos. Jobs
+    'running' com o lease vencido, de um processo que morreu, voltam para a fila.
+
+    No início de cada job é carregado um índice dos imóveis já salvos (id -> hash do
+    conteúdo): anúncios conhecidos e sem alteração não são gravados de novo. No modo
+    `new_only`, a coleta para na primeira página em que pelo menos `known_ratio` dos
+    anúncios já são conhecidos. A última página alcançada por tipo de imóvel fica na
+    tabela `crawl_state`, e um job pode continuar de onde a coleta anterior do tipo parou.
+
+    Args:
+        session_factory (callable): Cria sessões do SQLAlchemy (ex: SessionLocal).
+        scrape_func (callable): Executa a coleta de um job. Recebe o job (dict), um
+                                threading.Event de cancelamento, a página inicial e o
+                                limite de anúncios restante, e gera tuplas (página, imóveis validados).
+        max_concurrent (int): Quantidade máxima de jobs executando ao mesmo tempo.
+        max_queued (int): Quantidade máxima de jobs aguardando na fila.
+        chunk_size (int): Quantidade máxima de linhas por transação de upsert.
+        known_ratio (float): Fração de anúncios conhecidos em uma página que encerra um job `new_only`.
+        on_saved (callable): Chamado com os imóveis de cada página depois de salvos (ex: índice de comparáveis).
+        lease_seconds (float): Validade do lease de um job em execução sem renovação.
+    """
+
+    def __init__(self, session_factory, scrape_func, max_concurrent: int = 1, max_queued: int = 10, chunk_size: int = 500,
+                 known_ratio: float = 0.8, on_saved=None, lease_seconds: float = 60.0):
+        self.session_factory = session_factory
+        self.scrape_func = scrape_func
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.chunk_size = chunk_size
+        self.known_ratio = known_ratio
+        self.on_saved = on_saved
+        self.lease_seconds = lease_seconds
+        # Identifica este processo como dono dos jobs que ele executa
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._executor = None
+        self._shutting_down = False
+        self._cancel_events = {}
+        self._running = set()
+        self._lock = threading.Lock()
+        self._heartbeat_stop = threading.Event()
+        self._heartbeat_thread = None
+
+    def _notify_saved(self, job_id: str, properties: list):
+        # Uma falha de quem observa os imóveis salvos não interrompe a coleta
+        try:
+            self.on_saved(properties)
+        except Exception as e:
+            logger.error(f"Job de coleta {job_id}: falha ao repassar os imóveis salvos: {e}", exc_info=True)
+
+    def _update(self, job_id: str, **values):
+        with self.session_factory() as session:
+            session.execute(update(scrape_jobs_table).where(scrape_jobs_table.c.id == job_id).values(**values))
+            session.commit()
+
+    def _update_owned(self, job_id: str, **values) -> bool:
+        # Atualiza o job somente enquanto este processo é o dono do lease
+        with self.session_factory() as session:
+            result = session.execute(
+                update(scrape_jobs_table)
+                .where(scrape_jobs_table.c.id == job_id, scrape_jobs_table.c.lease_owner == self.owner)
+                .values(**values)
+            )
+            session.commit()
+        return result.rowcount == 1
+
+    def _lease_until(self) -> datetime:
+        return datetime.now(timezone.utc) + timedelta(seconds=self.lease_seconds)
+
+    def _claim(self, job_id: str) -> bool:
+        """
+        Reivindica um job da fila com um único UPDATE condicional: de vários processos
+        que tentam ao mesmo tempo, só um altera a linha.
+        """
+        with self.session_factory() as session:
+            result = session.execute(
+                update(scrape_jobs_table)
+                .where(scrape_jobs_table.c.id == job_id, scrape_jobs_table.c.status == JOB_QUEUED)
+                .values(status=JOB_RUNNING, started_at=datetime.now(timezone.utc), error=None,
+                        lease_owner=self.owner, lease_until=self._lease_until())
+            )
+            session.commit()
+        return result.rowcount == 1
+
+    def _requeue_expired(self) -> list:
+        """
+        Devolve à fila os jobs 'running' cujo lease venceu (o processo dono parou sem finalizá-los).
+
+        Returns:
+            list: Ids dos jobs devolvidos à fila por esta chamada.
+        """
+        expired = or_(scrape_jobs_table.c.lease_until.is_(None), scrape_jobs_table.c.lease_until < datetime.now(timezone.utc))
+        requeued = []
+        with self.session_factory() as session:
+            candidates = session.execute(
+                select(scrape_jobs_table.c.id)
+                .where(scrape_jobs_table.c.status == JOB_RUNNING, expired)
+                .order_by(scrape_jobs_table.c.created_at)
+            ).scalars().all()
+            for job_id in candidates:
+                # Repete a condição no UPDATE: outro processo pode ter devolvido o job ou renovado o lease
+                result = session.execute(
+                    update(scrape_jobs_table)
+                    .where(scrape_jobs_table.c.id == job_id, scrape_jobs_table.c.status == JOB_RUNNING, expired)
+                    .values(status=JOB_QUEUED, lease_owner=None, lease_until=None)
+                )
+                if result.rowcount == 1:
+                    requeued.append(job_id)
+            session.commit()
+        if requeued:
+            logger.info(f"{len(requeued)} jobs de coleta com lease vencido voltaram para a fila.")
+        return requeued
+
+    def _heartbeat(self):
+        # Renova o lease dos jobs deste processo e recupera os jobs de processos que morreram
+        while not self._heartbeat_stop.wait(self.lease_seconds / 3):
+            try:
+                with self._lock:
+                    running = list(self._running)
+                if running:
+                    with self.session_factory() as session:
+                        session.execute(
+                            update(scrape_jobs_table)
+                            .where(scrape_jobs_table.c.id.in_(running), scrape_jobs_table.c.lease_owner == self.owner)
+                            .values(lease_until=self._lease_until())
+                        )
+                        session.commit()
+                for job_id in self._requeue_expired():
+                    self._enqueue(job_id)
+            except Exception as e:
+                logger.error(f"Falha ao renovar o lease dos jobs de coleta: {e}")
+
+    def _enqueue(self, job_id: str):
+        with self._lock:
+            self._cancel_events.setdefault(job_id, threading.Event())
+        self._executor.submit(self._run, job_id)
+
+    def start(self):
+        """
+        Cria o pool de execução, coloca nele os jobs que aguardam na fila e devolve à fila
+        os jobs cujo processo parou durante a execução (lease vencido).
+
+        Jobs 'running' com lease válido pertencem a outro processo vivo e não são tocados.
+        """
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix="scrape-job")
+
+        requeued = self._requeue_expired()
+        with self.session_factory() as session:
+            queued = session.execute(
+                select(scrape_jobs_table.c.id)
+                .where(scrape_jobs_table.c.status == JOB_QUEUED)
+                .order_by(scrape_jobs_table.c.created_at)
+            ).scalars().all()
+
+        # Outros processos podem enfileirar os mesmos jobs: só quem vencer o _claim executa
+        for job_id in queued:
+            self._enqueue(job_id)
+        if queued:
+            logger.info(f"{len(queued)} jobs de coleta na fila ({len(requeued)} interrompidos).")
+
+        self._heartbeat_stop.clear()
+        self._heartbeat_thread = threading.Thread(target=self._heartbeat, name="scrape-job-lease", daemon=True)
+        self._heartbeat_thread.start()
+
+    def stop(self):
+        """
+        Sinaliza o cancelamento dos jobs em execução e encerra o pool sem esperar.
+
+        Os jobs interrompidos voltam para 'queued' e são retomados na próxima subida.
+        """
+        self._shutting_down = True
+        self._heartbeat_stop.set()
+        with self._lock:
+            events = list(self._cancel_events.values())
+        for event in events:
+            event.set()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, tipo: str, amostras_limit: int, workers: int = 1, new_only: bool = False,
+               continue_crawl: bool = False) -> dict:
+        """
+        Registra um novo job de coleta e o coloca na fila.
+
+        Args:
+            tipo (str): Tipo de imóvel a coletar.
+            amostras_limit (int): Número máximo de anúncios a coletar.
+            workers (int): Quantidade de navegadores em paralelo.
+            new_only (bool): Para a coleta assim que uma página vier quase toda com anúncios conhecidos.
+            continue_crawl (bool): Começa na página seguinte à última alcançada pela coleta anterior do tipo.
+
+        Raises:
+            OverflowError: Se a fila já tem `max_queued` jobs aguardando.
+        """
+        with self.session_factory() as session:
+            queued = session.execute(
+                select(scrape_jobs_table.c.id).where(scrape_jobs_table.c.status == JOB_QUEUED)
+            ).all()
+            if len(queued) >= self.max_queued:
+                raise OverflowError(f"A fila de coleta já tem {len(queued)} jobs aguardando.")
+
+            # Continuar a coleta anterior equivale a um checkpoint na última página alcançada
+            start_checkpoint = 0
+            if continue_crawl:
+                state = crawl_state.get_crawl_state(session, tipo)
+                start_checkpoint = state["last_page"] if state is not None else 0
+
+            job_id = uuid.uuid4().hex
+            session.execute(scrape_jobs_table.insert().values(
+                id=job_id,
+                status=JOB_QUEUED,
+                property_type=tipo,
+                amostras_limit=amostras_limit,
+                workers=workers,
+                pages_done=0,
+                ads_collected=0,
+                rows_upserted=0,
+                ads_skipped=0,
+                last_page=start_checkpoint,
+                new_only=new_only,
+            ))
+            session.commit()
+
+        self._enqueue(job_id)
+        logger.info(f"Job de coleta {job_id} criado: {amostras_limit} amostras de '{tipo}'.")
+        return self.get(job_id)
+
+    def get(self, job_id: str):
+        with self.session_factory() as session:
+            row = session.execute(
+                select(scrape_jobs_table).where(scrape_jobs_table.c.id == job_id)
+            ).mappings().first()
+        return _job_to_dict(row) if row is not None else None
+
+    def list(self, limit: int = 50) -> list:
+        with self.session_factory() as session:
+            rows = session.execute(
+                select(scrape_jobs_table).order_by(scrape_jobs_table.c.created_at.desc()).limit(limit)
+            ).mappings().all()
+        return [_job_to_dict(row) for row in rows]
+
+    def cancel(self, job_id: str):
+        """
+        Cancela um job. Jobs na fila são cancelados na hora; jobs em execução param na
+        próxima página e salvam o que já foi coletado.
+
+        Returns:
+            dict | None: O job atualizado, ou None se ele não existe.
+        """
+        job = self.get(job_id)
+        if job is None or job["status"] in FINISHED_STATUSES:
+            return job
+
+        with self._lock:
+            event = self._cancel_events.get(job_id)
+        if event is not None:
+            event.set()
+
+        if job["status"] == JOB_QUEUED:
+            # Condicional: um job reivindicado neste meio tempo já está em execução e não é sobrescrito
+            with self.session_factory() as session:
+                session.execute(
+                    update(scrape_jobs_table)
+                    .where(scrape_jobs_table.c.id == job_id, scrape_jobs_table.c.status == JOB_QUEUED)
+                    .values(status=JOB_CANCELLED, finished_at=datetime.now(timezone.utc))
+                )
+                session.commit()
+        return self.get(job_id)
+
+    def resume(self, job_id: str):
+        """
+        Recoloca na fila um job que falhou ou foi cancelado, continuando após a última página concluída.
+
+        Returns:
+            dict | None: O job atualizado, ou None se ele não existe.
+
+        Raises:
+            ValueError: Se o job ainda está na fila, em execução ou já foi concluído com sucesso.
+        """
+        job = self.get(job_id)
+        if job is None:
+            return None
+        if job["status"] not in (JOB_FAILED, JOB_CANCELLED):
+            raise ValueError(f"Somente jobs com falha ou cancelados podem ser retomados (status atual: '{job['status']}').")
+
+        self._update(job_id, status=JOB_QUEUED, finished_at=None)
+        self._enqueue(job_id)
+        logger.info(f"Job de coleta {job_id} retomado a partir da página {job['last_page'] + 1}.")
+        return self.get(job_id)
+
+    def _save_crawl_state(self, job: dict, max_page: int, changed: int):
+        # Jobs new_only só percorrem as primeiras páginas e não substituem a página alcançada pela coleta completa
+        last_page = None if job["new_only"] else max_page
+        try:
+            with self.session_factory() as session:
+                crawl_state.save_crawl_state(session, job["property_type"], last_page, changed)
+                session.commit()
+        except Exception as e:
+            logger.warning(f"Não foi possível gravar o estado da coleta de '{job['property_type']}': {e}")
+
+    def _run(self, job_id: str):
+        with self._lock:
+            stop_event = self._cancel_events.setdefault(job_id, threading.Event())
+
+        claimed = False
+        try:
+            # O job pode ter sido cancelado enquanto aguardava na fila, ou reivindicado por outro processo
+            if stop_event.is_set() or not self._claim(job_id):
+                return
+            claimed = True
+            with self._lock:
+                self._running.add(job_id)
+            job = self.get(job_id)
+
+            # Retomada: começa na página seguinte ao checkpoint e coleta somente o que falta
+            start_page = job["last_page"] + 1
+            remaining = job["amostras_limit"] - job["ads_collected"]
+            logger.info(f"Job de coleta {job_id} iniciado na página {start_page}.")
+
+            pages_done = job["pages_done"]
+            ads_collected = job["ads_collected"]
+            rows_upserted = job["rows_upserted"]
+            ads_skipped = job["ads_skipped"]
+            last_page = job["last_page"]
+            max_page = last_page # -> Página mais distante alcançada, gravada no crawl_state
+            completed_pages = set()
+            # Parada do modo new_only: ao sair do bloco, a coleta paralela sinaliza stop_event para
+            # encerrar os seus workers, então o status não pode ser decidido só pelo evento
+            stopped_early = False
+            # Outro processo assumiu o job (lease vencido): este para sem gravar o status
+            lost_lease = False
+
+            try:
+                # Índice dos imóveis já salvos, para não regravar anúncios sem alteração
+                with self.session_factory() as session:
+                    known_index = crawl_state.KnownPropertyIndex.load(session)
+
+                if remaining > 0:
+                    with closing(self.scrape_func(job, stop_event, start_page, remaining)) as pages:
+                        for page, properties in pages:
+                            changed, known = known_index.split(properties)
+
+                            # Cada página é salva antes da próxima ser coletada
+                            rows_upserted += property_repository.upsert_in_chunks(self.session_factory, changed, self.chunk_size)
+                            known_index.add(changed)
+                            if self.on_saved is not None and changed:
+                                self._notify_saved(job_id, changed)
+                            pages_done += 1
+                            ads_collected += len(properties)
+                            ads_skipped += len(properties) - len(changed)
+                            SCRAPER_ROWS.inc(len(properties) - len(changed), outcome="unchanged")
+                            max_page = max(max_page, page)
+
+                            # O checkpoint só avança sobre páginas consecutivas (no modo paralelo elas chegam fora de ordem)
+                            completed_pages.add(page)
+                            while last_page + 1 in completed_pages:
+                                last_page += 1
+                                completed_pages.discard(last_page)
+
+                            if not self._update_owned(job_id, pages_done=pages_done, ads_collected=ads_collected,
+                                                      rows_upserted=rows_upserted, ads_skipped=ads_skipped, last_page=last_page):
+                                logger.warning(f"Job de coleta {job_id}: o lease passou para outro processo. Encerrando aqui.")
+                                lost_lease = True
+                                break
+
+                            # Modo somente novos: uma página quase toda conhecida indica que os anúncios novos acabaram
+                            if job["new_only"] and properties and known / len(properties) >= self.known_ratio:
+                                logger.info(f"Job de coleta {job_id}: página {page} com {known}/{len(properties)} anúncios conhecidos. Encerrando.")
+                                stopped_early = True
+                                break
+
+                if lost_lease:
+                    return
+                if stopped_early or not stop_event.is_set():
+                    status = JOB_SUCCEEDED
+                elif self._shutting_down:
+                    # Interrompido pela parada da aplicação: volta para a fila e continua na próxima subida
+                    status = JOB_QUEUED
+                else:
+                    status = JOB_CANCELLED
+                self._update_owned(job_id, status=status, finished_at=None if status == JOB_QUEUED else datetime.now(timezone.utc),
+                                   lease_owner=None, lease_until=None)
+                logger.info(f"Job de coleta {job_id} finalizado ({status}): {rows_upserted} imóveis salvos, {ads_skipped} sem alteração.")
+            except Exception as e:
+                logger.error(f"Job de coleta {job_id} falhou na página {last_page + 1}: {e}", exc_info=True)
+                self._update_owned(job_id, status=JOB_FAILED, error=str(e), finished_at=datetime.now(timezone.utc),
+                                   lease_owner=None, lease_until=None)
+
+            self._save_crawl_state(job, max_page, rows_upserted)
+        finally:
+            with self._lock:
+                # Uma cópia do job que perdeu o _claim não remove o evento da execução em andamento
+                if claimed or job_id not in self._running:
+                    self._cancel_events.pop(job_id, None)
+                    self._running.discard(job_id)
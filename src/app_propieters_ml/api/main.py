@@ -1,22 +1,46 @@
-from fastapi import FastAPI, Depends, HTTPException, Query, Request
+from src.app_propieters_ml.core.startup import STARTUP_REPORT, lazy_import
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response, Security
 from fastapi.concurrency import run_in_threadpool
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
-from sqlalchemy.orm import Session
-from sqlalchemy.dialects.postgresql import insert
-from typing import List, Literal
-from functools import partial
-
-from src.app_propieters_ml.core.database import SessionLocal, engine
-from src.app_propieters_ml.scraper.scraping_zap_data_property import main_scraping_ad_and_url
-from src.app_propieters_ml.models import property_model
-from src.app_propieters_ml.api.security import get_api_key
-from src.app_propieters_ml.schemas import property_schema, prediction_model_schema
-
-import numpy as np
+from fastapi.responses import HTMLResponse, StreamingResponse, PlainTextResponse
+from typing import List, Literal, Optional
+from datetime import date
+from contextlib import asynccontextmanager
+
+from src.app_propieters_ml.core.metrics import REGISTRY, TimingMiddleware, span
+from src.app_propieters_ml.core.profiler import SamplingProfiler
+from src.app_propieters_ml.scraper.driver_pool import WebDriverPool
+from src.app_propieters_ml.api.security import get_api_key, optional_api_key_header
+from src.app_propieters_ml.schemas import property_schema, prediction_model_schema, scrape_job_schema, property_summary_schema, comps_schema
+from src.app_propieters_ml.api.prediction_batcher import PredictionBatcher
+from src.app_propieters_ml.api.prediction_cache import PredictionCache
+from src.app_propieters_ml.api.model_manager import ModelManager
+from src.app_propieters_ml.ml.feature_engineering import PROPERTY_TYPE_CATEGORIES, LEGACY_ARTIFACT_WARNING, FeatureTransformer
+from src.app_propieters_ml.ml.compiled_forest import CompiledForest, METADATA_FILE
+from src.app_propieters_ml.ml.model_registry import ModelRegistry, DEFAULT_REGISTRY_PATH
+from pydantic import ValidationError
+from dotenv import load_dotenv
+
 import logging
 import joblib
+import os
+
+# Camadas pesadas importadas somente quando usadas (SQLAlchemy e drivers do banco na lifespan,
+# Selenium e webdriver-manager no primeiro job de coleta), para o import da API ser rápido e sem efeitos
+database = lazy_import("src.app_propieters_ml.core.database")
+migrations = lazy_import("src.app_propieters_ml.core.migrations")
+property_repository = lazy_import("src.app_propieters_ml.core.property_repository")
+property_summary = lazy_import("src.app_propieters_ml.core.property_summary")
+crawl_state = lazy_import("src.app_propieters_ml.core.crawl_state")
+jobs = lazy_import("src.app_propieters_ml.api.jobs")
+comps = lazy_import("src.app_propieters_ml.api.comps_manager")
+scraping = lazy_import("src.app_propieters_ml.scraper.scraping_zap_data_property")
+scraping_pool = lazy_import("src.app_propieters_ml.scraper.scraping_pool")
+rate_limit = lazy_import("src.app_propieters_ml.scraper.rate_limit")
+
+# Custo das importações da API (FastAPI, pydantic, NumPy, ...)
+STARTUP_REPORT.checkpoint("import api")
 
 # Configurando o logging
 logging.basicConfig(
@@ -28,12 +52,332 @@ logging.basicConfig(
 # Crie uma instância do logger para este módulo
 logger = logging.getLogger(__name__)
 
-# Criação das tabelas no banco de dados, baseado na models do sqlalchemy
-property_model.Base.metadata.create_all(bind=engine)
+# Carregamento das variaveis de ambiente
+load_dotenv()
+
+# Capturando o PATH do modelo treinado
+MODEL_PATH = "./src/app_propieters_ml/ml/models_trained/pred_price_model.joblib"
+# Versão compilada do modelo (arrays NumPy gerados por ml/compiled_forest.py)
+COMPILED_MODEL_PATH = os.getenv("MODEL_COMPILED_PATH", "./src/app_propieters_ml/ml/models_trained/pred_price_model.compiled")
+# MODEL_FORMAT -> "auto" (usa o compilado se existir), "compiled" ou "joblib"
+MODEL_FORMAT = os.getenv("MODEL_FORMAT", "auto")
+# MODEL_MMAP -> mapeia em memória os arrays do modelo compilado: os workers do uvicorn dividem uma única cópia física
+MODEL_MMAP = os.getenv("MODEL_MMAP", "true").lower() in ("1", "true", "yes")
+
+def model_artifact_path():
+    """
+    Retorna o arquivo que identifica a versão do modelo original no formato configurado.
+    """
+    if MODEL_FORMAT == "compiled" or (MODEL_FORMAT == "auto" and os.path.isdir(COMPILED_MODEL_PATH)):
+        return os.path.join(COMPILED_MODEL_PATH, METADATA_FILE)
+    return MODEL_PATH
+
+def load_model():
+    """
+    Carrega o modelo original no formato configurado e retorna o modelo e o arquivo que identifica a sua versão.
+    """
+    artifact = model_artifact_path()
+    if artifact != MODEL_PATH:
+        logger.info(f"Carregando o modelo compilado de '{COMPILED_MODEL_PATH}'.")
+        return CompiledForest.load(COMPILED_MODEL_PATH, mmap=MODEL_MMAP), artifact
+
+    logger.info(f"Carregando o modelo de '{MODEL_PATH}'.")
+    return joblib.load(MODEL_PATH), artifact
+
+# Gerenciador do modelo servido: usa a versão ativa do registro (ml/models_trained/registry)
+# e troca de versão em segundo plano, sem reiniciar o servidor, quando uma nova versão é promovida.
+# Sem versões no registro, serve o modelo original (MODEL_PATH ou COMPILED_MODEL_PATH).
+# Monta a matriz de features sem padronização; a padronização de cada versão é aplicada pelo próprio modelo
+feature_transformer = FeatureTransformer()
+
+model_manager = ModelManager(
+    ModelRegistry(os.getenv("MODEL_REGISTRY_PATH", DEFAULT_REGISTRY_PATH)),
+    fallback_loader=load_model,
+    fallback_artifact=model_artifact_path,
+    warmup_input=feature_transformer.build_row(PROPERTY_TYPE_CATEGORIES[0], 50, 2, 1, 1),
+    poll_interval=float(os.getenv("MODEL_WATCH_INTERVAL_SECONDS", "10")),
+    prefer_compiled=MODEL_FORMAT != "joblib",
+    mmap=MODEL_MMAP,
+)
+
+def model_cache_version(version, model):
+    """
+    Versão do modelo usada pelo cache de predições. Só o nome não basta: o modelo
+    original recarregado do disco continua com o nome "legacy".
+    """
+    return version, id(model)
+
+# Cache LRU das predições, invalidado automaticamente quando o modelo servido muda de versão
+# PREDICT_CACHE_SIZE -> quantidade máxima de entradas (0 desativa); PREDICT_CACHE_TTL_SECONDS -> tempo de vida
+prediction_cache = PredictionCache(
+    max_size=int(os.getenv("PREDICT_CACHE_SIZE", "10000")),
+    ttl_seconds=float(os.getenv("PREDICT_CACHE_TTL_SECONDS", "3600")),
+    version_func=lambda: model_cache_version(*model_manager.get()),
+)
+
+def predict_matrix(input_data):
+    """
+    Executa o modelo ativo sobre uma matriz de features (N, features).
+
+    Versão e modelo são lidos juntos, uma única vez: com uma troca de versão no meio,
+    a versão devolvida continua sendo a do modelo que gerou as predições.
+
+    Returns:
+        tuple: (versão do modelo usado, no formato de model_cache_version; predições)
+    """
+    version, model = model_manager.get()
+    with span("model_predict"):
+        predictions = model.predict(input_data)
+    return model_cache_version(version, model), predictions
+
+def predict_matrix_cached(input_data):
+    """
+    Igual a predict_matrix, mas só envia ao modelo as linhas que não estão no cache.
+
+    Returns:
+        tuple: (versão servida, predições)
+    """
+    version, model = model_manager.get()
+    cache_version = model_cache_version(version, model)
+    predictions, miss_indexes = prediction_cache.get_many(input_data, cache_version)
+
+    if miss_indexes:
+        misses = input_data[miss_indexes]
+        with span("model_predict"):
+            miss_predictions = model.predict(misses)
+        # Não é guardado se o modelo foi trocado enquanto predizíamos
+        prediction_cache.set_many(misses, miss_predictions, cache_version)
+        for index, prediction in zip(miss_indexes, miss_predictions):
+            predictions[index] = prediction
+
+    return version, predictions
 
-# Criando uma instancia do FASTApi e capturando o PATH do modelo treinado
-app = FastAPI(title="API e Web App de predição de valores de imóveis reais", version="1.0.0")
-model = joblib.load("./src/app_propieters_ml/ml/models_trained/pred_price_model.joblib")
+def require_key_for_pinned_version(version: Optional[str], api_key: Optional[str]):
+    """
+    /predict é público, mas fixar uma versão carrega outro modelo em memória: exige a chave de API.
+    """
+    if version is not None:
+        get_api_key(api_key)
+
+def predict_matrix_pinned(input_data, version: str):
+    """
+    Executa uma versão específica do registro (comparação A/B), sem cache nem micro-batching.
+    """
+    try:
+        served_version, pinned_model = model_manager.get(version)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Versão de modelo '{version}' não encontrada.")
+    with span("model_predict"):
+        return served_version, pinned_model.predict(input_data)
+
+# Agrupador de predições individuais concorrentes em lotes (micro-batching)
+# PREDICT_BATCH_WINDOW_MS -> tempo máximo de espera da fila; PREDICT_BATCH_MAX_SIZE -> linhas por lote
+prediction_batcher = PredictionBatcher(
+    predict_matrix,
+    max_wait_ms=float(os.getenv("PREDICT_BATCH_WINDOW_MS", "5")),
+    max_batch_size=int(os.getenv("PREDICT_BATCH_MAX_SIZE", "64")),
+)
+
+# Pool de navegadores do scraper, mantido enquanto a aplicação estiver no ar
+# SCRAPER_DRIVER_POOL_SIZE -> navegadores abertos ao mesmo tempo; SCRAPER_DRIVER_MAX_PAGES -> páginas antes de reciclar
+scraper_driver_pool = WebDriverPool(
+    size=int(os.getenv("SCRAPER_DRIVER_POOL_SIZE", "2")),
+    # O Selenium só é importado quando o primeiro navegador é criado
+    driver_factory=lambda: scraping.build_chrome_driver(),
+    max_pages=int(os.getenv("SCRAPER_DRIVER_MAX_PAGES", "100")),
+)
+
+# Diretório onde o HTML de cada página raspada é salvo para reprocessamento offline (desligado se vazio)
+SCRAPER_SNAPSHOT_DIR = os.getenv("SCRAPER_SNAPSHOT_DIR") or None
+
+def run_scrape_job(job: dict, stop_event, start_page: int, amostras_limit: int):
+    """
+    Executa a coleta de um job página a página: sequencial com 1 worker, ou com vários navegadores em paralelo.
+    """
+    # Ritmo adaptativo das páginas (token bucket + AIMD)
+    # SCRAPER_PAGES_PER_SECOND -> ritmo inicial; SCRAPER_MAX_PAGES_PER_SECOND -> teto alcançado pelo aumento gradual
+    pacer = rate_limit.AdaptivePacer(
+        rate=float(os.getenv("SCRAPER_PAGES_PER_SECOND", "0.2")),
+        max_rate=float(os.getenv("SCRAPER_MAX_PAGES_PER_SECOND", "1.0")),
+    )
+
+    if job["workers"] > 1:
+        pages = scraping_pool.iter_parallel_scraping_pages(
+            tipos=job["property_type"],
+            amostras_limit=amostras_limit,
+            n_workers=job["workers"],
+            pacer=pacer,
+            driver_pool=scraper_driver_pool,
+            snapshot_dir=SCRAPER_SNAPSHOT_DIR,
+            stop_event=stop_event,
+            start_page=start_page,
+        )
+        try:
+            for _, page, rows in pages:
+                yield page, rows
+        finally:
+            pages.close()
+    else:
+        yield from scraping.iter_scraping_pages(
+            tipo=job["property_type"],
+            amostras_limit=amostras_limit,
+            driver_pool=scraper_driver_pool,
+            snapshot_dir=SCRAPER_SNAPSHOT_DIR,
+            stop_event=stop_event,
+            start_page=start_page,
+            pacer=pacer,
+        )
+
+# Fila de jobs de coleta, com estado salvo na tabela scrape_jobs (criada na lifespan, junto com a camada do banco)
+scrape_job_manager = None
+
+def build_scrape_job_manager():
+    """
+    Cria a fila de jobs de coleta sobre a engine síncrona do banco.
+    """
+    # SCRAPE_MAX_CONCURRENT_JOBS -> coletas executando ao mesmo tempo; SCRAPE_MAX_QUEUED_JOBS -> coletas aguardando na fila
+    # SCRAPE_UPSERT_CHUNK_SIZE -> linhas por transação ao salvar cada página
+    return jobs.ScrapeJobManager(
+        database.SessionLocal,
+        run_scrape_job,
+        max_concurrent=int(os.getenv("SCRAPE_MAX_CONCURRENT_JOBS", "1")),
+        max_queued=int(os.getenv("SCRAPE_MAX_QUEUED_JOBS", "10")),
+        chunk_size=int(os.getenv("SCRAPE_UPSERT_CHUNK_SIZE", "500")),
+        # SCRAPE_NEW_ONLY_KNOWN_RATIO -> fração de anúncios conhecidos em uma página que encerra um job new_only
+        known_ratio=float(os.getenv("SCRAPE_NEW_ONLY_KNOWN_RATIO", "0.8")),
+        # Cada página salva também atualiza o índice de comparáveis
+        on_saved=index_saved_properties,
+        # SCRAPE_JOB_LEASE_SECONDS -> tempo sem renovação após o qual um job 'running' de um worker morto volta para a fila
+        lease_seconds=float(os.getenv("SCRAPE_JOB_LEASE_SECONDS", "60")),
+    )
+
+# Índice de imóveis comparáveis (comps), particionado por tipo e cidade e gravado em disco
+# COMPS_INDEX_PATH -> diretório do índice; COMPS_INDEX_SYNC_INTERVAL_SECONDS -> sincronização com o banco (0 desativa)
+# COMPS_NEIGHBORHOOD_WEIGHT -> penalidade (em desvios padrão das features) para comparáveis de outro bairro
+COMPS_INDEX_PATH = os.getenv("COMPS_INDEX_PATH", "./src/app_propieters_ml/ml/comps_index")
+COMPS_NEIGHBORHOOD_WEIGHT = float(os.getenv("COMPS_NEIGHBORHOOD_WEIGHT", "1.0"))
+comps_index_manager = None
+
+def index_saved_properties(properties: list):
+    """
+    Repassa ao índice de comparáveis os imóveis salvos por um job de coleta.
+    """
+    if comps_index_manager is not None:
+        comps_index_manager.add_rows(properties)
+
+def require_comps_index():
+    if comps_index_manager is None or not comps_index_manager.ready:
+        raise HTTPException(status_code=503, detail="Índice de comparáveis indisponível.")
+    return comps_index_manager
+
+def require_scrape_jobs():
+    # Sem o banco na subida, a API continua servindo /predict, mas não agenda coletas
+    if scrape_job_manager is None:
+        raise HTTPException(status_code=503, detail="Banco de dados indisponível: a fila de coletas não foi iniciada.")
+    return scrape_job_manager
+
+# Gauges lidos a cada coleta do /metrics, a partir dos contadores que os pools já mantêm
+REGISTRY.gauge_callback(
+    "db_pool_checked_out", "Conexões em uso em cada pool do banco.",
+    lambda: {(name,): stats["checked_out"] for name, stats in database.pool_stats().items()}, ("pool",),
+)
+REGISTRY.gauge_callback(
+    "db_pool_utilization", "Fração das conexões possíveis de cada pool do banco em uso.",
+    lambda: {(name,): stats["utilization"] for name, stats in database.pool_stats().items()}, ("pool",),
+)
+REGISTRY.gauge_callback(
+    "scraper_driver_pool_browsers", "Navegadores do pool do scraper por estado.",
+    lambda: {(state,): value for state, value in scraper_driver_pool.stats().items() if state in ("idle", "in_use")}, ("state",),
+)
+
+# Profiler por amostragem do tráfego real, exposto em /debug/profiler apenas com PROFILER_ENABLED=true
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "false").lower() == "true"
+sampling_profiler = SamplingProfiler()
+
+async def start_database():
+    """
+    Importa a camada do banco, aplica as migrações e retoma os jobs de coleta.
+
+    Uma falha aqui (ex: PostgreSQL fora do ar) é registrada no relatório de inicialização
+    mas não impede a subida: /predict não depende do banco.
+    """
+    global scrape_job_manager
+    try:
+        with STARTUP_REPORT.phase("database"):
+            # Criação das tabelas e índices no banco de dados, baseado na models do sqlalchemy
+            await run_in_threadpool(migrations.run_migrations, database.engine)
+        with STARTUP_REPORT.phase("scrape jobs"):
+            manager = build_scrape_job_manager()
+            # Retoma os jobs de coleta interrompidos pela última parada
+            await run_in_threadpool(manager.start)
+            scrape_job_manager = manager
+    except Exception as e:
+        logger.error(f"Banco de dados indisponível na inicialização; as rotas do banco vão falhar até a próxima subida: {e}")
+
+async def start_comps_index():
+    """
+    Carrega o índice de comparáveis do disco (ou cria a partir do banco) e o sincroniza
+    com os imóveis salvos depois da última gravação.
+
+    Sem o banco, um índice já gravado continua sendo servido, desatualizado.
+    """
+    global comps_index_manager
+    manager = comps.CompsIndexManager(
+        database.SessionLocal,
+        COMPS_INDEX_PATH,
+        sync_interval=float(os.getenv("COMPS_INDEX_SYNC_INTERVAL_SECONDS", "300")),
+        # COMPS_INDEX_SYNC_LAG_SECONDS -> janela relida antes do watermark, para commits que chegaram depois da última sincronização
+        lag_seconds=float(os.getenv("COMPS_INDEX_SYNC_LAG_SECONDS", "900")),
+    )
+    try:
+        with STARTUP_REPORT.phase("comps index"):
+            await run_in_threadpool(manager.load)
+    except Exception as e:
+        logger.error(f"Falha ao carregar o índice de comparáveis: {e}")
+        return
+    comps_index_manager = manager
+
+    try:
+        with STARTUP_REPORT.phase("comps index sync"):
+            await run_in_threadpool(manager.sync)
+    except Exception as e:
+        logger.error(f"Falha ao sincronizar o índice de comparáveis, servindo a versão gravada: {e}")
+    manager.start()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Carga do modelo (com os arrays mapeados em memória) e aquecimento, fora do import da aplicação
+    with STARTUP_REPORT.phase("model"):
+        await run_in_threadpool(model_manager.check_for_update)
+    if model_manager.model.legacy_unscaled:
+        STARTUP_REPORT.warn(LEGACY_ARTIFACT_WARNING)
+    # Observa o registro de modelos para trocar de versão sem reiniciar
+    model_manager.start()
+    await start_database()
+    await start_comps_index()
+    # SCRAPER_DRIVER_POOL_WARM -> navegadores abertos em segundo plano já na subida da aplicação
+    scraper_driver_pool.start(warm=int(os.getenv("SCRAPER_DRIVER_POOL_WARM", "0")))
+    STARTUP_REPORT.mark_ready()
+    yield
+    if scrape_job_manager is not None:
+        scrape_job_manager.stop()
+    if comps_index_manager is not None:
+        comps_index_manager.stop()
+    model_manager.stop()
+    # Fechamos os navegadores ociosos do pool
+    await run_in_threadpool(scraper_driver_pool.close)
+    # Uma captura esquecida ligada não deve segurar o desligamento
+    sampling_profiler.stop()
+    # Encerramos o consumidor da fila de predições ao desligar a aplicação
+    await prediction_batcher.close()
+    # Fechamos as conexões do pool assíncrono
+    await database.async_engine.dispose()
+
+# Criando uma instancia do FASTApi
+app = FastAPI(title="API e Web App de predição de valores de imóveis reais", version="1.0.0", lifespan=lifespan)
+
+# Histograma de latência por rota (exposto em /metrics)
+app.add_middleware(TimingMiddleware)
 
 # Montando a pasta "static" para servir arquivos estáticos (CSS, JS)
 app.mount("/static", StaticFiles(directory="./src/app_propieters_ml/api/static/"), name="static")
@@ -41,16 +385,11 @@ app.mount("/static", StaticFiles(directory="./src/app_propieters_ml/api/static/"
 # Configurando o diretório de templates Jinja2
 templates = Jinja2Templates(directory="./src/app_propieters_ml/api/templates")
 
-# --- Dependência para obter a sessão do banco de dados ---
-def get_db():
-    db = SessionLocal()
-    try:
+# --- Dependência para obter a sessão assíncrona do banco de dados ---
+async def get_async_db():
+    # Retorna uma AsyncSession do SQLAlchemy (sem anotar o tipo, para não importar o SQLAlchemy junto com a API)
+    async with database.AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
-
-# Lista de tipos de imoveis
-PROPERTY_TYPE_CATEGORIES = ["apartamento", "casa", "quitinete", "sobrados"]
 
 # Página inicial onde está a aplicação completa
 @app.get("/", response_class=HTMLResponse)
@@ -63,139 +402,471 @@ def read_root(request: Request):
 
 # Endpoint de predição
 @app.post("/predict")
-def predict(data: prediction_model_schema.PredictionPriceSchema):
+async def predict(
+    data: prediction_model_schema.PredictionPriceSchema,
+    # Versão do registro a ser usada. Se não informada, usa a versão ativa
+    version: Optional[str] = Query(None, description="Fixa uma versão do modelo para comparação A/B. Exige a chave de API."),
+    # Chave de API, obrigatória somente junto com 'version'
+    api_key: Optional[str] = Security(optional_api_key_header),
+):
     """
     Recebe os dados de entrada, enviados via formulario no HTML e efetua a predição com o modelo carregado
     e retorna o resultado da predição.
     """
-    # Construimos as features amais que o modelo utiliza
-    rooms_safe = data.rooms if data.rooms > 0 else 1
-    
-    rooms_totality = data.rooms + data.bathrooms
-    area_per_room = data.area_m2 / rooms_safe
-    bathrooms_per_rooms = data.bathrooms / rooms_safe
-    
     if data.property_type not in PROPERTY_TYPE_CATEGORIES:
         # Se o tipo de imóvel não for um dos conhecidos, retorna um erro.
         raise HTTPException(status_code=400, detail=f"Tipo de imóvel inválido. Use um de: {PROPERTY_TYPE_CATEGORIES}")
+    require_key_for_pinned_version(version, api_key)
 
-    # Cria um vetor de zeros com o mesmo tamanho das nossas categorias
-    ohe_property_type = [0] * len(PROPERTY_TYPE_CATEGORIES)
-    # Encontra o índice da categoria recebida
-    category_index = PROPERTY_TYPE_CATEGORIES.index(data.property_type)
-    # Define o valor 1 na posição correta
-    ohe_property_type[category_index] = 1
-    
-    input_data = [
-        data.area_m2,
-        data.rooms,
-        data.bathrooms,
-        data.vacancies,
-        rooms_totality,
-        area_per_room,
-        bathrooms_per_rooms
-    ] + ohe_property_type
-    
-    # Transformamaos para uma dimensão 2D
-    input_data_final = np.array(input_data).reshape(1, -1)
+    # Construimos as features amais que o modelo utiliza e o One-Hot do tipo de imóvel (matriz 1xN)
+    with span("feature_build"):
+        input_data_final = feature_transformer.build_row(
+            data.property_type, data.area_m2, data.rooms, data.bathrooms, data.vacancies or 0
+        )
     
-    # Passamos os dados para o modelo prever
-    prediction_result = model.predict(input_data_final)
+    if version is not None:
+        served_version, prediction_result = await run_in_threadpool(predict_matrix_pinned, input_data_final, version)
+        return {
+            "prediction": int(prediction_result[0]),
+            "model_version": served_version,
+        }
+
+    # Consultamos o cache antes de acionar o modelo, na versão servida neste momento
+    cache_version = model_cache_version(*model_manager.get())
+    prediction_result = prediction_cache.get(input_data_final[0], cache_version)
+
+    if prediction_result is None:
+        # Passamos os dados para a fila do modelo, que agrupa requisições simultâneas em um único lote
+        # e devolve a versão que realmente executou a predição
+        cache_version, prediction_result = await prediction_batcher.submit(input_data_final[0])
+        prediction_cache.set(input_data_final[0], prediction_result, cache_version)
     
     # E retornamos o resultado
     return {
-        "prediction": int(prediction_result[0]),
+        "prediction": int(prediction_result),
+        "model_version": cache_version[0],
     }
 
+# Endpoint de predição em lote
+@app.post("/predict/batch")
+def predict_batch(
+    data: prediction_model_schema.PredictionBatchSchema,
+    # Versão do registro a ser usada. Se não informada, usa a versão ativa
+    version: Optional[str] = Query(None, description="Fixa uma versão do modelo para comparação A/B. Exige a chave de API."),
+    # Chave de API, obrigatória somente junto com 'version'
+    api_key: Optional[str] = Security(optional_api_key_header),
+):
+    """
+    Recebe uma lista de imóveis (ou um payload colunar) e efetua a predição de todos em
+    uma única chamada ao modelo.
+
+    Cada linha é validada individualmente: linhas inválidas retornam o erro na sua posição
+    e não impedem a predição das demais. Os resultados seguem a ordem de entrada.
+    """
+    require_key_for_pinned_version(version, api_key)
+    rows = data.rows()
+    served_version = model_manager.version
+    results = [None] * len(rows)
+    valid_indexes = []
+    valid_rows = []
+
+    # Validamos cada linha separadamente para reportar os erros por posição
+    for index, row in enumerate(rows):
+        try:
+            valid_row = prediction_model_schema.PredictionPriceSchema.model_validate(row)
+        except ValidationError as e:
+            results[index] = {"index": index, "error": e.errors(include_url=False, include_context=False)}
+            continue
+
+        if valid_row.property_type not in PROPERTY_TYPE_CATEGORIES:
+            results[index] = {"index": index, "error": f"Tipo de imóvel inválido. Use um de: {PROPERTY_TYPE_CATEGORIES}"}
+            continue
+
+        valid_indexes.append(index)
+        valid_rows.append(valid_row)
+
+    if valid_rows:
+        # Montamos a matriz de features de todo o lote em uma única passada
+        with span("feature_build"):
+            input_data_final = feature_transformer.build(
+                [row.property_type for row in valid_rows],
+                [row.area_m2 for row in valid_rows],
+                [row.rooms for row in valid_rows],
+                [row.bathrooms for row in valid_rows],
+                [row.vacancies or 0 for row in valid_rows],
+            )
+
+        if version is not None:
+            served_version, predictions = predict_matrix_pinned(input_data_final, version)
+        else:
+            # Uma única chamada ao modelo para todas as linhas válidas que não estão no cache
+            served_version, predictions = predict_matrix_cached(input_data_final)
+
+        for index, prediction in zip(valid_indexes, predictions):
+            results[index] = {"index": index, "prediction": int(prediction)}
+
+    logger.info(f">>> Predição em lote: {len(valid_rows)} válidos e {len(rows) - len(valid_rows)} inválidos.")
+
+    return {
+        "model_version": served_version,
+        "total": len(rows),
+        "valid": len(valid_rows),
+        "invalid": len(rows) - len(valid_rows),
+        "results": results,
+    }
+
+# Métricas do agrupador de predições (tamanho dos lotes e tempo de espera na fila)
+@app.get("/predict/stats")
+def predict_stats():
+    """
+    Retorna as métricas do micro-batching, usadas para calibrar latência x vazão,
+    e os contadores do cache de predições.
+    """
+    return {
+        "batcher": prediction_batcher.stats(),
+        "cache": prediction_cache.stats(),
+    }
+
+# Status do modelo servido (versão ativa, metadados e versões disponíveis no registro)
+@app.get("/model/status")
+def model_status():
+    """
+    Retorna a versão ativa do modelo e o estado do observador do registro.
+    """
+    return model_manager.status()
+
+# Custo de cada fase da subida deste worker
+@app.get("/startup-report")
+def startup_report():
+    """
+    Retorna a duração, os módulos importados e o pico de memória de cada fase da
+    inicialização (imports, modelo, banco, imports preguiçosos feitos depois).
+    """
+    return STARTUP_REPORT.to_dict()
+
+# Promove uma versão do registro para ativa
+@app.post("/model/promote/{version}")
+def promote_model_version(
+    version: str,
+    # 'api_key' executa a função 'get_api_key' para validar a chave de API
+    # enviada no cabeçalho da requisição. Se a chave for inválida, a execução é bloqueada.
+    api_key: str = Depends(get_api_key)
+):
+    """
+    Carrega e aquece a versão informada e, só se der certo, a promove e troca o modelo servido.
+    """
+    # Não esperamos o observador: carregamos e trocamos já nesta requisição (fora do event loop)
+    try:
+        model_manager.promote(version)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Versão de modelo '{version}' não encontrada.")
+    except Exception as e:
+        raise HTTPException(status_code=422, detail=f"Falha ao carregar a versão '{version}'; a versão ativa não mudou: {e}")
+    return model_manager.status()
+
 # O decorator @app.get registra a função abaixo para responder a requisições HTTP GET
 # no caminho "/collect-data".
-# O 'response_model' garante que a resposta JSON seguirá o formato definido em
-# 'property_schema.PropertySchema', além de documentar e serializar a saída automaticamente.
-@app.get("/collect-data", response_model=List[property_schema.PropertySchema])
-async def collect_data_and_save(
+# A coleta leva horas, então a requisição só cria um job e retorna imediatamente (HTTP 202);
+# o andamento é acompanhado em /collect-data/jobs/{job_id}.
+@app.get("/collect-data", response_model=scrape_job_schema.ScrapeJobSchema, status_code=202)
+def collect_data_and_save(
     # Efetua uma solicitação forçada de um tipo de imovel que deseja buscar
     tipo: Literal["apartamento", "casa", "quitinete", "sobrado"],
     
     # Determina o limite minimo (0) e o limite maximo (1000) de amostras a serem coletadas pelo scraping
     amostras_limit: int = Query(gt=0, le=3000, description="Limite máximo de amostras de imoveis a coletar."),
-    
-    # 'db' recebe uma sessão de banco de dados da dependência 'get_db'.
-    db: Session = Depends(get_db),
+
+    # Quantidade de navegadores em paralelo. Com 1, usa o scraping sequencial original
+    workers: int = Query(1, ge=1, le=8, description="Quantidade de navegadores em paralelo (limitada pelo pool de navegadores)."),
+
+    # Atualizações rápidas: para quando as páginas passam a ter somente anúncios já conhecidos
+    new_only: bool = Query(False, description="Para a coleta na primeira página com a maioria dos anúncios já conhecidos."),
+
+    # Continua a coleta do tipo a partir da última página alcançada anteriormente
+    continue_crawl: bool = Query(False, description="Começa na página seguinte à última alcançada pela coleta anterior do tipo."),
     
     # 'api_key' executa a função 'get_api_key' para validar a chave de API
     # enviada no cabeçalho da requisição. Se a chave for inválida, a execução é bloqueada.
     api_key: str = Depends(get_api_key)
 ):
     """
-    Endpoint principal que aciona o Selenium, salva os dados e retorna os dados coletados.
-    A resposta é garantida e formatada pelo response_model.
+    Endpoint principal que agenda a coleta com o Selenium. Os dados coletados são
+    salvos no banco pelo job, em segundo plano.
     """
     
     logger.info(f">>> Recebida requisição para coletar {amostras_limit} amostras de '{tipo}'...")
-    
+
     try:
-        # Prepara a função de scraping com o parametros passados na URL
-        func_scraping_exec = partial(main_scraping_ad_and_url, tipo=tipo, amostras_limit=amostras_limit)
-        
-        # Executa a função de scraping (que é sincrona e demorada)
-        # em uma thread separada, evitando que o servidor da API congele e não receba novas requisições
-        list_properties_dict = await run_in_threadpool(func_scraping_exec)
-        
-        # Verifica se não foi coletado nenhum dado pelo Selenium
-        if not list_properties_dict:
-            raise HTTPException(status_code=404, detail="No data was collected by Selenium.")
-        
-        logger.info(f"Recebidos {len(list_properties_dict)} imóveis brutos do scraper. Removendo duplicatas...")
-        
-        # Usa um dicionario para garantir que cada ID sejá único, mantendo a ultima ocorrencia
-        # Essa lógica foi feita para tratar de anuncios de imoveis que aparecem em 2 ou mais páginas e são coletados pelo scraping
-        unique_properties = {}
-        for prop in list_properties_dict:
-            unique_properties[prop['id']] = prop
-        deduplicated_list = list(unique_properties.values())
-        
-        logger.info(f"Total de {len(deduplicated_list)} imóveis únicos para salvar.")
-        
-        if not deduplicated_list:
-             raise HTTPException(status_code=404, detail="No unique data was collected after deduplication.")
-         
-        # Pega uma referência à tabela
-        properties_table = property_model.Property.__table__
-        
-        # Constrói a declaração de INSERT
-        stmt = insert(properties_table).values(deduplicated_list)
-        
-        # Caso tenha dados de ID duplicados, iremos somente alterar as outras colunas menos a de id, data de coleta e hora de coleta
-        update_dict = {
-            col.name: col
-            for col in stmt.excluded
-            if col.name not in ["id", "collection_date", "collection_time"] # Não atualiza o ID nem a data/hora de criação
-        }
+        return require_scrape_jobs().submit(tipo, amostras_limit, workers, new_only=new_only, continue_crawl=continue_crawl)
+    except OverflowError as e:
+        raise HTTPException(status_code=429, detail=str(e))
 
-        # index_elements=['id'] -> diz para o Postgre que o conflito é na coluna 'id'
-        # set_=update_dict -> diz para o Postgre: "se houver conflito, atualize estes campos"
-        final_stmt = stmt.on_conflict_do_update(
-            index_elements=['id'],
-            set_=update_dict
-        )
+# Lista os jobs de coleta mais recentes
+@app.get("/collect-data/jobs", response_model=List[scrape_job_schema.ScrapeJobSchema])
+def list_collect_jobs(
+    limit: int = Query(50, gt=0, le=500, description="Quantidade máxima de jobs retornados."),
+    api_key: str = Depends(get_api_key)
+):
+    return require_scrape_jobs().list(limit)
 
-        # Executa tudo em uma única chamada ao banco
-        db.execute(final_stmt)
-        db.commit()
-        
-        logger.info(f">>> {len(deduplicated_list)} imóveis foram salvos no banco de dados.")
-        
-        return deduplicated_list
-    
-    except Exception as e:
-        db.rollback()
-        logger.error(f"ERROR: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"An internal error occurred: {e}")
+# Última página alcançada pela coleta de cada tipo de imóvel
+@app.get("/collect-data/crawl-state")
+async def list_crawl_state(
+    db=Depends(get_async_db),
+    api_key: str = Depends(get_api_key)
+):
+    return await db.run_sync(crawl_state.list_crawl_states)
+
+# Estado e progresso de um job de coleta
+@app.get("/collect-data/jobs/{job_id}", response_model=scrape_job_schema.ScrapeJobSchema)
+def get_collect_job(
+    job_id: str,
+    api_key: str = Depends(get_api_key)
+):
+    """
+    Retorna o status do job e o seu progresso: páginas processadas, anúncios coletados e linhas salvas.
+    """
+    job = require_scrape_jobs().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' não encontrado.")
+    return job
+
+# Cancela um job de coleta
+@app.post("/collect-data/jobs/{job_id}/cancel", response_model=scrape_job_schema.ScrapeJobSchema)
+def cancel_collect_job(
+    job_id: str,
+    api_key: str = Depends(get_api_key)
+):
+    """
+    Cancela o job. Se ele já estiver em execução, para na próxima página e salva o que foi coletado.
+    """
+    job = require_scrape_jobs().cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' não encontrado.")
+    return job
+
+# Retoma um job de coleta que falhou ou foi cancelado
+@app.post("/collect-data/jobs/{job_id}/resume", response_model=scrape_job_schema.ScrapeJobSchema, status_code=202)
+def resume_collect_job(
+    job_id: str,
+    api_key: str = Depends(get_api_key)
+):
+    """
+    Recoloca o job na fila; a coleta continua na página seguinte à última página salva.
+    """
+    try:
+        job = require_scrape_jobs().resume(job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' não encontrado.")
+    return job
     
+# Estado do pool de navegadores do scraper
+@app.get("/scraper/driver-pool")
+def scraper_driver_pool_stats(
+    # 'api_key' executa a função 'get_api_key' para validar a chave de API
+    # enviada no cabeçalho da requisição. Se a chave for inválida, a execução é bloqueada.
+    api_key: str = Depends(get_api_key)
+):
+    """
+    Retorna quantos navegadores estão ociosos, em uso, criados e reciclados.
+    """
+    return scraper_driver_pool.stats()
+
+# Uso dos pools de conexões com o banco
+@app.get("/db/pool-stats")
+def database_pool_stats(
+    # 'api_key' executa a função 'get_api_key' para validar a chave de API
+    # enviada no cabeçalho da requisição. Se a chave for inválida, a execução é bloqueada.
+    api_key: str = Depends(get_api_key)
+):
+    """
+    Retorna, para a engine síncrona (jobs) e a assíncrona (endpoints), as conexões em uso,
+    livres, em overflow, a utilização atual e o pico de uso.
+    """
+    return database.pool_stats()
+
+# Imóveis comparáveis ao informado, com os seus preços
+@app.get("/comps", response_model=comps_schema.CompsResponseSchema)
+def comparable_properties(
+    property_type: str = Query(..., description="Tipo do imóvel."),
+    city: str = Query(..., description="Cidade do imóvel."),
+    neighborhood: Optional[str] = Query(None, description="Bairro; comparáveis do mesmo bairro são priorizados."),
+    area_m2: int = Query(..., gt=0),
+    rooms: int = Query(..., ge=0),
+    bathrooms: int = Query(..., ge=1),
+    vacancies: int = Query(0, ge=0),
+    k: int = Query(10, gt=0, le=comps_schema.MAX_COMPS_K, description="Quantidade de comparáveis."),
+    neighborhood_weight: Optional[float] = Query(None, ge=0, description="Penalidade para comparáveis de outro bairro."),
+    # 'api_key' executa a função 'get_api_key' para validar a chave de API
+    # enviada no cabeçalho da requisição. Se a chave for inválida, a execução é bloqueada.
+    api_key: str = Depends(get_api_key)
+):
+    """
+    Retorna os `k` anúncios coletados mais parecidos com o imóvel (mesmo tipo e cidade,
+    features do modelo padronizadas), do mais próximo ao mais distante, com os preços.
+    A busca usa o índice em memória, sem consultar a tabela de imóveis.
+    """
+    manager = require_comps_index()
+    query = {"property_type": property_type, "city": city, "neighborhood": neighborhood,
+             "area_m2": area_m2, "rooms": rooms, "bathrooms": bathrooms, "vacancies": vacancies}
+    weight = COMPS_NEIGHBORHOOD_WEIGHT if neighborhood_weight is None else neighborhood_weight
+
+    with span("comps_query"):
+        found = manager.query([query], k, weight)[0]
+    return {"property_type": property_type, "city": city, "k": k, "comps": found}
+
+# Comparáveis de vários imóveis em uma única requisição
+@app.post("/comps/batch")
+def comparable_properties_batch(
+    data: comps_schema.CompsBatchSchema,
+    # 'api_key' executa a função 'get_api_key' para validar a chave de API
+    # enviada no cabeçalho da requisição. Se a chave for inválida, a execução é bloqueada.
+    api_key: str = Depends(get_api_key)
+):
+    """
+    Busca os comparáveis de cada consulta do lote. As consultas da mesma partição (tipo e
+    cidade) são resolvidas juntas, e os resultados seguem a ordem de entrada.
+    """
+    manager = require_comps_index()
+    queries = [query.model_dump() for query in data.queries]
+    weight = COMPS_NEIGHBORHOOD_WEIGHT if data.neighborhood_weight is None else data.neighborhood_weight
+
+    with span("comps_query"):
+        found = manager.query(queries, data.k, weight)
+
+    return {
+        "k": data.k,
+        "results": [
+            {"index": index, "property_type": query["property_type"], "city": query["city"], "comps": comps_found}
+            for index, (query, comps_found) in enumerate(zip(queries, found))
+        ],
+    }
+
+# Estado do índice de comparáveis
+@app.get("/comps/status")
+def comps_index_status(
+    api_key: str = Depends(get_api_key)
+):
+    if comps_index_manager is None:
+        return {"ready": False}
+    return comps_index_manager.status()
+
+# Métricas da aplicação no formato texto do Prometheus
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """
+    Retorna os histogramas de latência por rota e por etapa (features, modelo, scraper,
+    validação, banco), os contadores de anúncios e os gauges dos pools para o Prometheus.
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+def require_profiler():
+    # Com o profiler desligado, as rotas de depuração se comportam como inexistentes
+    if not PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+# Inicia uma captura do profiler por amostragem
+@app.post("/debug/profiler/start")
+def start_profiler(
+    interval_ms: float = Query(10, gt=0, le=1000, description="Intervalo entre as amostras, em milissegundos."),
+    duration_s: Optional[float] = Query(None, gt=0, le=3600, description="Para sozinho depois desse tempo."),
+    _: None = Depends(require_profiler),
+    # 'api_key' executa a função 'get_api_key' para validar a chave de API
+    # enviada no cabeçalho da requisição. Se a chave for inválida, a execução é bloqueada.
+    api_key: str = Depends(get_api_key),
+):
+    """
+    Começa a amostrar as pilhas de todas as threads do servidor. Só disponível com
+    PROFILER_ENABLED=true.
+    """
+    try:
+        sampling_profiler.start(interval_ms / 1000, duration_s)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return sampling_profiler.status()
+
+# Para a captura e retorna as pilhas no formato collapsed (flame graph)
+@app.post("/debug/profiler/stop", response_class=PlainTextResponse)
+def stop_profiler(
+    _: None = Depends(require_profiler),
+    # 'api_key' executa a função 'get_api_key' para validar a chave de API
+    # enviada no cabeçalho da requisição. Se a chave for inválida, a execução é bloqueada.
+    api_key: str = Depends(get_api_key),
+):
+    """
+    Para a captura e retorna uma pilha por linha com a sua contagem, pronta para o
+    flamegraph.pl ou o speedscope.
+    """
+    return PlainTextResponse(sampling_profiler.stop())
+
+# Estado da captura atual
+@app.get("/debug/profiler")
+def profiler_status(
+    _: None = Depends(require_profiler),
+    # 'api_key' executa a função 'get_api_key' para validar a chave de API
+    # enviada no cabeçalho da requisição. Se a chave for inválida, a execução é bloqueada.
+    api_key: str = Depends(get_api_key),
+):
+    """
+    Retorna se o profiler está rodando, o intervalo, o número de amostras e de pilhas distintas.
+    """
+    return sampling_profiler.status()
+
+# Resumo de preços por cidade, bairro e tipo de imóvel
+@app.get("/stats/summary", response_model=List[property_summary_schema.PropertySummarySchema])
+async def price_summary(
+    city: Optional[str] = Query(None, description="Filtra pela cidade."),
+    neighborhood: Optional[str] = Query(None, description="Filtra pelo bairro."),
+    property_type: Optional[str] = Query(None, description="Filtra pelo tipo de imóvel."),
+    min_count: Optional[int] = Query(None, ge=1, description="Somente grupos com pelo menos esta quantidade de imóveis."),
+    db=Depends(get_async_db),
+    api_key: str = Depends(get_api_key)
+):
+    """
+    Retorna quantidade, preço médio e mediano, preço por m² médio e mediano e área média de
+    cada grupo (cidade, bairro, tipo). Os valores vêm da tabela property_summary, atualizada
+    a cada bloco de imóveis salvo pelos jobs de coleta, sem ler a tabela de imóveis.
+    """
+    stmt = property_summary.build_summary_query(city=city, neighborhood=neighborhood,
+                                                property_type=property_type, min_count=min_count)
+    return (await db.execute(stmt)).mappings().all()
+
+# Refaz o resumo de preços inteiro a partir da tabela de imóveis
+@app.post("/stats/summary/refresh")
+def refresh_price_summary(
+    api_key: str = Depends(get_api_key)
+):
+    """
+    Recalcula todos os grupos do resumo. Normalmente desnecessário: os jobs de coleta
+    atualizam os grupos alterados; útil após alterações feitas direto no banco.
+    """
+    with database.SessionLocal() as session:
+        groups = property_summary.refresh_summary(session)
+        session.commit()
+    return {"groups": groups}
+
 @app.get("/consult-all-datas", response_model=List[property_schema.PropertySchema])
-async def selection_all_datas(   
-    # 'db' recebe uma sessão de banco de dados da dependência 'get_db'.
-    db: Session = Depends(get_db),
+async def selection_all_datas(
+    # 'response' permite adicionar o cursor da próxima página nos cabeçalhos
+    response: Response,
+
+    # Filtros opcionais, para que o consumidor traga somente a fatia que precisa
+    property_type: Optional[str] = Query(None, description="Filtra pelo tipo de imóvel."),
+    city: Optional[str] = Query(None, description="Filtra pela cidade."),
+    collection_date_from: Optional[date] = Query(None, description="Data de coleta inicial (inclusiva)."),
+    collection_date_to: Optional[date] = Query(None, description="Data de coleta final (inclusiva)."),
+
+    # Paginação por chave (keyset) no id: envie o cabeçalho X-Next-After-Id da página anterior
+    after_id: Optional[str] = Query(None, description="Retorna somente imóveis com id maior que este."),
+    limit: Optional[int] = Query(None, gt=0, le=50000, description="Tamanho máximo da página."),
+
+    # Modo streaming: envia NDJSON à medida que as linhas chegam do banco
+    stream: bool = Query(False, description="Envia o resultado em NDJSON, sem montar a lista inteira em memória."),
+
+    # 'db' recebe uma sessão assíncrona de banco de dados da dependência 'get_async_db'.
+    db=Depends(get_async_db),
     
     # 'api_key' executa a função 'get_api_key' para validar a chave de API
     # enviada no cabeçalho da requisição. Se a chave for inválida, a execução é bloqueada.
@@ -203,15 +874,38 @@ async def selection_all_datas(
 ):
     """
     Consulta os dados de imóveis do banco de dados com suporte a tratamento de erros.
+
+    Sem parâmetros retorna todos os imóveis, como antes. Com `limit` retorna uma página
+    ordenada por id e o cursor da próxima página no cabeçalho `X-Next-After-Id`. Com
+    `stream=true` a resposta é NDJSON lida do banco com cursor do lado do servidor.
     """
-    logger.info(f">>> Recebida requisição para consultar todos os dados.")
+    logger.info(f">>> Recebida requisição para consultar os dados (stream={stream}, limit={limit}, after_id={after_id}).")
+
+    stmt = property_repository.build_properties_query(
+        property_type=property_type,
+        city=city,
+        date_from=collection_date_from,
+        date_to=collection_date_to,
+        after_id=after_id,
+        limit=limit,
+    )
+
+    if stream:
+        return StreamingResponse(
+            property_repository.stream_properties_ndjson(database.async_engine, stmt),
+            media_type="application/x-ndjson",
+        )
 
     try:
         logger.info(">>> Coletando os dados do banco...")
         
-        datas = db.query(property_model.Property).all()
+        datas = (await db.execute(stmt)).mappings().all()
         
         logger.info(f">>> Foram coletados no total {len(datas)} dados de imóveis.")
+
+        # Se a página veio cheia, pode haver mais dados: informamos o cursor da próxima página
+        if limit is not None and len(datas) == limit:
+            response.headers["X-Next-After-Id"] = datas[-1]["id"]
         
         # Retorna a lista de dados (pode ser vazia).
         return datas
@@ -0,0 +1,243 @@
+from src.app_propieters_ml.api.prediction_cache import file_signature
+from src.app_propieters_ml.ml.feature_engineering import LEGACY_ARTIFACT_WARNING, with_feature_transformer
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime, timezone
+
+import threading
+import logging
+
+# Crie uma instância do logger para este módulo
+logger = logging.getLogger(__name__)
+
+# Versão usada quando o registro está vazio e o modelo vem do arquivo .joblib/compilado original
+LEGACY_VERSION = "legacy"
+
+
+class ModelManager:
+    """
+    Mantém o modelo servido pela API e troca de versão sem reiniciar o servidor.
+
+    Uma thread em segundo plano consulta o registro a cada `poll_interval` segundos.
+    Quando a versão ativa muda, o novo modelo é carregado e aquecido (uma predição de
+    teste) nessa mesma thread, e só então a referência servida é trocada. Requisições
+    em andamento continuam usando o modelo antigo até terminarem.
+
+    Sem nenhuma versão promovida no registro, o modelo é carregado por `fallback_loader`
+    e recarregado quando o artefato muda no disco.
+
+    O construtor não carrega nada: a primeira carga é feita por `check_for_update`
+    (na lifespan da API), então importar a aplicação não custa a leitura do modelo.
+
+    Args:
+        registry (ModelRegistry): Registro versionado dos modelos.
+        fallback_loader (callable): Função que retorna (modelo, caminho do artefato) do modelo original.
+        fallback_artifact (callable): Função que retorna o caminho do artefato que `fallback_loader` carregaria.
+        warmup_input (np.ndarray): Matriz de exemplo usada para aquecer cada modelo carregado.
+        poll_interval (float): Intervalo, em segundos, entre as verificações do registro.
+        max_pinned (int): Quantidade máxima de versões fixadas por requisição mantidas em memória.
+        prefer_compiled (bool): Usa a forma compilada das versões quando disponível.
+        mmap (bool): Mapeia em memória os arrays das versões compiladas, compartilhados entre os workers.
+    """
+
+    def __init__(self, registry, fallback_loader, fallback_artifact, warmup_input, poll_interval: float = 10.0,
+                 max_pinned: int = 2, prefer_compiled: bool = True, mmap: bool = True):
+        self.registry = registry
+        self.fallback_loader = fallback_loader
+        self.fallback_artifact = fallback_artifact
+        self.warmup_input = warmup_input
+        self.poll_interval = poll_interval
+        self.max_pinned = max_pinned
+        self.prefer_compiled = prefer_compiled
+        self.mmap = mmap
+
+        self._lock = threading.Lock()
+        # Serializa as cargas que trocam o modelo servido (observador e promoções); fica fora de
+        # `_lock` para que as predições não esperem a leitura de um modelo
+        self._swap_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._pinned = OrderedDict()
+        # Cargas de versões fixadas em andamento: requisições simultâneas esperam a mesma carga
+        self._loading = {}
+
+        self.version = None
+        self.model = None
+        self._fallback_signature = None
+        self.last_swap_at = None
+        self.last_check_at = None
+        self.last_error = None
+
+    def _load_version(self, version: str):
+        if version == LEGACY_VERSION:
+            model, artifact = self.fallback_loader()
+            self._fallback_signature = file_signature(artifact)
+        else:
+            model = self.registry.load(version, prefer_compiled=self.prefer_compiled, mmap=self.mmap)
+
+        # Todo modelo servido recebe a matriz sem padronização e aplica o seu próprio FeatureTransformer
+        model = with_feature_transformer(model)
+
+        # Aquecimento: a primeira predição paga inicializações preguiçosas, não o usuário
+        model.predict(self.warmup_input)
+        return model
+
+    def _wanted_version(self):
+        active = self.registry.active_version()
+        if active is not None:
+            return active, False
+
+        # Sem registro: recarrega o modelo original somente quando o arquivo muda
+        changed = file_signature(self.fallback_artifact()) != self._fallback_signature
+        return LEGACY_VERSION, changed
+
+    def check_for_update(self) -> bool:
+        """
+        Verifica o registro e troca o modelo servido se a versão ativa mudou.
+
+        Returns:
+            bool: True quando houve troca de modelo.
+        """
+        self.last_check_at = datetime.now(timezone.utc).isoformat()
+        with self._swap_lock:
+            try:
+                version, artifact_changed = self._wanted_version()
+                if version == self.version and not artifact_changed:
+                    return False
+
+                logger.info(f"Carregando a versão '{version}' do modelo em segundo plano...")
+                model = self._load_version(version)
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"Falha ao carregar a nova versão do modelo, mantendo a atual: {e}", exc_info=True)
+                if self.model is None:
+                    raise
+                return False
+
+            self._swap(version, model)
+        return True
+
+    def promote(self, version: str):
+        """
+        Carrega e aquece `version` e só então a torna ativa no registro e troca o modelo servido.
+
+        Se a carga falhar, o ponteiro ACTIVE não muda e o modelo atual continua servido.
+        Roda sob o mesmo lock do observador, então os dois não trocam o modelo ao mesmo tempo.
+
+        Raises:
+            KeyError: Se a versão não existir no registro.
+        """
+        if version == LEGACY_VERSION or version not in self.registry.list_versions():
+            raise KeyError(f"Versão '{version}' não encontrada no registro.")
+
+        with self._swap_lock:
+            logger.info(f"Carregando a versão '{version}' do modelo antes de promovê-la...")
+            model = self._load_version(version)
+            self.registry.promote(version)
+            self._swap(version, model)
+
+    def _swap(self, version: str, model):
+        with self._lock:
+            previous = self.version
+            self.model = model
+            self.version = version
+            self.last_swap_at = datetime.now(timezone.utc).isoformat()
+            self.last_error = None
+
+        logger.info(f"Modelo servido trocado de '{previous}' para '{version}'.")
+
+    def get(self, version: str = None):
+        """
+        Retorna (versão, modelo). Sem `version`, retorna o modelo ativo; com `version`,
+        carrega (e mantém em memória) a versão fixada, usada em comparações A/B.
+
+        Somente versões presentes no registro são aceitas, antes de qualquer leitura de
+        arquivo. Requisições simultâneas pela mesma versão compartilham uma única carga.
+
+        Raises:
+            KeyError: Se a versão não existir no registro.
+        """
+        with self._lock:
+            if version is None or version == self.version:
+                return self.version, self.model
+            if version in self._pinned:
+                self._pinned.move_to_end(version)
+                return version, self._pinned[version]
+
+        if version == LEGACY_VERSION or version not in self.registry.list_versions():
+            raise KeyError(f"Versão '{version}' não encontrada no registro.")
+
+        with self._lock:
+            # A versão pode ter sido carregada enquanto consultávamos o registro
+            if version in self._pinned:
+                self._pinned.move_to_end(version)
+                return version, self._pinned[version]
+            future = self._loading.get(version)
+            owner = future is None
+            if owner:
+                future = self._loading[version] = Future()
+
+        if not owner:
+            return version, future.result()
+
+        try:
+            model = self._load_version(version)
+        except BaseException as e:
+            with self._lock:
+                self._loading.pop(version, None)
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._loading.pop(version, None)
+            self._pinned[version] = model
+            while len(self._pinned) > self.max_pinned:
+                self._pinned.popitem(last=False)
+        future.set_result(model)
+        return version, model
+
+    def _watch(self):
+        while not self._stop_event.wait(self.poll_interval):
+            self.check_for_update()
+
+    def start(self):
+        """
+        Inicia a thread que observa o registro.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._watch, name="model-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval + 1)
+        self._thread = None
+
+    def status(self) -> dict:
+        metadata = None
+        if self.version != LEGACY_VERSION:
+            try:
+                metadata = self.registry.get_metadata(self.version)
+            except KeyError:
+                metadata = None
+
+        return {
+            "active_version": self.version,
+            "model_class": type(self.model.estimator).__name__ if self.model is not None else None,
+            "feature_standardized": not self.model.transformer.is_identity if self.model is not None else None,
+            # Artefato legado servido sem a padronização do treino (ver with_feature_transformer)
+            "legacy_unscaled_artifact": self.model.legacy_unscaled if self.model is not None else None,
+            "warning": LEGACY_ARTIFACT_WARNING if self.model is not None and self.model.legacy_unscaled else None,
+            "mmap": self.mmap,
+            "metadata": metadata,
+            "available_versions": self.registry.list_versions(),
+            "pinned_versions_loaded": list(self._pinned.keys()),
+            "watching": self._thread is not None and self._thread.is_alive(),
+            "poll_interval_seconds": self.poll_interval,
+            "last_check_at": self.last_check_at,
+            "last_swap_at": self.last_swap_at,
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,154 @@
+from fastapi.concurrency import run_in_threadpool
+from collections import deque
+from time import perf_counter
+
+import numpy as np
+import asyncio
+import logging
+
+# Crie uma instância do logger para este módulo
+logger = logging.getLogger(__name__)
+
+
+class PredictionBatcher:
+    """
+    Agrupa predições individuais que chegam ao mesmo tempo em um único lote.
+
+    Cada chamada a `submit` entra em uma fila. Um consumidor aguarda até `max_wait_ms`
+    milissegundos (ou até juntar `max_batch_size` linhas), executa uma única predição
+    em lote numa thread separada e devolve o resultado de cada chamador pelo seu future,
+    junto com a versão do modelo que gerou o lote.
+
+    Args:
+        predict_func (callable): Função que recebe uma matriz (N, features) e retorna
+                                 (versão do modelo usada, N predições).
+        max_wait_ms (float): Tempo máximo que a primeira linha da fila espera por companhia.
+        max_batch_size (int): Quantidade máxima de linhas por lote.
+        stats_window (int): Quantidade de lotes recentes usados no cálculo das métricas.
+    """
+
+    def __init__(self, predict_func, max_wait_ms: float = 5.0, max_batch_size: int = 64, stats_window: int = 1000):
+        self.predict_func = predict_func
+        self.max_wait = max_wait_ms / 1000
+        self.max_batch_size = max_batch_size
+
+        self._queue = None
+        self._worker = None
+        self._loop = None
+
+        # Métricas acumuladas e janela dos últimos lotes
+        self.total_batches = 0
+        self.total_rows = 0
+        self._batch_sizes = deque(maxlen=stats_window)
+        self._queue_waits = deque(maxlen=stats_window)
+
+    def _ensure_worker(self):
+        # O consumidor é criado no primeiro uso, dentro do event loop que atende as requisições
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def submit(self, features_row: np.ndarray) -> tuple:
+        """
+        Enfileira uma linha de features e aguarda a sua predição.
+
+        Args:
+            features_row (np.ndarray): Vetor 1D com as features de um imóvel.
+
+        Returns:
+            tuple: (versão do modelo que executou o lote, valor predito para a linha).
+        """
+        self._ensure_worker()
+        future = self._loop.create_future()
+        await self._queue.put((features_row, future, perf_counter()))
+        return await future
+
+    async def _collect_batch(self):
+        # Aguarda a primeira linha e a partir dela abre a janela de espera
+        batch = [await self._queue.get()]
+        deadline = batch[0][2] + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            # Linhas que já estão na fila entram no lote sem esperar, mesmo após a janela expirar
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+
+            remaining = deadline - perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect_batch()
+            started = perf_counter()
+
+            self.total_batches += 1
+            self.total_rows += len(batch)
+            self._batch_sizes.append(len(batch))
+            self._queue_waits.extend(started - enqueued for _, _, enqueued in batch)
+
+            try:
+                matrix = np.vstack([row for row, _, _ in batch])
+                # A predição roda numa thread separada para não travar o event loop
+                version, predictions = await run_in_threadpool(self.predict_func, matrix)
+            except Exception as e:
+                logger.error(f"Falha na predição do lote com {len(batch)} linhas: {e}", exc_info=True)
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future, _), prediction in zip(batch, predictions):
+                # O chamador pode ter desistido (ex: cliente desconectou)
+                if not future.done():
+                    future.set_result((version, prediction))
+
+    async def close(self):
+        """
+        Encerra o consumidor da fila.
+        """
+        if self._worker is not None and not self._worker.done():
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+
+    def stats(self) -> dict:
+        """
+        Retorna as métricas de tamanho de lote e tempo de espera na fila (em milissegundos).
+        """
+        sizes = np.asarray(self._batch_sizes, dtype=np.float64)
+        waits = np.asarray(self._queue_waits, dtype=np.float64) * 1000
+
+        def summary(values):
+            if values.size == 0:
+                return {"mean": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            return {
+                "mean": round(float(values.mean()), 3),
+                "p50": round(float(p50), 3),
+                "p95": round(float(p95), 3),
+                "p99": round(float(p99), 3),
+                "max": round(float(values.max()), 3),
+            }
+
+        return {
+            "max_wait_ms": self.max_wait * 1000,
+            "max_batch_size": self.max_batch_size,
+            "total_batches": self.total_batches,
+            "total_rows": self.total_rows,
+            "queue_size": self._queue.qsize() if self._queue is not None else 0,
+            "batch_size": summary(sizes),
+            "queue_wait_ms": summary(waits),
+        }
@@ -0,0 +1,173 @@
+from collections import OrderedDict
+from time import monotonic
+
+import numpy as np
+import threading
+import logging
+import os
+
+# Crie uma instância do logger para este módulo
+logger = logging.getLogger(__name__)
+
+
+def file_signature(path: str):
+    """
+    Retorna uma assinatura do arquivo (data de modificação e tamanho), usada para
+    detectar quando o artefato do modelo foi trocado no disco.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class PredictionCache:
+    """
+    Cache LRU de predições, seguro para uso entre threads.
+
+    A chave é o vetor de features já construído (bytes do array float64), então
+    entradas equivalentes compartilham o mesmo resultado. As entradas expiram após
+    `ttl_seconds` e as mais antigas são removidas quando o cache atinge `max_size`.
+
+    Args:
+        max_size (int): Quantidade máxima de predições guardadas. 0 desativa o cache.
+        ttl_seconds (float): Tempo de vida de cada entrada, em segundos.
+        version_func (callable): Função que retorna a versão atual do modelo. Quando
+                                 o valor muda, todo o cache é invalidado.
+
+    `get_many`/`set_many` aceitam a versão do modelo lida pelo chamador antes de predizer:
+    se o modelo foi trocado no meio, a consulta não usa o cache e a predição do modelo
+    antigo não é guardada sob a nova versão.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 3600, version_func=None):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.version_func = version_func
+
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = version_func() if version_func else None
+
+        # Contadores expostos nas métricas
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    @staticmethod
+    def make_key(features_row) -> bytes:
+        return np.ascontiguousarray(features_row, dtype=np.float64).tobytes()
+
+    def _check_version(self, expected=None) -> bool:
+        # Chamado com o lock adquirido: limpa tudo se o modelo mudou
+        if self.version_func is None:
+            return True
+        version = self.version_func()
+        if version != self._version:
+            if self._data:
+                logger.info("Modelo alterado, invalidando o cache de predições.")
+            self._data.clear()
+            self._version = version
+            self.invalidations += 1
+        # False quando o chamador usou (ou vai usar) um modelo diferente do atual
+        return expected is None or expected == version
+
+    def get_many(self, matrix: np.ndarray, version=None):
+        """
+        Busca as predições de cada linha da matriz.
+
+        Args:
+            version: Versão do modelo que o chamador vai usar; diferente da atual, nada é lido do cache.
+
+        Returns:
+            tuple: (lista com o valor de cada linha ou None, lista dos índices que não estavam no cache)
+        """
+        values = [None] * len(matrix)
+        miss_indexes = []
+
+        if not self.enabled:
+            return values, list(range(len(matrix)))
+
+        now = monotonic()
+        with self._lock:
+            if not self._check_version(version):
+                self.misses += len(matrix)
+                return values, list(range(len(matrix)))
+            for index, row in enumerate(matrix):
+                key = self.make_key(row)
+                entry = self._data.get(key)
+
+                if entry is not None and entry[1] < now:
+                    # Entrada expirada pelo TTL
+                    del self._data[key]
+                    self.expirations += 1
+                    entry = None
+
+                if entry is None:
+                    self.misses += 1
+                    miss_indexes.append(index)
+                else:
+                    self.hits += 1
+                    self._data.move_to_end(key)
+                    values[index] = entry[0]
+
+        return values, miss_indexes
+
+    def set_many(self, matrix: np.ndarray, predictions, version=None):
+        """
+        Guarda as predições de cada linha da matriz.
+
+        Args:
+            version: Versão do modelo que gerou as predições; diferente da atual, nada é guardado.
+        """
+        if not self.enabled:
+            return
+
+        expires_at = monotonic() + self.ttl_seconds
+        with self._lock:
+            if not self._check_version(version):
+                return
+            for row, prediction in zip(matrix, predictions):
+                key = self.make_key(row)
+                self._data[key] = (prediction, expires_at)
+                self._data.move_to_end(key)
+
+            # Remove as entradas menos usadas recentemente
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get(self, features_row, version=None):
+        values, _ = self.get_many([features_row], version)
+        return values[0]
+
+    def set(self, features_row, prediction, version=None):
+        self.set_many([features_row], [prediction], version)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._data)
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": size,
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
@@ -7,6 +7,8 @@ from fastapi.security import APIKeyHeader
 load_dotenv()
 
 api_key_header = APIKeyHeader(name="X-API-Key")
+# Mesmo cabeçalho, mas opcional: para rotas públicas que exigem a chave só em alguns usos
+optional_api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
 
 # Pega a nossa chave secreta da variável de ambiente
 API_KEY = os.getenv("API_KEY")
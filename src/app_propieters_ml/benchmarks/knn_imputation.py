@@ -0,0 +1,118 @@
+from sklearn.impute import KNNImputer
+
+from src.app_propieters_ml.ml.imputation import impute_knn_blocks
+from src.app_propieters_ml.ml.training_pipeline import IMPUTED_COLUMNS, clean_properties
+
+import numpy as np
+import pandas as pd
+import tracemalloc
+import argparse
+import time
+
+# Colunas com valores faltantes de verdade na base (as demais são obrigatórias no banco)
+EVALUATED_COLUMNS = ["price_condominium", "iptu", "vacancies"]
+
+
+def make_properties(n: int, seed: int = 42) -> pd.DataFrame:
+    """
+    Gera `n` imóveis sintéticos com distribuição parecida com a da base (faltantes em condomínio, IPTU e vagas).
+    """
+    rng = np.random.default_rng(seed)
+    property_type = rng.choice(["apartamento", "casa", "quitinete", "sobrados"], n, p=[0.6, 0.25, 0.05, 0.1])
+    area = np.clip(rng.lognormal(4.3, 0.6, n), 18, 2000).round()
+    rooms = np.clip((area / 35).round() + rng.integers(-1, 2, n), 0, 8)
+    bathrooms = np.clip(rooms - rng.integers(0, 2, n), 1, 8)
+    vacancies = np.clip((area / 60).round() + rng.integers(-1, 2, n), 0, 8)
+    price = area * rng.lognormal(8.9, 0.35, n)
+    condominium = area * rng.lognormal(2.7, 0.3, n)
+    iptu = price * rng.uniform(0.0005, 0.0015, n)
+
+    df = pd.DataFrame({
+        "property_type": property_type, "price": price, "price_condominium": condominium, "iptu": iptu,
+        "area_m2": area, "rooms": rooms, "bathrooms": bathrooms, "vacancies": vacancies,
+    })
+    # Casas e sobrados quase nunca têm condomínio
+    no_condo = np.isin(property_type, ["casa", "sobrados"]) & (rng.random(n) < 0.8)
+    df.loc[no_condo | (rng.random(n) < 0.15), "price_condominium"] = np.nan
+    df.loc[rng.random(n) < 0.35, "iptu"] = np.nan
+    df.loc[rng.random(n) < 0.05, "vacancies"] = np.nan
+    return df
+
+
+def mask_known_values(df: pd.DataFrame, ratio: float = 0.1, seed: int = 7):
+    """
+    Esconde uma fração dos valores conhecidos das colunas avaliadas, para medir o erro da imputação.
+
+    Returns:
+        tuple: (DataFrame com os valores escondidos, dicionário coluna -> (índices, valores verdadeiros))
+    """
+    rng = np.random.default_rng(seed)
+    masked = df.copy()
+    truth = {}
+    for column in EVALUATED_COLUMNS:
+        known = np.flatnonzero(df[column].notna().to_numpy())
+        hidden = rng.choice(known, size=max(1, int(known.size * ratio)), replace=False)
+        truth[column] = (hidden, df[column].to_numpy()[hidden])
+        masked.iloc[hidden, masked.columns.get_loc(column)] = np.nan
+    return masked, truth
+
+
+def _measure(func):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 2**20
+
+
+def _errors(imputed: np.ndarray, truth: dict) -> dict:
+    # Erro absoluto médio relativo à média verdadeira da coluna (comparável entre colunas)
+    errors = {}
+    for column, (rows, expected) in truth.items():
+        predicted = imputed[rows, IMPUTED_COLUMNS.index(column)]
+        errors[f"mae_{column}"] = round(float(np.mean(np.abs(predicted - expected)) / np.mean(np.abs(expected))), 4)
+    return errors
+
+
+def run_benchmark(df: pd.DataFrame, n_neighbors: int = 30, skip_full: bool = False) -> dict:
+    """
+    Compara o KNNImputer sobre a tabela inteira com a imputação por blocos em tempo, pico de
+    memória (tracemalloc) e erro relativo nos valores escondidos.
+    """
+    masked, truth = mask_known_values(df)
+    results = {"rows": len(df)}
+
+    if not skip_full:
+        imputed, elapsed, peak = _measure(lambda: KNNImputer(n_neighbors=n_neighbors).fit_transform(masked[IMPUTED_COLUMNS]))
+        results["knn_imputer"] = {"seconds": round(elapsed, 3), "peak_mb": round(peak, 1), **_errors(imputed, truth)}
+
+    for name, groups in [("blocks_property_type", ("property_type",)), ("blocks_single", ())]:
+        output, elapsed, peak = _measure(lambda: impute_knn_blocks(masked, IMPUTED_COLUMNS, n_neighbors, group_columns=groups))
+        results[name] = {"seconds": round(elapsed, 3), "peak_mb": round(peak, 1),
+                         **_errors(output[IMPUTED_COLUMNS].to_numpy(), truth)}
+    return results
+
+
+if __name__ == "__main__":
+    # Ex: python -m src.app_propieters_ml.benchmarks.knn_imputation --rows 5000 34000
+    #     python -m src.app_propieters_ml.benchmarks.knn_imputation --dataset ./src/app_propieters_ml/ml/datasets/properties
+    parser = argparse.ArgumentParser(description="Benchmark da imputação KNN do treino.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[5000, 20000], help="Tamanhos dos dados sintéticos.")
+    parser.add_argument("--dataset", help="Usa o snapshot Parquet da base no lugar dos dados sintéticos.")
+    parser.add_argument("--neighbors", type=int, default=30)
+    parser.add_argument("--skip-full", action="store_true", help="Não executa o KNNImputer (tamanhos grandes).")
+    args = parser.parse_args()
+
+    if args.dataset:
+        from src.app_propieters_ml.ml.dataset_export import load_properties_dataset
+
+        datasets = [clean_properties(load_properties_dataset(args.dataset, columns=["property_type", *IMPUTED_COLUMNS]))]
+    else:
+        datasets = [make_properties(n) for n in args.rows]
+
+    for data in datasets:
+        for key, value in run_benchmark(data, args.neighbors, args.skip_full).items():
+            print(f"{key:>22}: {value}")
+        print()
@@ -0,0 +1,94 @@
+from timeit import repeat
+from random import Random
+
+from src.app_propieters_ml.schemas.property_schema import PropertySchema, validate_properties
+
+import argparse
+import re
+
+# Regex sem pré-compilação, como no validador anterior do PropertySchema
+_LEGACY_FIELDS = ['price', 'price_condominium', 'iptu', 'area_m2', 'rooms', 'bathrooms', 'vacancies']
+
+
+def make_raw_properties(n: int, invalid_ratio: float = 0.02, seed: int = 42) -> list:
+    """
+    Gera `n` dicionários brutos no formato extraído dos cards, com uma fração inválida (sem área).
+    """
+    rng = Random(seed)
+    rows = []
+    for i in range(n):
+        row = {
+            "id": str(2790000000 + i),
+            "property_type": rng.choice(["apartamento", "casa", "quitinete", "sobrados"]),
+            "price": f"R$ {rng.randint(100, 3000)}.{rng.randint(0, 999):03d}",
+            "price_condominium": f"Cond. R$ {rng.randint(200, 2500)}",
+            "iptu": f"IPTU R$ {rng.randint(50, 900)},{rng.randint(0, 99):02d}",
+            "area_m2": f"{rng.randint(25, 400)} m²",
+            "rooms": str(rng.randint(1, 5)),
+            "bathrooms": str(rng.randint(1, 4)),
+            "vacancies": rng.choice(["0", "1", "2", 0]),
+            "city": "São Paulo",
+            "neighborhood": rng.choice(["Centro", "Moema", "Pinheiros", "Tatuapé"]),
+        }
+        if rng.random() < invalid_ratio:
+            del row["area_m2"]
+        rows.append(row)
+    return rows
+
+
+def legacy_clean(v):
+    # Limpeza anterior: junta todos os dígitos (perde os centavos)
+    if v is None or not isinstance(v, str):
+        return v
+    numeros = re.findall(r'\d+', v)
+    return "".join(numeros) if numeros else None
+
+
+def per_record_path(raw_properties: list) -> list:
+    """
+    Caminho anterior: limpeza com regex não compilada e um PropertySchema + model_dump por imóvel.
+    """
+    validated = []
+    for prop in raw_properties:
+        cleaned = {key: legacy_clean(value) if key in _LEGACY_FIELDS else value for key, value in prop.items()}
+        try:
+            validated.append(PropertySchema(**cleaned))
+        except Exception:
+            pass
+    return [prop.model_dump() for prop in validated]
+
+
+def bulk_path(raw_properties: list) -> list:
+    return validate_properties(raw_properties)[0]
+
+
+def run_benchmark(n: int = 10000, repeats: int = 5) -> dict:
+    """
+    Compara o caminho por imóvel com a validação em lote, em páginas de 30 imóveis e na lista inteira.
+
+    Returns:
+        dict: Melhor tempo (segundos) de cada caminho e o ganho do caminho em lote.
+    """
+    rows = make_raw_properties(n)
+    pages = [rows[i:i + 30] for i in range(0, n, 30)]
+
+    results = {
+        "rows": n,
+        "per_record_s": min(repeat(lambda: per_record_path(rows), number=1, repeat=repeats)),
+        "bulk_pages_s": min(repeat(lambda: [bulk_path(page) for page in pages], number=1, repeat=repeats)),
+        "bulk_all_s": min(repeat(lambda: bulk_path(rows), number=1, repeat=repeats)),
+    }
+    results["speedup_pages"] = round(results["per_record_s"] / results["bulk_pages_s"], 2)
+    results["speedup_all"] = round(results["per_record_s"] / results["bulk_all_s"], 2)
+    return results
+
+
+if __name__ == "__main__":
+    # Ex: python -m src.app_propieters_ml.benchmarks.property_validation --rows 10000
+    parser = argparse.ArgumentParser(description="Micro-benchmark da validação dos imóveis coletados.")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    for key, value in run_benchmark(args.rows, args.repeats).items():
+        print(f"{key:>15}: {value:.4f}" if isinstance(value, float) else f"{key:>15}: {value}")
@@ -0,0 +1,305 @@
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import statistics
+import subprocess
+import tempfile
+import argparse
+import platform
+import asyncio
+import time
+import json
+import sys
+import os
+
+# Variação relativa (piora) a partir da qual uma métrica é marcada como regressão
+DEFAULT_THRESHOLD = 0.10
+
+UPSERT_SIZES = [1000, 10000, 100000]
+
+
+def _metric(value: float, unit: str, better: str) -> dict:
+    # better: "lower" (latências, tempos) ou "higher" (vazão)
+    return {"value": round(float(value), 4), "unit": unit, "better": better}
+
+
+def _percentile(values: list, q: float) -> float:
+    return float(np.percentile(np.asarray(values), q))
+
+
+# Os módulos da aplicação são importados dentro de cada benchmark, assim o "compare" não carrega nada deles
+
+# --- Predição pela aplicação ASGI ---
+
+def _register_synthetic_model(registry_dir: str, rows: int = 5000, seed: int = 42) -> str:
+    """
+    Treina uma floresta pequena em dados sintéticos e a promove em um registro temporário.
+    """
+    from sklearn.ensemble import RandomForestRegressor
+    from src.app_propieters_ml.ml.feature_engineering import PROPERTY_TYPE_CATEGORIES, FeatureTransformer, TransformedModel
+    from src.app_propieters_ml.ml.model_registry import ModelRegistry
+
+    rng = np.random.default_rng(seed)
+    transformer = FeatureTransformer(standardize=True)
+    area = rng.integers(20, 400, rows)
+    rooms = rng.integers(0, 6, rows)
+    X = transformer.build(rng.choice(PROPERTY_TYPE_CATEGORIES, rows), area, rooms, rng.integers(1, 5, rows), rng.integers(0, 4, rows))
+    y = area * 6000.0 + rooms * 30000.0 + rng.normal(0, 50000, rows)
+
+    transformer.fit(X)
+    estimator = RandomForestRegressor(n_estimators=100, max_depth=12, random_state=seed, n_jobs=1)
+    estimator.fit(transformer.scale(X), y)
+
+    registry = ModelRegistry(registry_dir)
+    version = registry.register(TransformedModel(transformer, estimator), feature_names=transformer.feature_names, version="benchmark")
+    registry.promote(version)
+    return version
+
+
+def _random_payload(rng) -> dict:
+    return {
+        "property_type": str(rng.choice(["apartamento", "casa", "quitinete", "sobrados"])),
+        "area_m2": int(rng.integers(20, 400)),
+        "rooms": int(rng.integers(0, 6)),
+        "bathrooms": int(rng.integers(1, 5)),
+        "vacancies": int(rng.integers(0, 4)),
+    }
+
+
+async def _predict_requests(app, batcher, requests: int, concurrency: int, batch_rows: int, batches: int) -> dict:
+    import httpx
+
+    rng = np.random.default_rng(7)
+    metrics = {}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark") as client:
+        # Aquecimento (modelo, micro-batching e rotas)
+        for _ in range(20):
+            (await client.post("/predict", json=_random_payload(rng))).raise_for_status()
+
+        # Latência de uma requisição por vez
+        latencies = []
+        for _ in range(requests):
+            payload = _random_payload(rng)
+            started = time.perf_counter()
+            (await client.post("/predict", json=payload)).raise_for_status()
+            latencies.append((time.perf_counter() - started) * 1000)
+        metrics["predict.single.p50_ms"] = _metric(_percentile(latencies, 50), "ms", "lower")
+        metrics["predict.single.p95_ms"] = _metric(_percentile(latencies, 95), "ms", "lower")
+
+        # Vazão com `concurrency` requisições simultâneas (exercita o micro-batching)
+        semaphore = asyncio.Semaphore(concurrency)
+        payloads = [_random_payload(rng) for _ in range(requests)]
+
+        async def call(payload):
+            async with semaphore:
+                (await client.post("/predict", json=payload)).raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(call(payload) for payload in payloads))
+        metrics["predict.concurrent.requests_per_s"] = _metric(requests / (time.perf_counter() - started), "req/s", "higher")
+
+        # Lotes de `batch_rows` imóveis por requisição
+        batch_latencies = []
+        for _ in range(batches):
+            body = {"properties": [_random_payload(rng) for _ in range(batch_rows)]}
+            started = time.perf_counter()
+            (await client.post("/predict/batch", json=body)).raise_for_status()
+            batch_latencies.append(time.perf_counter() - started)
+        metrics["predict.batch.p50_ms"] = _metric(_percentile(batch_latencies, 50) * 1000, "ms", "lower")
+        metrics["predict.batch.rows_per_s"] = _metric(batch_rows / statistics.median(batch_latencies), "rows/s", "higher")
+
+    await batcher.close()
+    return metrics
+
+
+def bench_predict(requests: int = 500, concurrency: int = 32, batch_rows: int = 1000, batches: int = 20) -> dict:
+    """
+    Latência e vazão de /predict (uma linha, sequencial e concorrente) e /predict/batch,
+    chamando a aplicação ASGI em memória, com um modelo sintético em um registro temporário.
+    O cache de predições fica desligado para medir o caminho do modelo.
+    """
+    registry_dir = tempfile.mkdtemp(prefix="benchmark-registry-")
+    _register_synthetic_model(registry_dir)
+
+    # A aplicação lê a configuração na importação
+    os.environ["MODEL_REGISTRY_PATH"] = registry_dir
+    os.environ["PREDICT_CACHE_SIZE"] = "0"
+    from src.app_propieters_ml.api.main import app, prediction_batcher, model_manager
+
+    # O ASGITransport não executa a lifespan, que é onde a aplicação carrega o modelo
+    model_manager.check_for_update()
+
+    return asyncio.run(_predict_requests(app, prediction_batcher, requests, concurrency, batch_rows, batches))
+
+
+# --- Validação dos cards coletados ---
+
+def bench_validation(rows: int = 10000, repeats: int = 3) -> dict:
+    """
+    Vazão da validação por imóvel (PropertySchema) e em lote (validate_properties).
+    """
+    from src.app_propieters_ml.benchmarks import property_validation
+
+    results = property_validation.run_benchmark(rows, repeats)
+    return {
+        "validation.per_record.rows_per_s": _metric(rows / results["per_record_s"], "rows/s", "higher"),
+        "validation.bulk.rows_per_s": _metric(rows / results["bulk_all_s"], "rows/s", "higher"),
+        "validation.bulk_pages.rows_per_s": _metric(rows / results["bulk_pages_s"], "rows/s", "higher"),
+    }
+
+
+# --- Upsert no banco ---
+
+def bench_upsert(db_url: str = None, sizes: list = UPSERT_SIZES, chunk_size: int = 500) -> dict:
+    """
+    Vazão do upsert em blocos (inserção de imóveis novos e atualização dos mesmos ids) e
+    tempo de refazer o resumo de preços, para cada tamanho em `sizes`.
+
+    Sem `db_url` usa um SQLite temporário. Com PostgreSQL, use um banco descartável:
+    as tabelas de imóveis e do resumo são apagadas e recriadas a cada tamanho.
+    """
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from src.app_propieters_ml.core import property_repository, property_summary
+    from src.app_propieters_ml.schemas.property_schema import validate_properties
+    from src.app_propieters_ml.benchmarks import property_validation
+
+    db_url = db_url or f"sqlite:///{Path(tempfile.mkdtemp(prefix='benchmark-db-')) / 'benchmark.db'}"
+    engine = create_engine(db_url)
+    session_factory = sessionmaker(bind=engine)
+    tables = [property_summary.properties_table, property_summary.summary_table]
+
+    metrics = {}
+    for size in sizes:
+        for table in reversed(tables):
+            table.drop(engine, checkfirst=True)
+        for table in tables:
+            table.create(engine)
+
+        rows, _ = validate_properties(property_validation.make_raw_properties(size, invalid_ratio=0))
+
+        started = time.perf_counter()
+        property_repository.upsert_in_chunks(session_factory, rows, chunk_size, refresh_summary=False)
+        metrics[f"upsert.insert.{size}.rows_per_s"] = _metric(size / (time.perf_counter() - started), "rows/s", "higher")
+
+        for row in rows:
+            row["price"] = row["price"] * 1.01
+        started = time.perf_counter()
+        property_repository.upsert_in_chunks(session_factory, rows, chunk_size, refresh_summary=False)
+        metrics[f"upsert.update.{size}.rows_per_s"] = _metric(size / (time.perf_counter() - started), "rows/s", "higher")
+
+        started = time.perf_counter()
+        with session_factory() as session:
+            property_summary.refresh_summary(session)
+            session.commit()
+        metrics[f"upsert.summary_refresh.{size}.s"] = _metric(time.perf_counter() - started, "s", "lower")
+
+    engine.dispose()
+    return metrics
+
+
+# --- Execução e comparação ---
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(only: list = None, db_url: str = None, sizes: list = UPSERT_SIZES, quick: bool = False) -> dict:
+    """
+    Executa os benchmarks escolhidos (predict, validation, upsert) e retorna o resultado no formato salvo em JSON.
+    """
+    only = only or ["predict", "validation", "upsert"]
+    metrics = {}
+    timings = {}
+
+    for name in only:
+        started = time.perf_counter()
+        if name == "predict":
+            metrics.update(bench_predict(requests=100 if quick else 500, batches=5 if quick else 20))
+        elif name == "validation":
+            metrics.update(bench_validation(rows=2000 if quick else 10000))
+        elif name == "upsert":
+            metrics.update(bench_upsert(db_url, sizes=[min(size, 10000) for size in sizes] if quick else sizes))
+        timings[name] = round(time.perf_counter() - started, 2)
+
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "quick": quick,
+            "suite_seconds": timings,
+        },
+        "metrics": metrics,
+    }
+
+
+def compare_results(baseline: dict, current: dict, threshold: float = DEFAULT_THRESHOLD) -> list:
+    """
+    Compara duas execuções métrica a métrica.
+
+    Returns:
+        list: Um dicionário por métrica da linha de base, com a variação relativa
+        (positiva = melhora) e o status "regression", "improvement" ou "ok". Métricas
+        ausentes na execução atual (benchmark que quebrou ou foi renomeado) têm o status "missing".
+    """
+    rows = []
+    for name, base in baseline["metrics"].items():
+        new = current["metrics"].get(name)
+        if new is None:
+            rows.append({"metric": name, "baseline": base["value"], "current": None, "unit": base["unit"],
+                         "change": None, "status": "missing"})
+            continue
+        if base["value"] == 0:
+            continue
+        change = (new["value"] - base["value"]) / base["value"]
+        if base["better"] == "lower":
+            change = -change
+        status = "regression" if change < -threshold else "improvement" if change > threshold else "ok"
+        rows.append({"metric": name, "baseline": base["value"], "current": new["value"], "unit": base["unit"],
+                     "change": round(change, 4), "status": status})
+    return rows
+
+
+if __name__ == "__main__":
+    # Ex: python -m src.app_propieters_ml.benchmarks.suite run --output bench_main.json
+    #     python -m src.app_propieters_ml.benchmarks.suite compare bench_main.json bench_branch.json
+    parser = argparse.ArgumentParser(description="Benchmarks offline de predição, validação e upsert.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Executa os benchmarks e salva o resultado em JSON.")
+    run_parser.add_argument("--output", required=True)
+    run_parser.add_argument("--only", nargs="+", choices=["predict", "validation", "upsert"])
+    run_parser.add_argument("--db-url", help="Banco descartável para o upsert (padrão: SQLite temporário).")
+    run_parser.add_argument("--sizes", type=int, nargs="+", default=UPSERT_SIZES)
+    run_parser.add_argument("--quick", action="store_true", help="Menos repetições e no máximo 10k linhas no upsert.")
+
+    compare_parser = commands.add_parser("compare", help="Compara duas execuções e aponta regressões.")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Piora relativa tolerada (0.10 = 10%%).")
+
+    args = parser.parse_args()
+
+    if args.command == "run":
+        result = run_suite(args.only, args.db_url, args.sizes, args.quick)
+        Path(args.output).write_text(json.dumps(result, indent=2), encoding="utf-8")
+        for name, metric in result["metrics"].items():
+            print(f"{name:<40} {metric['value']:>14.4f} {metric['unit']}")
+    else:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        current = json.loads(Path(args.current).read_text(encoding="utf-8"))
+        rows = compare_results(baseline, current, args.threshold)
+        for row in rows:
+            if row["status"] == "missing":
+                print(f"{row['metric']:<40} {row['baseline']:>14.4f} -> {'-':>14} {row['unit']:<7} {'':>6} {row['status']}")
+                continue
+            print(f"{row['metric']:<40} {row['baseline']:>14.4f} -> {row['current']:>14.4f} {row['unit']:<7} {row['change']:+.1%} {row['status']}")
+        # Código de saída 1 quando há regressão ou métrica ausente, para uso em CI
+        sys.exit(1 if any(row["status"] in ("regression", "missing") for row in rows) else 0)
@@ -0,0 +1,118 @@
+from sqlalchemy import select, update
+
+from src.app_propieters_ml.models.crawl_state_model import CrawlState
+from src.app_propieters_ml.core.property_repository import properties_table
+from src.app_propieters_ml.schemas.property_schema import PropertySchema
+
+import threading
+import hashlib
+import logging
+
+# Crie uma instância do logger para este módulo
+logger = logging.getLogger(__name__)
+
+crawl_state_table = CrawlState.__table__
+
+# Campos que definem o conteúdo de um anúncio (tudo menos o id)
+HASHED_FIELDS = [name for name in PropertySchema.model_fields if name != "id"]
+
+
+def content_hash(row) -> int:
+    """
+    Calcula um hash de 64 bits do conteúdo de um imóvel.
+
+    Aceita tanto um dicionário validado pelo PropertySchema quanto uma linha lida do
+    banco (Numeric chega como Decimal), normalizando os números para o mesmo valor.
+    """
+    values = []
+    for name in HASHED_FIELDS:
+        value = row[name]
+        if value is not None and not isinstance(value, (str, int)):
+            value = float(value)
+        values.append(value)
+    digest = hashlib.blake2b(repr(values).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+class KnownPropertyIndex:
+    """
+    Índice em memória dos imóveis já salvos: id -> hash do conteúdo.
+
+    Carregado do banco no início de cada job de coleta, permite descartar os anúncios
+    já conhecidos e sem alteração antes de qualquer escrita no banco.
+    """
+
+    def __init__(self, hashes: dict = None):
+        self._hashes = dict(hashes or {})
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._hashes)
+
+    @classmethod
+    def load(cls, session, batch_size: int = 10000):
+        """
+        Lê id e conteúdo de todos os imóveis do banco, em lotes, e monta o índice.
+        """
+        stmt = select(properties_table.c.id, *(properties_table.c[name] for name in HASHED_FIELDS))
+        result = session.execute(stmt, execution_options={"yield_per": batch_size}).mappings()
+
+        hashes = {}
+        for partition in result.partitions():
+            for row in partition:
+                hashes[row["id"]] = content_hash(row)
+
+        logger.info(f"Índice de imóveis conhecidos carregado com {len(hashes)} ids.")
+        return cls(hashes)
+
+    def split(self, rows: list):
+        """
+        Separa os imóveis de uma página entre novos/alterados e conhecidos sem alteração.
+
+        Returns:
+            tuple: (lista de imóveis novos ou alterados, quantidade de ids já conhecidos na página)
+        """
+        changed = []
+        known = 0
+        with self._lock:
+            for row in rows:
+                stored = self._hashes.get(row["id"])
+                if stored is not None:
+                    known += 1
+                if stored != content_hash(row):
+                    changed.append(row)
+        return changed, known
+
+    def add(self, rows: list):
+        # Registra os imóveis recém salvos, para que repetições em páginas seguintes sejam ignoradas
+        with self._lock:
+            for row in rows:
+                self._hashes[row["id"]] = content_hash(row)
+
+
+def get_crawl_state(session, property_type: str):
+    row = session.execute(
+        select(crawl_state_table).where(crawl_state_table.c.property_type == property_type)
+    ).mappings().first()
+    return dict(row) if row is not None else None
+
+
+def list_crawl_states(session) -> list:
+    rows = session.execute(select(crawl_state_table).order_by(crawl_state_table.c.property_type)).mappings().all()
+    return [dict(row) for row in rows]
+
+
+def save_crawl_state(session, property_type: str, last_page: int, last_run_changed: int):
+    """
+    Grava a última página alcançada pela coleta do tipo de imóvel. O commit fica a cargo de quem chama.
+
+    Com `last_page` None, somente a contagem de anúncios alterados é atualizada.
+    """
+    values = {"last_run_changed": last_run_changed}
+    if last_page is not None:
+        values["last_page"] = last_page
+    result = session.execute(
+        update(crawl_state_table).where(crawl_state_table.c.property_type == property_type).values(**values)
+    )
+    if result.rowcount == 0:
+        session.execute(crawl_state_table.insert().values(property_type=property_type, **{"last_page": 0, **values}))
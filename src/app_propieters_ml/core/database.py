@@ -1,9 +1,11 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.engine import URL # Importamos a classe URL
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
 
+import threading
 import os
 
 # Carregamento das variaveis de ambiente
@@ -18,9 +20,83 @@ db_url = URL.create(
     port=os.getenv("DB_PORT"),
     database=os.getenv("DB_NAME")
 )
+# Mesmo banco com o driver assíncrono, usado pelos endpoints da API
+async_db_url = db_url.set(drivername="postgresql+asyncpg")
+
+# Configuração do pool de conexões, aplicada às duas engines
+# DB_POOL_SIZE -> conexões mantidas abertas; DB_MAX_OVERFLOW -> conexões extras em picos
+# DB_POOL_TIMEOUT -> segundos esperando uma conexão livre; DB_POOL_RECYCLE -> idade máxima de uma conexão em segundos
+# DB_POOL_PRE_PING -> testa a conexão antes de usar (evita erros com conexões derrubadas pelo servidor)
+POOL_OPTIONS = {
+    "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+    "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+    "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+    "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+    "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes"),
+}
 
 # O create_engine aceita tanto a string quanto o objeto URL
-engine = create_engine(db_url)
+# Engine síncrona: jobs de coleta, exportação do dataset e criação das tabelas
+engine = create_engine(db_url, **POOL_OPTIONS)
+# Engine assíncrona: consultas feitas pelos endpoints, sem bloquear o event loop
+async_engine = create_async_engine(async_db_url, **POOL_OPTIONS)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
\ No newline at end of file
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+Base = declarative_base()
+
+
+# --- Métricas de uso dos pools ---
+_pool_counters = {}
+_pool_counters_lock = threading.Lock()
+
+
+def track_pool(name: str, sync_engine):
+    """
+    Registra eventos no pool da engine para contar empréstimos de conexões e o pico de uso.
+    """
+    pool = sync_engine.pool
+    counters = _pool_counters[name] = {"pool": pool, "checkouts": 0, "peak_checked_out": 0, "connects": 0}
+
+    @event.listens_for(pool, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        with _pool_counters_lock:
+            counters["connects"] += 1
+
+    @event.listens_for(pool, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        with _pool_counters_lock:
+            counters["checkouts"] += 1
+            counters["peak_checked_out"] = max(counters["peak_checked_out"], pool.checkedout())
+
+
+track_pool("sync", engine)
+track_pool("async", async_engine.sync_engine)
+
+
+def pool_stats() -> dict:
+    """
+    Retorna o uso atual de cada pool de conexões.
+
+    `utilization` é a fração das conexões possíveis (pool_size + max_overflow) em uso agora;
+    valores perto de 1 indicam que novas requisições vão esperar por uma conexão.
+    """
+    stats = {}
+    with _pool_counters_lock:
+        for name, counters in _pool_counters.items():
+            pool = counters["pool"]
+            max_connections = pool.size() + max(POOL_OPTIONS["max_overflow"], 0)
+            checked_out = pool.checkedout()
+            stats[name] = {
+                "pool_size": pool.size(),
+                "max_overflow": POOL_OPTIONS["max_overflow"],
+                "checked_out": checked_out,
+                "checked_in": pool.checkedin(),
+                # O QueuePool informa overflow negativo enquanto o pool ainda não abriu todas as conexões
+                "overflow": max(pool.overflow(), 0),
+                "utilization": round(checked_out / max_connections, 3) if max_connections else 0.0,
+                "peak_checked_out": counters["peak_checked_out"],
+                "checkouts": counters["checkouts"],
+                "connects": counters["connects"],
+            }
+    return stats
@@ -0,0 +1,234 @@
+from contextlib import contextmanager
+from time import perf_counter
+
+import threading
+import bisect
+import logging
+
+# Crie uma instância do logger para este módulo
+logger = logging.getLogger(__name__)
+
+# Limites (em segundos) dos buckets dos histogramas de tempo: de 1 ms a 60 s
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames: tuple, values: tuple, extra: str = None) -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra is not None:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    """
+    Contador monotônico com labels, no formato de contador do Prometheus.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        if amount <= 0:
+            return
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> list:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in items]
+
+
+class Histogram:
+    """
+    Histograma com buckets fixos e labels, no formato de histograma do Prometheus.
+
+    Cada observação custa uma busca binária nos buckets e um incremento sob lock, o que
+    mantém o custo por requisição na casa de microssegundos.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # [contagem por bucket (o último é +Inf), soma, contagem total]
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(perf_counter() - started, **labels)
+
+    def samples(self) -> list:
+        with self._lock:
+            items = sorted((key, [list(series[0]), series[1], series[2]]) for key, series in self._series.items())
+
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class GaugeCallback:
+    """
+    Gauge lido na hora da coleta: `func` retorna {tupla de valores dos labels: valor}.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, func, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.func = func
+
+    def samples(self) -> list:
+        try:
+            values = self.func()
+        except Exception as e:
+            logger.warning(f"Falha ao ler o gauge {self.name}: {e}")
+            return []
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in sorted(values.items())]
+
+
+class MetricsRegistry:
+    """
+    Conjunto das métricas da aplicação, renderizado no formato texto do Prometheus (versão 0.0.4).
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            # Registrar o mesmo nome de novo devolve a métrica existente (ex: módulo recarregado)
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge_callback(self, name: str, documentation: str, func, labelnames: tuple = ()) -> GaugeCallback:
+        with self._lock:
+            metric = self._metrics[name] = GaugeCallback(name, documentation, func, labelnames)
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+# Registro padrão, usado pela API, pelo scraper e pelos jobs de coleta
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds", "Duração das requisições HTTP por rota.", ("method", "route", "status"),
+)
+STAGE_SECONDS = REGISTRY.histogram(
+    "app_stage_duration_seconds", "Duração das etapas internas (features, modelo, scraper, validação, banco).", ("stage",),
+)
+SCRAPER_ROWS = REGISTRY.counter(
+    "scraper_rows_total", "Anúncios por resultado: scraped, rejected, deduplicated, unchanged.", ("outcome",),
+)
+SCRAPER_PAGES = REGISTRY.counter(
+    "scraper_pages_total", "Páginas de resultados por resultado do carregamento (ok, slow, captcha, ...).", ("outcome",),
+)
+DB_ROWS_UPSERTED = REGISTRY.counter(
+    "db_rows_upserted_total", "Imóveis enviados ao banco pelo upsert.",
+)
+
+
+def span(stage: str):
+    """
+    Mede o bloco `with span("etapa"):` no histograma app_stage_duration_seconds.
+    """
+    return STAGE_SECONDS.time(stage=stage)
+
+
+def observe_stage(stage: str, seconds: float):
+    STAGE_SECONDS.observe(seconds, stage=stage)
+
+
+class TimingMiddleware:
+    """
+    Middleware ASGI que mede cada requisição HTTP até o último byte da resposta
+    (inclusive respostas em streaming) e registra no histograma por rota.
+
+    O label `route` usa o caminho declarado (ex: /collect-data/jobs/{job_id}), não a
+    URL recebida, para não criar uma série por id.
+    """
+
+    def __init__(self, app, histogram: Histogram = HTTP_REQUEST_SECONDS):
+        self.app = app
+        self.histogram = histogram
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            self.histogram.observe(
+                perf_counter() - started,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=status["code"],
+            )
@@ -0,0 +1,102 @@
+from sqlalchemy import select, func, inspect, text
+
+from src.app_propieters_ml.core.database import Base, SessionLocal
+from src.app_propieters_ml.core import property_summary
+# Importa todos os models para que as tabelas estejam registradas no Base.metadata
+from src.app_propieters_ml.models import property_model, property_summary_model, scrape_job_model, crawl_state_model
+
+import argparse
+import logging
+
+# Configurando o logging
+logging.basicConfig(
+    level=logging.INFO, # Nível mínimo para exibir
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S',
+)
+
+# Crie uma instância do logger para este módulo
+logger = logging.getLogger(__name__)
+
+
+def run_migrations(engine, session_factory=SessionLocal):
+    """
+    Deixa o banco no esquema atual dos models. Pode ser executada a cada subida da aplicação.
+
+    1. Cria as tabelas que ainda não existem (create_all).
+    2. Cria os índices declarados nos models que faltam em tabelas já existentes
+       (o create_all não altera tabelas existentes), com verificação prévia de existência.
+    3. Dá a `properties.updated_at` o valor padrão na inserção, em tabelas criadas antes dele.
+    4. Adiciona as colunas de lease a `scrape_jobs`, em tabelas criadas antes delas.
+    5. Preenche o resumo de preços na primeira vez, quando ele está vazio e já existem imóveis.
+    """
+    Base.metadata.create_all(bind=engine)
+
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
+
+        migrate_properties_updated_at(connection)
+        migrate_scrape_jobs_lease(connection)
+
+    with session_factory() as session:
+        has_summary = session.execute(select(func.count()).select_from(property_summary.summary_table)).scalar()
+        has_properties = session.execute(select(property_summary.properties_table.c.id).limit(1)).first()
+        if not has_summary and has_properties:
+            logger.info("Resumo de preços vazio: calculando a partir da tabela de imóveis...")
+            property_summary.refresh_summary(session)
+            session.commit()
+
+    logger.info("Migrações do banco aplicadas.")
+
+
+def migrate_properties_updated_at(connection):
+    """
+    Em tabelas criadas sem o server_default de `updated_at`, cria o padrão e preenche as
+    linhas antigas com a data e hora de coleta, para que toda linha tenha a marca d'água
+    usada pelas exportações incrementais.
+    """
+    if connection.dialect.name != "postgresql":
+        return
+
+    columns = {column["name"]: column for column in inspect(connection).get_columns("properties")}
+    if columns["updated_at"].get("default") is not None:
+        return
+
+    logger.info("Adicionando o valor padrão de properties.updated_at e preenchendo as linhas antigas...")
+    connection.execute(text("ALTER TABLE properties ALTER COLUMN updated_at SET DEFAULT now()"))
+    connection.execute(text(
+        "UPDATE properties SET updated_at = collection_date + COALESCE(collection_time, TIME '00:00') "
+        "WHERE updated_at IS NULL AND collection_date IS NOT NULL"
+    ))
+    connection.execute(text("UPDATE properties SET updated_at = now() WHERE updated_at IS NULL"))
+
+
+def migrate_scrape_jobs_lease(connection):
+    """
+    Adiciona as colunas `lease_owner` e `lease_until` à tabela `scrape_jobs` quando ela foi
+    criada antes delas (o create_all não altera tabelas existentes).
+    """
+    existing = {column["name"] for column in inspect(connection).get_columns("scrape_jobs")}
+    table = scrape_job_model.ScrapeJob.__table__
+    for name in ("lease_owner", "lease_until"):
+        if name in existing:
+            continue
+        logger.info(f"Adicionando a coluna scrape_jobs.{name}...")
+        column_type = table.c[name].type.compile(dialect=connection.dialect)
+        connection.execute(text(f"ALTER TABLE scrape_jobs ADD COLUMN {name} {column_type}"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aplica as migrações do banco (tabelas, índices e resumo de preços).")
+    parser.add_argument("--rebuild-summary", action="store_true", help="Refaz o resumo de preços inteiro.")
+    args = parser.parse_args()
+
+    from src.app_propieters_ml.core.database import engine
+
+    run_migrations(engine)
+    if args.rebuild_summary:
+        with SessionLocal() as session:
+            property_summary.refresh_summary(session)
+            session.commit()
@@ -0,0 +1,117 @@
+from collections import Counter
+from time import monotonic
+
+import threading
+import logging
+import sys
+
+# Crie uma instância do logger para este módulo
+logger = logging.getLogger(__name__)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Profiler por amostragem para o tráfego real: uma thread lê a pilha de todas as outras
+    threads (sys._current_frames) a cada `interval` segundos e conta as pilhas iguais.
+
+    O resultado sai no formato "collapsed" (uma pilha por linha, frames separados por ';'
+    seguidos da contagem), que o flamegraph.pl, o speedscope e o inferno leem direto.
+    Nada é medido enquanto o profiler está parado, então o custo fora da captura é zero.
+    """
+
+    def __init__(self, max_stack_depth: int = 128):
+        self.max_stack_depth = max_stack_depth
+        self._stacks = Counter()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.interval = None
+        self.samples = 0
+        self.started_at = None
+        self.stopped_at = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval: float = 0.01, duration: float = None):
+        """
+        Inicia uma nova captura, descartando a anterior.
+
+        Args:
+            interval (float): Segundos entre as amostras.
+            duration (float): Para sozinho depois desse tempo. None captura até `stop`.
+        """
+        if self.running:
+            raise RuntimeError("O profiler já está em execução.")
+
+        with self._lock:
+            self._stacks = Counter()
+            self.samples = 0
+        self.interval = interval
+        self.started_at = monotonic()
+        self.stopped_at = None
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, args=(duration,), name="sampling-profiler", daemon=True)
+        self._thread.start()
+        logger.info(f"Profiler por amostragem iniciado (intervalo de {interval * 1000:.1f} ms).")
+
+    def stop(self) -> str:
+        """
+        Para a captura (se estiver rodando) e retorna as pilhas no formato collapsed.
+        """
+        thread = self._thread
+        if thread is not None:
+            self._stop_event.set()
+            thread.join()
+        return self.collapsed()
+
+    def _run(self, duration: float):
+        own_id = threading.get_ident()
+        deadline = None if duration is None else monotonic() + duration
+        try:
+            while not self._stop_event.wait(self.interval):
+                self._sample(own_id)
+                if deadline is not None and monotonic() >= deadline:
+                    break
+        finally:
+            self.stopped_at = monotonic()
+            logger.info(f"Profiler por amostragem parado ({self.samples} amostras).")
+
+    def _sample(self, own_id: int):
+        stacks = []
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            labels = []
+            while frame is not None and len(labels) < self.max_stack_depth:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            # Raiz primeiro, como o formato collapsed espera
+            stacks.append(";".join(reversed(labels)))
+
+        with self._lock:
+            self._stacks.update(stacks)
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        with self._lock:
+            items = self._stacks.most_common()
+        return "".join(f"{stack} {count}\n" for stack, count in items)
+
+    def status(self) -> dict:
+        end = self.stopped_at if self.stopped_at is not None else monotonic()
+        with self._lock:
+            distinct_stacks = len(self._stacks)
+        return {
+            "running": self.running,
+            "interval_ms": None if self.interval is None else round(self.interval * 1000, 3),
+            "samples": self.samples,
+            "distinct_stacks": distinct_stacks,
+            "seconds": None if self.started_at is None else round(end - self.started_at, 3),
+        }
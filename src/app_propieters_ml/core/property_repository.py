@@ -0,0 +1,165 @@
+from sqlalchemy import select, func
+from sqlalchemy.dialects import postgresql, sqlite
+from decimal import Decimal
+from datetime import date
+
+from src.app_propieters_ml.models import property_model
+from src.app_propieters_ml.core import property_summary
+from src.app_propieters_ml.core.metrics import SCRAPER_ROWS, DB_ROWS_UPSERTED, span
+from src.app_propieters_ml.schemas.property_schema import PropertySchema
+
+import json
+
+# Colunas mantidas quando um imóvel já existente é coletado de novo
+UPSERT_IMMUTABLE_COLUMNS = ["id", "collection_date", "collection_time"]
+
+# Tabela de imóveis e as colunas expostas pela API (as mesmas do PropertySchema)
+properties_table = property_model.Property.__table__
+EXPORT_COLUMNS = [properties_table.c[name] for name in PropertySchema.model_fields]
+
+
+def build_properties_query(property_type: str = None, city: str = None, date_from: date = None,
+                           date_to: date = None, after_id: str = None, limit: int = None):
+    """
+    Monta o SELECT de imóveis com filtros opcionais e paginação por chave (keyset) no `id`.
+
+    A paginação por chave usa `id > after_id ORDER BY id`, que segue o índice da
+    chave primária e tem custo constante por página, ao contrário de OFFSET.
+
+    Args:
+        property_type (str): Filtra pelo tipo de imóvel.
+        city (str): Filtra pela cidade.
+        date_from (date): Data de coleta inicial (inclusiva).
+        date_to (date): Data de coleta final (inclusiva).
+        after_id (str): Retorna somente imóveis com id maior que este (cursor da página anterior).
+        limit (int): Quantidade máxima de linhas.
+
+    Returns:
+        Select: A consulta pronta para ser executada.
+    """
+    stmt = select(*EXPORT_COLUMNS)
+
+    if property_type is not None:
+        stmt = stmt.where(properties_table.c.property_type == property_type)
+    if city is not None:
+        stmt = stmt.where(properties_table.c.city == city)
+    if date_from is not None:
+        stmt = stmt.where(properties_table.c.collection_date >= date_from)
+    if date_to is not None:
+        stmt = stmt.where(properties_table.c.collection_date <= date_to)
+    if after_id is not None:
+        stmt = stmt.where(properties_table.c.id > after_id)
+
+    stmt = stmt.order_by(properties_table.c.id)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+
+    return stmt
+
+
+def _json_default(value):
+    # Numeric do Postgre chega como Decimal; datas e horas viram texto ISO
+    if isinstance(value, Decimal):
+        return float(value)
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    raise TypeError(f"Tipo não serializável: {type(value).__name__}")
+
+
+async def stream_properties_ndjson(async_engine, stmt, yield_per: int = 1000):
+    """
+    Executa a consulta com cursor do lado do servidor e gera o resultado em NDJSON
+    (um objeto JSON por linha), à medida que as linhas chegam do banco.
+
+    Nenhum objeto ORM ou modelo Pydantic é criado por linha: cada lote de `yield_per`
+    linhas vira um único bloco de texto enviado ao cliente. A leitura é assíncrona, então
+    uma exportação grande não bloqueia o event loop nem uma thread do servidor.
+
+    Args:
+        async_engine (AsyncEngine): Engine assíncrona do SQLAlchemy usada para abrir uma conexão própria.
+        stmt (Select): Consulta montada por build_properties_query.
+        yield_per (int): Quantidade de linhas buscadas do cursor por vez.
+
+    Yields:
+        str: Blocos de linhas NDJSON.
+    """
+    # A conexão é aberta aqui (e não pela dependência get_async_db) porque a resposta
+    # continua sendo enviada depois que o handler do endpoint retorna
+    async with async_engine.connect() as connection:
+        result = await connection.stream(stmt.execution_options(yield_per=yield_per))
+        async for partition in result.mappings().partitions():
+            yield "".join(json.dumps(dict(row), default=_json_default, ensure_ascii=False) + "\n" for row in partition)
+
+
+def upsert_properties(session, properties: list) -> int:
+    """
+    Insere os imóveis coletados, atualizando os que já existem no banco.
+
+    Imóveis repetidos na lista (anúncios que aparecem em mais de uma página) são
+    reduzidos a um por id, mantendo a última ocorrência. O commit fica a cargo de
+    quem chama.
+
+    Args:
+        session (Session): Sessão do SQLAlchemy.
+        properties (list): Lista de dicionários validados pelo PropertySchema.
+
+    Returns:
+        int: Quantidade de imóveis únicos enviados ao banco.
+    """
+    # Usa um dicionario para garantir que cada ID sejá único, mantendo a ultima ocorrencia
+    unique_properties = {prop["id"]: prop for prop in properties}
+    SCRAPER_ROWS.inc(len(properties) - len(unique_properties), outcome="deduplicated")
+    if not unique_properties:
+        return 0
+
+    # INSERT ... ON CONFLICT do PostgreSQL; o SQLite aceita a mesma sintaxe (usado nos benchmarks offline)
+    dialect_insert = sqlite.insert if session.get_bind().dialect.name == "sqlite" else postgresql.insert
+    stmt = dialect_insert(properties_table).values(list(unique_properties.values()))
+
+    # Caso tenha dados de ID duplicados, iremos somente alterar as outras colunas menos a de id, data de coleta e hora de coleta
+    update_dict = {
+        col.name: col
+        for col in stmt.excluded
+        if col.name not in UPSERT_IMMUTABLE_COLUMNS
+    }
+    # O onupdate da coluna não vale no ON CONFLICT DO UPDATE: marcamos a atualização aqui
+    # (marca d'água das exportações incrementais e da sincronização do índice de comparáveis)
+    update_dict["updated_at"] = func.current_timestamp()
+
+    # index_elements=['id'] -> o conflito é na coluna 'id'; set_ -> campos atualizados no conflito
+    session.execute(stmt.on_conflict_do_update(index_elements=["id"], set_=update_dict))
+    return len(unique_properties)
+
+
+def upsert_in_chunks(session_factory, properties: list, chunk_size: int = 500, refresh_summary: bool = True) -> int:
+    """
+    Salva os imóveis em blocos de `chunk_size` linhas, cada bloco na sua própria transação.
+
+    Mantém o tamanho de cada INSERT (e a quantidade de parâmetros enviados ao banco)
+    limitado, e um erro em um bloco não desfaz os blocos já confirmados. Na mesma
+    transação, recalcula o resumo de preços somente dos grupos tocados pelo bloco.
+
+    Args:
+        session_factory (callable): Cria sessões do SQLAlchemy (ex: SessionLocal).
+        properties (list): Lista de dicionários validados pelo PropertySchema.
+        chunk_size (int): Quantidade máxima de linhas por transação.
+        refresh_summary (bool): Atualiza a tabela property_summary junto com o bloco.
+
+    Returns:
+        int: Quantidade de imóveis enviados ao banco.
+    """
+    total = 0
+    for start in range(0, len(properties), chunk_size):
+        chunk = properties[start:start + chunk_size]
+        with session_factory() as session, span("db_write"):
+            if refresh_summary:
+                # Grupos atuais dos imóveis no banco (antes da alteração) e os grupos novos
+                groups = property_summary.groups_of_ids(session, [prop["id"] for prop in chunk])
+                groups.update(property_summary.group_key(prop) for prop in chunk)
+            upserted = upsert_properties(session, chunk)
+            if refresh_summary:
+                property_summary.refresh_summary(session, groups)
+            session.commit()
+        DB_ROWS_UPSERTED.inc(upserted)
+        total += upserted
+    return total
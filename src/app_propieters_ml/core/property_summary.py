@@ -0,0 +1,179 @@
+from sqlalchemy import select, delete, func, case, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from collections import defaultdict
+from statistics import median
+
+from src.app_propieters_ml.models.property_model import Property
+from src.app_propieters_ml.models.property_summary_model import PropertySummary
+
+import logging
+
+# Crie uma instância do logger para este módulo
+logger = logging.getLogger(__name__)
+
+properties_table = Property.__table__
+summary_table = PropertySummary.__table__
+
+# Colunas que definem um grupo do resumo
+GROUP_COLUMNS = ("city", "neighborhood", "property_type")
+
+# Quantidade máxima de grupos por comando (limita os parâmetros do IN)
+GROUPS_PER_STATEMENT = 500
+
+
+def group_key(row) -> tuple:
+    return tuple(row[name] for name in GROUP_COLUMNS)
+
+
+def groups_of_ids(session, ids: list) -> set:
+    """
+    Retorna os grupos (cidade, bairro, tipo) em que os imóveis com esses ids estão hoje no banco.
+
+    Usado antes de um upsert: se um anúncio mudar de bairro ou de tipo, o grupo antigo também
+    precisa ser recalculado.
+    """
+    if not ids:
+        return set()
+    stmt = (
+        select(*(properties_table.c[name] for name in GROUP_COLUMNS))
+        .where(properties_table.c.id.in_(ids))
+        .distinct()
+    )
+    return {tuple(row) for row in session.execute(stmt)}
+
+
+def _group_filter(groups: list):
+    return tuple_(*(properties_table.c[name] for name in GROUP_COLUMNS)).in_(groups)
+
+
+def _aggregate_postgres(session, groups: list = None) -> list:
+    # Preço por m² somente para imóveis com área; NULL é ignorado pelas agregações
+    price_m2 = case((properties_table.c.area_m2 > 0, properties_table.c.price / properties_table.c.area_m2))
+    stmt = select(
+        *(properties_table.c[name] for name in GROUP_COLUMNS),
+        func.count().label("properties_count"),
+        func.avg(properties_table.c.price).label("price_avg"),
+        func.percentile_cont(0.5).within_group(properties_table.c.price).label("price_median"),
+        func.avg(price_m2).label("price_m2_avg"),
+        func.percentile_cont(0.5).within_group(price_m2).label("price_m2_median"),
+        func.avg(properties_table.c.area_m2).label("area_m2_avg"),
+        func.max(properties_table.c.collection_date).label("last_collection_date"),
+    ).group_by(*(properties_table.c[name] for name in GROUP_COLUMNS))
+    if groups is not None:
+        stmt = stmt.where(_group_filter(groups))
+    return [dict(row) for row in session.execute(stmt).mappings()]
+
+
+def _aggregate_python(session, groups: list = None) -> list:
+    # Outros bancos (ex: SQLite) não têm percentile_cont: as medianas são calculadas aqui
+    stmt = select(
+        *(properties_table.c[name] for name in GROUP_COLUMNS),
+        properties_table.c.price,
+        properties_table.c.area_m2,
+        properties_table.c.collection_date,
+    )
+    if groups is not None:
+        stmt = stmt.where(_group_filter(groups))
+
+    grouped = defaultdict(list)
+    for row in session.execute(stmt).mappings():
+        grouped[group_key(row)].append(row)
+
+    aggregates = []
+    for key, rows in grouped.items():
+        prices = [float(row["price"]) for row in rows]
+        prices_m2 = [float(row["price"]) / row["area_m2"] for row in rows if row["area_m2"] > 0]
+        dates = [row["collection_date"] for row in rows if row["collection_date"] is not None]
+        aggregates.append({
+            **dict(zip(GROUP_COLUMNS, key)),
+            "properties_count": len(rows),
+            "price_avg": round(sum(prices) / len(prices), 2),
+            "price_median": round(median(prices), 2),
+            "price_m2_avg": round(sum(prices_m2) / len(prices_m2), 2) if prices_m2 else None,
+            "price_m2_median": round(median(prices_m2), 2) if prices_m2 else None,
+            "area_m2_avg": round(sum(row["area_m2"] for row in rows) / len(rows), 2),
+            "last_collection_date": max(dates) if dates else None,
+        })
+    return aggregates
+
+
+def _aggregate(session, groups: list = None) -> list:
+    if session.get_bind().dialect.name == "postgresql":
+        return _aggregate_postgres(session, groups)
+    return _aggregate_python(session, groups)
+
+
+def _upsert_summary(session, aggregates: list):
+    # INSERT ... ON CONFLICT: dois escritores recalculando o mesmo grupo (jobs simultâneos ou o
+    # refresh completo) não colidem na chave primária, o último a confirmar prevalece
+    if not aggregates:
+        return
+    dialect_insert = sqlite.insert if session.get_bind().dialect.name == "sqlite" else postgresql.insert
+    # Sempre na mesma ordem de chave, para transações concorrentes travarem as linhas na mesma ordem
+    stmt = dialect_insert(summary_table).values(sorted(aggregates, key=group_key))
+    update_dict = {col.name: col for col in stmt.excluded if col.name not in GROUP_COLUMNS}
+    update_dict["refreshed_at"] = func.current_timestamp()
+    session.execute(stmt.on_conflict_do_update(index_elements=list(GROUP_COLUMNS), set_=update_dict))
+
+
+def _delete_groups(session, groups: list):
+    for start in range(0, len(groups), GROUPS_PER_STATEMENT):
+        batch = groups[start:start + GROUPS_PER_STATEMENT]
+        session.execute(
+            delete(summary_table).where(tuple_(*(summary_table.c[name] for name in GROUP_COLUMNS)).in_(batch))
+        )
+
+
+def refresh_summary(session, groups=None) -> int:
+    """
+    Recalcula o resumo de preços dos grupos informados. O commit fica a cargo de quem chama.
+
+    Cada grupo é recalculado a partir da tabela de imóveis, usando o índice
+    (property_type, city, neighborhood), e gravado com upsert; grupos que ficaram sem
+    imóveis somem do resumo. Sem `groups`, o resumo inteiro é refeito.
+
+    Args:
+        session (Session): Sessão do SQLAlchemy.
+        groups (iterable): Tuplas (cidade, bairro, tipo) a recalcular, ou None para todos.
+
+    Returns:
+        int: Quantidade de grupos gravados no resumo.
+    """
+    if groups is None:
+        aggregates = _aggregate(session)
+        _upsert_summary(session, aggregates)
+        # Grupos que não existem mais na tabela de imóveis
+        current = {group_key(row) for row in aggregates}
+        stale = [tuple(row) for row in session.execute(select(*(summary_table.c[name] for name in GROUP_COLUMNS)))
+                 if tuple(row) not in current]
+        _delete_groups(session, stale)
+        logger.info(f"Resumo de preços refeito com {len(aggregates)} grupos.")
+        return len(aggregates)
+
+    groups = sorted(set(groups))
+    written = 0
+    for start in range(0, len(groups), GROUPS_PER_STATEMENT):
+        batch = groups[start:start + GROUPS_PER_STATEMENT]
+        aggregates = _aggregate(session, batch)
+        _upsert_summary(session, aggregates)
+        found = {group_key(row) for row in aggregates}
+        _delete_groups(session, [group for group in batch if group not in found])
+        written += len(aggregates)
+    return written
+
+
+def build_summary_query(city: str = None, neighborhood: str = None, property_type: str = None,
+                        min_count: int = None):
+    """
+    Monta o SELECT do resumo de preços com filtros opcionais, ordenado por cidade, bairro e tipo.
+    """
+    stmt = select(summary_table)
+    if city is not None:
+        stmt = stmt.where(summary_table.c.city == city)
+    if neighborhood is not None:
+        stmt = stmt.where(summary_table.c.neighborhood == neighborhood)
+    if property_type is not None:
+        stmt = stmt.where(summary_table.c.property_type == property_type)
+    if min_count is not None:
+        stmt = stmt.where(summary_table.c.properties_count >= min_count)
+    return stmt.order_by(*(summary_table.c[name] for name in GROUP_COLUMNS))
@@ -0,0 +1,140 @@
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from time import perf_counter
+
+import importlib
+import threading
+import resource
+import logging
+import sys
+
+# Crie uma instância do logger para este módulo
+logger = logging.getLogger(__name__)
+
+
+def _max_rss_mb() -> float:
+    # ru_maxrss vem em KB no Linux (em bytes no macOS)
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(max_rss / (2**20 if sys.platform == "darwin" else 2**10), 1)
+
+
+class StartupReport:
+    """
+    Registra o custo de cada fase da subida do processo (importações, carga do modelo,
+    migrações, ...): duração, módulos importados pela fase e pico de memória ao final.
+
+    Como cada worker do uvicorn é um processo, cada um tem o seu próprio relatório.
+    """
+
+    def __init__(self):
+        self.created_at = datetime.now(timezone.utc).isoformat()
+        self._started = perf_counter()
+        self._checkpoint = (self._started, len(sys.modules))
+        self._phases = []
+        self._warnings = []
+        self._lock = threading.Lock()
+        self.ready_seconds = None
+
+    def record(self, name: str, seconds: float, new_modules: int = 0, status: str = "ok", error: str = None):
+        phase = {
+            "phase": name,
+            "seconds": round(seconds, 4),
+            "new_modules": new_modules,
+            "max_rss_mb": _max_rss_mb(),
+            "status": status,
+        }
+        if error is not None:
+            phase["error"] = error
+        with self._lock:
+            self._phases.append(phase)
+        logger.info(f"Inicialização: fase '{name}' em {seconds:.3f}s ({new_modules} módulos novos, {status}).")
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        Mede o bloco `with report.phase("nome"):`. Uma exceção marca a fase como falha e é propagada.
+        """
+        modules_before = len(sys.modules)
+        started = perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            self.record(name, perf_counter() - started, len(sys.modules) - modules_before, "failed", str(e))
+            raise
+        self.record(name, perf_counter() - started, len(sys.modules) - modules_before)
+
+    def checkpoint(self, name: str):
+        """
+        Registra como fase `name` o trecho desde o último checkpoint (ou a criação do relatório),
+        útil para medir blocos de import no topo de um módulo.
+        """
+        started, modules_before = self._checkpoint
+        now = perf_counter()
+        self._checkpoint = (now, len(sys.modules))
+        self.record(name, now - started, len(sys.modules) - modules_before)
+
+    def warn(self, message: str):
+        # Problema que não impede a subida, mas deve aparecer no relatório
+        with self._lock:
+            if message not in self._warnings:
+                self._warnings.append(message)
+        logger.warning(f"Inicialização: {message}")
+
+    def mark_ready(self):
+        # Tempo desde a criação do relatório (importação de main) até a aplicação aceitar requisições
+        self.ready_seconds = round(perf_counter() - self._started, 4)
+        logger.info(f"Aplicação pronta em {self.ready_seconds:.3f}s após a importação.")
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            phases = list(self._phases)
+            warnings = list(self._warnings)
+        return {
+            "created_at": self.created_at,
+            "ready_seconds": self.ready_seconds,
+            "max_rss_mb": _max_rss_mb(),
+            "loaded_modules": len(sys.modules),
+            "phases": phases,
+            "warnings": warnings,
+        }
+
+
+# Relatório do processo atual
+STARTUP_REPORT = StartupReport()
+
+
+class LazyModule:
+    """
+    Módulo importado somente no primeiro acesso a um atributo.
+
+    Evita que importar a API carregue pilhas pesadas (Selenium, drivers do banco) que
+    só algumas rotas usam. O tempo da importação entra no relatório de inicialização.
+    """
+
+    def __init__(self, name: str, report: StartupReport = STARTUP_REPORT):
+        self._name = name
+        self._report = report
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._module is None:
+                with self._report.phase(f"import {self._name.rsplit('.', 1)[-1]}"):
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attribute: str):
+        module = self._module if self._module is not None else self._load()
+        return getattr(module, attribute)
+
+    def __repr__(self) -> str:
+        state = "carregado" if self._module is not None else "não carregado"
+        return f"<LazyModule {self._name} ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    """
+    Retorna um LazyModule para `name` (ex: lazy_import("src.app_propieters_ml.core.database")).
+    """
+    return LazyModule(name)
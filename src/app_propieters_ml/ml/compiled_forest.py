@@ -0,0 +1,175 @@
+from pathlib import Path
+
+import numpy as np
+import argparse
+import logging
+import joblib
+import json
+
+# Configurando o logging
+logging.basicConfig(
+    level=logging.INFO, # Nível mínimo para exibir
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S',
+)
+
+# Crie uma instância do logger para este módulo
+logger = logging.getLogger(__name__)
+
+# Arrays que compõem o formato compilado, cada um salvo em um arquivo .npy
+COMPILED_ARRAYS = ["feature", "threshold", "left", "right", "value", "roots"]
+METADATA_FILE = "metadata.json"
+
+
+def export_compiled_forest(estimator, output_dir: str) -> dict:
+    """
+    Achata todas as árvores de um ensemble do scikit-learn em arrays NumPy contíguos
+    e salva em `output_dir`.
+
+    Os nós de todas as árvores são concatenados em um único espaço de índices. As folhas
+    apontam para si mesmas (left == right == próprio índice), assim a travessia pode
+    avançar todas as árvores juntas por `max_depth` passos sem desvios por linha.
+
+    Args:
+        estimator: RandomForestRegressor, ExtraTreesRegressor ou DecisionTreeRegressor treinado.
+        output_dir (str): Diretório onde os arrays e o metadata.json serão gravados.
+
+    Returns:
+        dict: Os metadados gravados junto aos arrays.
+    """
+    trees = [est.tree_ for est in getattr(estimator, "estimators_", [estimator])]
+    if not trees or not all(hasattr(tree, "children_left") for tree in trees):
+        raise ValueError(f"Estimador não suportado para compilação: {type(estimator).__name__}")
+    if trees[0].n_outputs != 1:
+        raise ValueError("Somente modelos com uma única saída podem ser compilados.")
+
+    node_counts = np.array([tree.node_count for tree in trees], dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(node_counts)[:-1]])
+    total_nodes = int(node_counts.sum())
+
+    feature = np.empty(total_nodes, dtype=np.int32)
+    threshold = np.empty(total_nodes, dtype=np.float64)
+    left = np.empty(total_nodes, dtype=np.int32)
+    right = np.empty(total_nodes, dtype=np.int32)
+    value = np.empty(total_nodes, dtype=np.float64)
+
+    for tree, offset in zip(trees, offsets):
+        nodes = slice(offset, offset + tree.node_count)
+        own_index = np.arange(tree.node_count, dtype=np.int64) + offset
+        is_leaf = tree.children_left == -1
+
+        # Nas folhas a feature não é usada, então apontamos para a coluna 0 (índice válido)
+        feature[nodes] = np.where(is_leaf, 0, tree.feature)
+        threshold[nodes] = tree.threshold
+        left[nodes] = np.where(is_leaf, own_index, tree.children_left + offset)
+        right[nodes] = np.where(is_leaf, own_index, tree.children_right + offset)
+        value[nodes] = tree.value[:, 0, 0]
+
+    arrays = {
+        "feature": feature,
+        "threshold": threshold,
+        "left": left,
+        "right": right,
+        "value": value,
+        "roots": offsets.astype(np.int32),
+    }
+
+    metadata = {
+        "estimator": type(estimator).__name__,
+        "n_trees": len(trees),
+        "n_nodes": total_nodes,
+        "max_depth": int(max(tree.max_depth for tree in trees)),
+        "n_features": int(getattr(estimator, "n_features_in_", trees[0].n_features)),
+    }
+
+    output = Path(output_dir)
+    output.mkdir(parents=True, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(output / f"{name}.npy", np.ascontiguousarray(array))
+    (output / METADATA_FILE).write_text(json.dumps(metadata, indent=2), encoding="utf-8")
+
+    logger.info(f"Modelo compilado em '{output}': {metadata['n_trees']} árvores e {total_nodes} nós.")
+    return metadata
+
+
+class CompiledForest:
+    """
+    Motor de inferência NumPy para ensembles de árvores exportados por `export_compiled_forest`.
+
+    Todas as árvores são percorridas em conjunto para um lote de linhas: a cada passo o
+    índice do nó atual de cada par (linha, árvore) avança para o filho esquerdo ou direito.
+    A predição final é a média das folhas, como no RandomForestRegressor.
+    """
+
+    def __init__(self, arrays: dict, metadata: dict, chunk_size: int = 256):
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.left = arrays["left"]
+        self.right = arrays["right"]
+        self.value = arrays["value"]
+        self.roots = arrays["roots"]
+
+        self.metadata = metadata
+        self.max_depth = metadata["max_depth"]
+        self.n_features_in_ = metadata["n_features"]
+
+        # Limita a memória da travessia: (chunk_size x n_trees) índices por passo
+        self.chunk_size = chunk_size
+
+    @classmethod
+    def load(cls, model_dir: str, mmap: bool = False, **kwargs):
+        """
+        Carrega um modelo compilado salvo em disco.
+
+        Com `mmap=True` os arrays são mapeados em memória (somente leitura) em vez de
+        copiados: as páginas vêm do cache de páginas do sistema, então vários workers que
+        servem o mesmo modelo dividem uma única cópia física, e a carga não depende do
+        tamanho do modelo.
+
+        Args:
+            model_dir (str): Diretório gerado por `export_compiled_forest`.
+            mmap (bool): Mapeia os arquivos .npy em vez de lê-los para a memória do processo.
+        """
+        path = Path(model_dir)
+        metadata = json.loads((path / METADATA_FILE).read_text(encoding="utf-8"))
+        # np.asarray mantém o mapeamento (a view aponta para o np.memmap), mas devolve ndarray comum
+        arrays = {
+            name: np.asarray(np.load(path / f"{name}.npy", mmap_mode="r" if mmap else None))
+            for name in COMPILED_ARRAYS
+        }
+        return cls(arrays, metadata, **kwargs)
+
+    def _predict_chunk(self, X: np.ndarray) -> np.ndarray:
+        rows = np.arange(X.shape[0])[:, None]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], self.roots.shape[0]))
+
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+
+        return self.value[nodes].mean(axis=1)
+
+    def predict(self, X) -> np.ndarray:
+        """
+        Prediz uma matriz (N, features), com o mesmo resultado do estimador original.
+        """
+        # O scikit-learn compara as features em float32 contra limiares float64
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Esperado uma matriz com {self.n_features_in_} features, recebido {X.shape}.")
+
+        predictions = np.empty(X.shape[0], dtype=np.float64)
+        for start in range(0, X.shape[0], self.chunk_size):
+            end = start + self.chunk_size
+            predictions[start:end] = self._predict_chunk(X[start:end])
+        return predictions
+
+
+if __name__ == "__main__":
+    # Ex: python -m src.app_propieters_ml.ml.compiled_forest models_trained/pred_price_model.joblib models_trained/pred_price_model.compiled
+    parser = argparse.ArgumentParser(description="Exporta um modelo .joblib de árvores para o formato compilado em arrays NumPy.")
+    parser.add_argument("model_path", help="Caminho do modelo .joblib treinado.")
+    parser.add_argument("output_dir", help="Diretório de saída do modelo compilado.")
+    args = parser.parse_args()
+
+    export_compiled_forest(joblib.load(args.model_path), args.output_dir)
@@ -0,0 +1,479 @@
+from sqlalchemy import select
+from datetime import datetime, timezone
+from collections import defaultdict
+from pathlib import Path
+
+from src.app_propieters_ml.models import property_model
+from src.app_propieters_ml.ml.feature_engineering import NUM_FEATURES, FeatureTransformer
+
+import numpy as np
+import threading
+import argparse
+import tempfile
+import hashlib
+import logging
+import json
+import os
+
+# Configurando o logging
+logging.basicConfig(
+    level=logging.INFO, # Nível mínimo para exibir
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S',
+)
+
+# Crie uma instância do logger para este módulo
+logger = logging.getLogger(__name__)
+
+# Diretório padrão do índice de comparáveis (um .npz por partição + metadata.json)
+DEFAULT_COMPS_INDEX_PATH = "./src/app_propieters_ml/ml/comps_index"
+METADATA_FILE = "metadata.json"
+
+# Colunas lidas da tabela de imóveis para o índice
+COMPS_COLUMNS = ["id", "property_type", "city", "neighborhood", "price", "area_m2", "rooms", "bathrooms", "vacancies", "updated_at"]
+# Colunas inteiras guardadas em cada partição e devolvidas nos comparáveis
+INTEGER_COLUMNS = ["area_m2", "rooms", "bathrooms", "vacancies"]
+
+properties_table = property_model.Property.__table__
+
+
+def _normalize(value) -> str:
+    return str(value).strip().casefold()
+
+
+def partition_key(property_type, city) -> tuple:
+    """
+    Chave da partição de um imóvel: tipo e cidade, sem diferenciar maiúsculas e espaços.
+    """
+    return _normalize(property_type), _normalize(city)
+
+
+def _partition_file(key: tuple) -> str:
+    # Nome de arquivo estável e seguro para qualquer cidade
+    return hashlib.sha1(json.dumps(key, ensure_ascii=False).encode("utf-8")).hexdigest()[:16] + ".npz"
+
+
+def _updated_at_key(value) -> str:
+    # updated_at como texto, para guardar na partição e comparar com o valor lido do banco
+    if value is None:
+        return ""
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+
+def _write_atomic(path: Path, write):
+    # Grava em um arquivo temporário e troca com os.replace: leitores nunca veem um arquivo parcial.
+    # O nome temporário é único (mkstemp no mesmo diretório), então duas gravações não usam o mesmo arquivo
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            write(file)
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+class CompsPartition:
+    """
+    Imóveis de um par (tipo, cidade) com as features já padronizadas e uma árvore KD
+    construída no primeiro uso.
+
+    A vizinhança pode pesar na busca: cada comparável de outro bairro recebe
+    `neighborhood_weight` a mais na distância. A busca consulta a árvore da cidade e a do
+    bairro pedido (árvores por bairro também são construídas sob demanda) e junta os dois
+    resultados, o que dá o mesmo top-K de uma busca exaustiva com a penalidade.
+    """
+
+    def __init__(self, key: tuple, labels: tuple, arrays: dict):
+        self.key = key
+        # Tipo e cidade como vieram do banco, para exibição
+        self.labels = labels
+        self.ids = arrays["ids"]
+        self.neighborhoods = arrays["neighborhoods"]
+        self.price = arrays["price"]
+        self.features = arrays["features"]
+        self.columns = {name: arrays[name] for name in INTEGER_COLUMNS}
+        # Partições gravadas antes desta coluna não têm o updated_at: ficam vazias e são reaplicadas na sincronização
+        self.updated_at = arrays["updated_at"] if "updated_at" in arrays else np.full(self.ids.shape[0], "", dtype=str)
+
+        self._neighborhood_keys = np.array([_normalize(value) for value in self.neighborhoods], dtype=str)
+        self._tree = None
+        self._neighborhood_trees = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self.ids.shape[0]
+
+    @classmethod
+    def from_rows(cls, key: tuple, rows: list, transformer: FeatureTransformer):
+        matrix = transformer.build(
+            [row["property_type"] for row in rows],
+            [row["area_m2"] for row in rows],
+            [row["rooms"] for row in rows],
+            [row["bathrooms"] for row in rows],
+            [row["vacancies"] or 0 for row in rows],
+        )
+        arrays = {
+            "ids": np.array([row["id"] for row in rows], dtype=str),
+            "neighborhoods": np.array([row["neighborhood"] for row in rows], dtype=str),
+            "price": np.array([float(row["price"]) for row in rows], dtype=np.float64),
+            # Somente as colunas numéricas: o One-Hot do tipo é constante dentro da partição
+            "features": transformer.scale(matrix)[:, :len(NUM_FEATURES)].astype(np.float32),
+            "updated_at": np.array([_updated_at_key(row.get("updated_at")) for row in rows], dtype=str),
+        }
+        for name in INTEGER_COLUMNS:
+            arrays[name] = np.array([row[name] or 0 for row in rows], dtype=np.int32)
+        return cls(key, (rows[-1]["property_type"], rows[-1]["city"]), arrays)
+
+    def merged(self, rows: list, remove_ids: set, transformer: FeatureTransformer):
+        """
+        Retorna uma nova partição sem os ids de `remove_ids` e com `rows` adicionadas
+        (ou None se ficar vazia). A partição atual não é alterada, então buscas em
+        andamento continuam válidas.
+        """
+        keep = ~np.isin(self.ids, list(remove_ids)) if remove_ids else np.ones(len(self), dtype=bool)
+        if not rows:
+            if not keep.any():
+                return None
+            return CompsPartition(self.key, self.labels, {name: array[keep] for name, array in self._arrays().items()})
+
+        added = CompsPartition.from_rows(self.key, rows, transformer)._arrays()
+        arrays = {name: np.concatenate([array[keep], added[name]]) for name, array in self._arrays().items()}
+        return CompsPartition(self.key, (rows[-1]["property_type"], rows[-1]["city"]), arrays)
+
+    def _arrays(self) -> dict:
+        return {
+            "ids": self.ids, "neighborhoods": self.neighborhoods, "price": self.price,
+            "features": self.features, "updated_at": self.updated_at, **self.columns,
+        }
+
+    def _get_tree(self, neighborhood: str = None):
+        # Import local: o scipy só é carregado quando a primeira busca é feita
+        from scipy.spatial import cKDTree
+
+        with self._lock:
+            if neighborhood is None:
+                if self._tree is None:
+                    self._tree = (cKDTree(self.features), np.arange(len(self)))
+                return self._tree
+            if neighborhood not in self._neighborhood_trees:
+                rows = np.flatnonzero(self._neighborhood_keys == neighborhood)
+                self._neighborhood_trees[neighborhood] = (cKDTree(self.features[rows]), rows) if rows.size else None
+            return self._neighborhood_trees[neighborhood]
+
+    @staticmethod
+    def _search(tree, X: np.ndarray, k: int):
+        index, rows = tree
+        k = min(k, rows.size)
+        distances, positions = index.query(X, k=k)
+        # Com k=1 o cKDTree devolve vetores; padronizamos para (m, k)
+        return distances.reshape(X.shape[0], k), rows[positions.reshape(X.shape[0], k)]
+
+    def query(self, X: np.ndarray, neighborhoods: list, k: int, neighborhood_weight: float) -> list:
+        """
+        Busca os `k` comparáveis de cada linha de `X` (features já padronizadas).
+
+        Returns:
+            list: Para cada consulta, a lista de comparáveis (dicionários), do mais próximo ao mais distante.
+        """
+        m = X.shape[0]
+        wanted = np.array([_normalize(value) if value else "" for value in neighborhoods], dtype=str)
+        has_neighborhood = wanted != ""
+
+        # Candidatos da cidade inteira, com a penalidade para os de outro bairro
+        distances, rows = self._search(self._get_tree(), X, k)
+        same = self._neighborhood_keys[rows] == wanted[:, None]
+        scores = distances + np.where(same | ~has_neighborhood[:, None], 0.0, neighborhood_weight)
+
+        if neighborhood_weight > 0 and has_neighborhood.any():
+            # Candidatos do próprio bairro: uma busca por bairro distinto do lote
+            local_scores = np.full((m, k), np.inf)
+            local_rows = np.zeros((m, k), dtype=rows.dtype)
+            for neighborhood in np.unique(wanted[has_neighborhood]):
+                tree = self._get_tree(str(neighborhood))
+                if tree is None:
+                    continue
+                positions = np.flatnonzero(wanted == neighborhood)
+                found_distances, found_rows = self._search(tree, X[positions], k)
+                local_scores[positions[:, None], np.arange(found_rows.shape[1])] = found_distances
+                local_rows[positions[:, None], np.arange(found_rows.shape[1])] = found_rows
+
+            scores = np.concatenate([scores, local_scores], axis=1)
+            rows = np.concatenate([rows, local_rows], axis=1)
+            same = np.concatenate([same, np.ones((m, k), dtype=bool)], axis=1)
+
+            # Ordena por pontuação e, no empate, pela linha: um imóvel achado nas duas buscas fica lado a lado
+            order = np.lexsort((rows, scores), axis=-1)
+            scores = np.take_along_axis(scores, order, axis=1)
+            rows = np.take_along_axis(rows, order, axis=1)
+            same = np.take_along_axis(same, order, axis=1)
+            valid = np.isfinite(scores)
+            valid[:, 1:] &= rows[:, 1:] != rows[:, :-1]
+        else:
+            valid = np.ones(scores.shape, dtype=bool)
+
+        # Os k primeiros candidatos válidos de cada consulta, convertidos de uma vez para o lote inteiro
+        selected = valid & (np.cumsum(valid, axis=1) <= k)
+        comps = self._describe(rows[selected], scores[selected], same[selected])
+        ends = np.cumsum(selected.sum(axis=1)).tolist()
+        return [comps[start:end] for start, end in zip([0] + ends[:-1], ends)]
+
+    def _describe(self, rows: np.ndarray, distances: np.ndarray, same: np.ndarray) -> list:
+        # Colunas extraídas com indexação vetorizada e .tolist(), sem acessar escalares NumPy um a um
+        area = self.columns["area_m2"][rows]
+        price = self.price[rows]
+        price_m2 = np.round(np.divide(price, area, out=np.full(price.shape, np.nan), where=area > 0), 2)
+        columns = {
+            "id": self.ids[rows].tolist(),
+            "neighborhood": self.neighborhoods[rows].tolist(),
+            "price": price.tolist(),
+            "price_m2": [None if value != value else value for value in price_m2.tolist()],
+            **{name: self.columns[name][rows].tolist() for name in INTEGER_COLUMNS},
+            "distance": np.round(distances, 4).tolist(),
+            "same_neighborhood": same.tolist(),
+        }
+        names = list(columns)
+        return [dict(zip(names, values)) for values in zip(*columns.values())]
+
+    def save(self, file):
+        np.savez(file, key=np.array(self.key, dtype=str), labels=np.array(self.labels, dtype=str), **self._arrays())
+
+    @classmethod
+    def load(cls, path: Path):
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {name: data[name] for name in data.files}
+        return cls(tuple(arrays.pop("key").tolist()), tuple(arrays.pop("labels").tolist()), arrays)
+
+
+class CompsIndex:
+    """
+    Índice de imóveis comparáveis ("comps"), particionado por tipo de imóvel e cidade.
+
+    Cada imóvel vira um ponto com as features do modelo (FeatureTransformer) padronizadas
+    pela média e desvio de toda a base, e cada partição tem a sua árvore KD. Uma busca só
+    toca a partição do imóvel consultado, então responde em milissegundos sem ler a tabela.
+
+    As atualizações são incrementais: `upsert` ignora os imóveis já indexados com o mesmo
+    updated_at, refaz apenas as partições dos demais e `save` regrava somente os arquivos
+    dessas partições. `watermark` é o maior updated_at já aplicado, de onde parte a próxima
+    leitura do banco. A padronização é aprendida no `build` completo e mantida nas atualizações.
+    """
+
+    def __init__(self, transformer: FeatureTransformer = None):
+        self.transformer = transformer or FeatureTransformer(standardize=True)
+        self.partitions = {}
+        self._id_partition = {}
+        self._id_updated_at = {}
+        self._lock = threading.Lock()
+        self.built_at = None
+        self.synced_at = None
+        self.watermark = None
+
+    @classmethod
+    def build(cls, rows: list):
+        """
+        Cria o índice do zero, aprendendo a padronização sobre todos os imóveis.
+        """
+        index = cls()
+        if rows:
+            index.transformer.fit(index.transformer.build(
+                [row["property_type"] for row in rows],
+                [row["area_m2"] for row in rows],
+                [row["rooms"] for row in rows],
+                [row["bathrooms"] for row in rows],
+                [row["vacancies"] or 0 for row in rows],
+            ))
+        index.upsert(rows)
+        index.built_at = datetime.now(timezone.utc).isoformat()
+        logger.info(f"Índice de comparáveis criado: {len(rows)} imóveis em {len(index.partitions)} partições.")
+        return index
+
+    def upsert(self, rows: list) -> set:
+        """
+        Insere ou atualiza imóveis (dicionários com as colunas de COMPS_COLUMNS).
+
+        Imóveis já presentes com o mesmo updated_at são ignorados; linhas sem updated_at
+        (ex: recém-coletadas, antes de ler do banco) são sempre aplicadas.
+
+        Returns:
+            set: Chaves das partições alteradas.
+        """
+        # Último valor de cada id, como no upsert do banco
+        unique_rows = {row["id"]: row for row in rows}
+
+        with self._lock:
+            updated = [row["updated_at"] for row in unique_rows.values() if row.get("updated_at") is not None]
+            if updated:
+                latest = max(updated)
+                if self.watermark is None or latest > datetime.fromisoformat(self.watermark):
+                    self.watermark = latest.isoformat()
+
+            unique_rows = {
+                row_id: row for row_id, row in unique_rows.items()
+                if not row.get("updated_at") or self._id_updated_at.get(row_id) != _updated_at_key(row["updated_at"])
+            }
+            by_partition = defaultdict(list)
+            for row in unique_rows.values():
+                by_partition[partition_key(row["property_type"], row["city"])].append(row)
+
+            # Ids que já estão no índice saem da partição antiga (o imóvel pode ter mudado de tipo ou cidade)
+            removals = defaultdict(set)
+            for row_id in unique_rows:
+                old_key = self._id_partition.get(row_id)
+                if old_key is not None:
+                    removals[old_key].add(row_id)
+
+            touched = set(by_partition) | set(removals)
+            for key in touched:
+                current = self.partitions.get(key)
+                new_rows = by_partition.get(key, [])
+                if current is None:
+                    partition = CompsPartition.from_rows(key, new_rows, self.transformer) if new_rows else None
+                else:
+                    partition = current.merged(new_rows, removals.get(key, set()), self.transformer)
+
+                # Troca a referência de uma vez: buscas em andamento usam a partição anterior
+                if partition is None:
+                    self.partitions.pop(key, None)
+                else:
+                    self.partitions[key] = partition
+
+            for key, partition_rows in by_partition.items():
+                for row in partition_rows:
+                    self._id_partition[row["id"]] = key
+                    self._id_updated_at[row["id"]] = _updated_at_key(row.get("updated_at"))
+        return touched
+
+    def query(self, queries: list, k: int = 10, neighborhood_weight: float = 1.0) -> list:
+        """
+        Busca os comparáveis de várias consultas, agrupadas por partição (uma busca
+        vetorizada por partição).
+
+        Args:
+            queries (list): Dicionários com property_type, city, area_m2, rooms, bathrooms,
+                            vacancies e, opcionalmente, neighborhood.
+            k (int): Quantidade de comparáveis por consulta.
+            neighborhood_weight (float): Penalidade, em desvios padrão, para comparáveis de outro bairro.
+
+        Returns:
+            list: Para cada consulta, na ordem de entrada, a lista de comparáveis (vazia se
+                  não houver imóveis do tipo na cidade).
+        """
+        results = [[] for _ in queries]
+        by_partition = defaultdict(list)
+        for position, item in enumerate(queries):
+            by_partition[partition_key(item["property_type"], item["city"])].append(position)
+
+        for key, positions in by_partition.items():
+            partition = self.partitions.get(key)
+            if partition is None:
+                continue
+            items = [queries[position] for position in positions]
+            matrix = self.transformer.transform(
+                [item["property_type"] for item in items],
+                [item["area_m2"] for item in items],
+                [item["rooms"] for item in items],
+                [item["bathrooms"] for item in items],
+                [item.get("vacancies") or 0 for item in items],
+            )[:, :len(NUM_FEATURES)].astype(np.float32)
+            found = partition.query(matrix, [item.get("neighborhood") for item in items], k, neighborhood_weight)
+            for position, comps in zip(positions, found):
+                results[position] = comps
+        return results
+
+    def save(self, path: str, keys: set = None):
+        """
+        Grava o índice em `path`. Com `keys`, regrava somente essas partições (e remove
+        os arquivos das que ficaram vazias).
+        """
+        root = Path(path)
+        root.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            partitions = dict(self.partitions)
+        for key in (partitions.keys() if keys is None else keys):
+            file = root / _partition_file(key)
+            if key in partitions:
+                _write_atomic(file, partitions[key].save)
+            elif file.exists():
+                file.unlink()
+
+        metadata = {
+            "built_at": self.built_at,
+            "synced_at": self.synced_at,
+            "watermark": self.watermark,
+            "feature_transformer": self.transformer.to_dict(),
+            "properties": sum(len(partition) for partition in partitions.values()),
+            "partitions": len(partitions),
+        }
+        _write_atomic(root / METADATA_FILE, lambda file: file.write(json.dumps(metadata, indent=2).encode("utf-8")))
+
+    @classmethod
+    def load(cls, path: str):
+        """
+        Carrega um índice gravado por `save`. As árvores KD são construídas na primeira busca de cada partição.
+        """
+        root = Path(path)
+        metadata = json.loads((root / METADATA_FILE).read_text(encoding="utf-8"))
+        index = cls(FeatureTransformer.from_dict(metadata["feature_transformer"]))
+        index.built_at = metadata.get("built_at")
+        index.synced_at = metadata.get("synced_at")
+        index.watermark = metadata.get("watermark")
+        for file in sorted(root.glob("*.npz")):
+            partition = CompsPartition.load(file)
+            index.partitions[partition.key] = partition
+            for row_id, updated_at in zip(partition.ids.tolist(), partition.updated_at.tolist()):
+                index._id_partition[row_id] = partition.key
+                index._id_updated_at[row_id] = updated_at
+        logger.info(f"Índice de comparáveis carregado de '{root}': {len(index._id_partition)} imóveis em {len(index.partitions)} partições.")
+        return index
+
+    def stats(self) -> dict:
+        with self._lock:
+            sizes = [len(partition) for partition in self.partitions.values()]
+        return {
+            "properties": sum(sizes),
+            "partitions": len(sizes),
+            "largest_partition": max(sizes, default=0),
+            "built_at": self.built_at,
+            "synced_at": self.synced_at,
+            "watermark": self.watermark,
+        }
+
+
+def fetch_comps_rows(session, since: datetime = None) -> list:
+    """
+    Lê da tabela de imóveis as colunas usadas pelo índice.
+
+    Args:
+        session (Session): Sessão do SQLAlchemy.
+        since (datetime): Somente imóveis com updated_at a partir deste momento (o watermark
+                          do índice menos a janela de commits atrasados). Os imóveis relidos
+                          sem alteração são ignorados pelo `upsert`.
+    """
+    stmt = select(*(properties_table.c[name] for name in COMPS_COLUMNS))
+    if since is not None:
+        stmt = stmt.where(properties_table.c.updated_at >= since)
+    return [dict(row) for row in session.execute(stmt).mappings()]
+
+
+def build_comps_index(session, path: str = DEFAULT_COMPS_INDEX_PATH) -> CompsIndex:
+    """
+    Cria o índice a partir de toda a tabela de imóveis e grava em `path`.
+    """
+    synced_at = datetime.now(timezone.utc)
+    index = CompsIndex.build(fetch_comps_rows(session))
+    index.synced_at = synced_at.isoformat()
+    index.save(path)
+    return index
+
+
+if __name__ == "__main__":
+    # Ex: python -m src.app_propieters_ml.ml.comps_index --output ./src/app_propieters_ml/ml/comps_index
+    parser = argparse.ArgumentParser(description="Cria o índice de imóveis comparáveis a partir da tabela de imóveis.")
+    parser.add_argument("--output", default=DEFAULT_COMPS_INDEX_PATH, help="Diretório do índice.")
+    args = parser.parse_args()
+
+    from src.app_propieters_ml.core.database import SessionLocal
+
+    with SessionLocal() as session:
+        build_comps_index(session, args.output)
@@ -0,0 +1,209 @@
+from sqlalchemy import select, cast, Float
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+
+from src.app_propieters_ml.models import property_model
+
+import pyarrow.parquet as pq
+import pyarrow.compute as pc
+import pyarrow as pa
+import pandas as pd
+import argparse
+import logging
+import json
+import os
+
+# Configurando o logging
+logging.basicConfig(
+    level=logging.INFO, # Nível mínimo para exibir
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S',
+)
+
+# Crie uma instância do logger para este módulo
+logger = logging.getLogger(__name__)
+
+# Diretório padrão do snapshot da tabela de imóveis
+DEFAULT_DATASET_PATH = "./src/app_propieters_ml/ml/datasets/properties"
+MANIFEST_FILE = "_manifest.json"
+# Folga, em segundos, relida antes da marca d'água em cada exportação incremental. O updated_at
+# de um upsert é o início da transação: uma transação que começou antes da última exportação e
+# só fez commit depois dela tem linhas com updated_at menor que a marca d'água gravada
+DEFAULT_WATERMARK_LAG_SECONDS = 900
+
+properties_table = property_model.Property.__table__
+
+# Esquema tipado do arquivo colunar. Os campos Numeric viram float64, que é o que o treino usa
+PROPERTIES_SCHEMA = pa.schema([
+    ("id", pa.string()),
+    ("property_type", pa.string()),
+    ("price", pa.float64()),
+    ("price_condominium", pa.float64()),
+    ("iptu", pa.float64()),
+    ("area_m2", pa.int32()),
+    ("rooms", pa.int32()),
+    ("bathrooms", pa.int32()),
+    ("vacancies", pa.int32()),
+    ("city", pa.string()),
+    ("neighborhood", pa.string()),
+    ("collection_date", pa.date32()),
+    ("collection_time", pa.time64("us")),
+    ("updated_at", pa.timestamp("us", tz="UTC")),
+])
+
+# Colunas Numeric convertidas para float já no banco, evitando Decimal por linha no Python
+_NUMERIC_COLUMNS = {"price", "price_condominium", "iptu"}
+
+
+def _read_manifest(output: Path) -> dict:
+    try:
+        return json.loads((output / MANIFEST_FILE).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {"parts": [], "watermark": None}
+
+
+def _write_manifest(output: Path, manifest: dict):
+    # Escrita atômica: leitores nunca veem um manifesto pela metade
+    tmp_file = output / f".{MANIFEST_FILE}.tmp"
+    tmp_file.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    os.replace(tmp_file, output / MANIFEST_FILE)
+
+
+def export_properties(engine, output_dir: str = DEFAULT_DATASET_PATH, incremental: bool = True,
+                      batch_size: int = 50000, compression: str = "zstd",
+                      lag_seconds: float = DEFAULT_WATERMARK_LAG_SECONDS) -> dict:
+    """
+    Exporta a tabela `properties` direto do PostgreSQL para arquivos Parquet tipados e comprimidos.
+
+    As linhas são lidas com cursor do lado do servidor em lotes de `batch_size` e gravadas
+    como row groups, então a memória usada não depende do tamanho da tabela.
+
+    No modo incremental, somente as linhas inseridas ou atualizadas depois da última
+    exportação são gravadas em uma nova parte: `updated_at` maior que a marca d'água menos
+    `lag_seconds`. A folga cobre transações que fizeram commit depois da exportação anterior
+    com um updated_at mais antigo; as linhas relidas nessa janela se repetem entre partes e
+    o loader mantém a versão mais recente de cada id. A folga usada fica no manifesto.
+
+    Args:
+        engine (Engine): Engine do SQLAlchemy (ex: core.database.engine).
+        output_dir (str): Diretório do snapshot.
+        incremental (bool): Exporta somente o que mudou desde o último snapshot. Sem
+                            snapshot anterior, faz uma exportação completa.
+        batch_size (int): Quantidade de linhas lidas do banco e gravadas por row group.
+        compression (str): Codec de compressão do Parquet.
+        lag_seconds (float): Janela relida antes da marca d'água (ver DEFAULT_WATERMARK_LAG_SECONDS).
+
+    Returns:
+        dict: O manifesto atualizado do snapshot.
+    """
+    output = Path(output_dir)
+    output.mkdir(parents=True, exist_ok=True)
+    manifest = _read_manifest(output)
+    watermark = manifest.get("watermark") if incremental else None
+    if watermark and not watermark.get("updated_at"):
+        # Snapshot de uma versão antiga (marca d'água só pela data de coleta): refazemos completo
+        logger.info("Snapshot sem marca d'água de updated_at: fazendo uma exportação completa.")
+        watermark = None
+
+    columns = [
+        cast(properties_table.c[field.name], Float).label(field.name) if field.name in _NUMERIC_COLUMNS
+        else properties_table.c[field.name]
+        for field in PROPERTIES_SCHEMA
+    ]
+    stmt = select(*columns).order_by(properties_table.c.id)
+
+    max_updated_at = None
+    if watermark:
+        # updated_at é preenchido na inserção (server_default) e a cada upsert; a folga cobre commits atrasados
+        max_updated_at = datetime.fromisoformat(watermark["updated_at"])
+        stmt = stmt.where(properties_table.c.updated_at > max_updated_at - timedelta(seconds=lag_seconds))
+
+    part_name = f"part-{len(manifest['parts']) if watermark else 0:05d}.parquet"
+    tmp_path = output / f".{part_name}.tmp"
+    rows = 0
+
+    with engine.connect() as connection, pq.ParquetWriter(tmp_path, PROPERTIES_SCHEMA, compression=compression) as writer:
+        result = connection.execution_options(stream_results=True, yield_per=batch_size).execute(stmt)
+        for partition in result.partitions():
+            batch = pa.RecordBatch.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(zip(*partition), PROPERTIES_SCHEMA)],
+                schema=PROPERTIES_SCHEMA,
+            )
+            writer.write_batch(batch)
+            rows += batch.num_rows
+
+            # Atualizamos a marca d'água com o maior valor visto
+            updates = batch.column("updated_at").drop_null()
+            if len(updates):
+                batch_max = pc.max(updates).as_py()
+                max_updated_at = max(filter(None, [max_updated_at, batch_max]))
+
+    if watermark and rows == 0:
+        tmp_path.unlink()
+        logger.info("Nenhuma linha nova ou atualizada desde o último snapshot.")
+        return manifest
+
+    os.replace(tmp_path, output / part_name)
+
+    part = {"file": part_name, "rows": rows, "created_at": datetime.now(timezone.utc).isoformat()}
+    if watermark:
+        manifest["parts"].append(part)
+    else:
+        # Exportação completa: as partes antigas deixam de valer
+        for old_part in manifest["parts"]:
+            if old_part["file"] != part_name:
+                (output / old_part["file"]).unlink(missing_ok=True)
+        manifest["parts"] = [part]
+
+    manifest["watermark"] = {"updated_at": max_updated_at.isoformat() if max_updated_at else None, "lag_seconds": lag_seconds}
+    _write_manifest(output, manifest)
+
+    logger.info(f"Snapshot '{output}' atualizado: {rows} linhas gravadas em {part_name}.")
+    return manifest
+
+
+def load_properties_dataset(dataset_dir: str = DEFAULT_DATASET_PATH, columns: list = None) -> pd.DataFrame:
+    """
+    Carrega o snapshot exportado por `export_properties` em um DataFrame.
+
+    Os arquivos são lidos com memory-map, e quando o mesmo imóvel aparece em mais de
+    uma parte (exportações incrementais) fica somente a versão mais recente.
+
+    Args:
+        dataset_dir (str): Diretório do snapshot.
+        columns (list): Colunas a carregar. Por padrão, todas.
+
+    Returns:
+        pd.DataFrame: Os dados de imóveis, um por id.
+    """
+    output = Path(dataset_dir)
+    manifest = _read_manifest(output)
+    if not manifest["parts"]:
+        raise FileNotFoundError(f"Nenhum snapshot encontrado em '{output}'. Execute a exportação antes.")
+
+    read_columns = None if columns is None else list(dict.fromkeys(["id", *columns]))
+    tables = [pq.read_table(output / part["file"], columns=read_columns, memory_map=True) for part in manifest["parts"]]
+    df = pa.concat_tables(tables).to_pandas()
+
+    if len(tables) > 1:
+        df = df.drop_duplicates(subset="id", keep="last").reset_index(drop=True)
+    if columns is not None and "id" not in columns:
+        df = df.drop(columns="id")
+
+    logger.info(f"Snapshot carregado com {len(df)} imóveis.")
+    return df
+
+
+if __name__ == "__main__":
+    # Ex: python -m src.app_propieters_ml.ml.dataset_export --full
+    parser = argparse.ArgumentParser(description="Exporta a tabela de imóveis para Parquet.")
+    parser.add_argument("--output", default=DEFAULT_DATASET_PATH, help="Diretório do snapshot.")
+    parser.add_argument("--full", action="store_true", help="Refaz o snapshot completo em vez de exportar só as mudanças.")
+    parser.add_argument("--batch-size", type=int, default=50000)
+    parser.add_argument("--lag-seconds", type=float, default=DEFAULT_WATERMARK_LAG_SECONDS,
+                        help="Janela relida antes da marca d'água, para commits que chegaram depois da última exportação.")
+    args = parser.parse_args()
+
+    from src.app_propieters_ml.core.database import engine
+
+    export_properties(engine, args.output, incremental=not args.full, batch_size=args.batch_size, lag_seconds=args.lag_seconds)
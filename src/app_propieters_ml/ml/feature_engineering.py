@@ -0,0 +1,210 @@
+import numpy as np
+import logging
+
+# Crie uma instância do logger para este módulo
+logger = logging.getLogger(__name__)
+
+# Lista de tipos de imoveis conhecidos pelo modelo (mesma ordem do One-Hot Encoder do treino)
+PROPERTY_TYPE_CATEGORIES = ["apartamento", "casa", "quitinete", "sobrados"]
+
+# Ordem das colunas numéricas que o modelo espera receber
+NUM_FEATURES = ["area_m2", "rooms", "bathrooms", "vacancies", "rooms_totality", "area_per_room", "bathrooms_per_rooms"]
+
+
+def build_feature_matrix(property_type, area_m2, rooms, bathrooms, vacancies, categories=PROPERTY_TYPE_CATEGORIES):
+    """
+    Constrói a matriz de features do modelo para N imóveis de uma só vez.
+
+    Todas as features derivadas e o One-Hot Encoding do tipo de imóvel são calculados
+    de forma vetorizada com NumPy, sem laços em Python por linha.
+
+    Args:
+        property_type (sequence): Tipos de imóvel de cada linha. Devem pertencer a PROPERTY_TYPE_CATEGORIES.
+        area_m2 (sequence): Área em m² de cada imóvel.
+        rooms (sequence): Quantidade de quartos de cada imóvel.
+        bathrooms (sequence): Quantidade de banheiros de cada imóvel.
+        vacancies (sequence): Quantidade de vagas de garagem de cada imóvel.
+        categories (list): Categorias do One-Hot, na ordem do treino.
+
+    Returns:
+        np.ndarray: Matriz (N, 7 + len(categories)) na mesma ordem usada no treino.
+    """
+    area_m2 = np.asarray(area_m2, dtype=np.float64)
+    rooms = np.asarray(rooms, dtype=np.float64)
+    bathrooms = np.asarray(bathrooms, dtype=np.float64)
+    vacancies = np.asarray(vacancies, dtype=np.float64)
+
+    # Mesmo tratamento do notebook: quartos igual a 0 viram 1 nas razões
+    rooms_safe = np.where(rooms > 0, rooms, 1.0)
+
+    n_rows = area_m2.shape[0]
+    matrix = np.empty((n_rows, len(NUM_FEATURES) + len(categories)), dtype=np.float64)
+    matrix[:, 0] = area_m2
+    matrix[:, 1] = rooms
+    matrix[:, 2] = bathrooms
+    matrix[:, 3] = vacancies
+    matrix[:, 4] = rooms + bathrooms
+    matrix[:, 5] = area_m2 / rooms_safe
+    matrix[:, 6] = bathrooms / rooms_safe
+
+    # One-Hot Encoding vetorizado: compara cada tipo com a lista de categorias
+    types = np.asarray(property_type, dtype=object).reshape(-1, 1)
+    matrix[:, len(NUM_FEATURES):] = (types == np.asarray(categories, dtype=object).reshape(1, -1))
+
+    return matrix
+
+
+class FeatureTransformer:
+    """
+    Transformação de features única para o treino e para a API.
+
+    Monta a matriz de features (derivadas + One-Hot) e aplica a padronização das colunas
+    numéricas aprendida no treino, como o StandardScaler do ColumnTransformer do notebook.
+    Sem `fit` (ou com `standardize=False`) a padronização é a identidade, que é o caso dos
+    modelos antigos, salvos sem os parâmetros do scaler.
+
+    A média e o inverso do desvio são guardados em arrays NumPy já prontos, então aplicar a
+    padronização custa uma subtração e uma multiplicação por matriz, sem pandas.
+
+    Args:
+        categories (list): Categorias do One-Hot do tipo de imóvel, na ordem do treino.
+        standardize (bool): Aprende média e desvio das colunas numéricas no `fit`.
+    """
+
+    def __init__(self, categories=None, standardize: bool = False):
+        self.categories = list(categories or PROPERTY_TYPE_CATEGORIES)
+        self.standardize = standardize
+        n_features = len(NUM_FEATURES) + len(self.categories)
+        self.mean_ = np.zeros(n_features)
+        self.scale_ = np.ones(n_features)
+        self._prepare()
+
+    def _prepare(self):
+        # Valores pré-calculados para o caminho de uma única linha e para a padronização
+        self._category_columns = {category: len(NUM_FEATURES) + i for i, category in enumerate(self.categories)}
+        self._inverse_scale = 1.0 / self.scale_
+        self.is_identity = not self.mean_.any() and bool((self.scale_ == 1.0).all())
+
+    @property
+    def feature_names(self) -> list:
+        return NUM_FEATURES + [f"property_type_{category}" for category in self.categories]
+
+    def fit(self, matrix: np.ndarray):
+        """
+        Aprende média e desvio das colunas numéricas de uma matriz montada por `build`.
+        As colunas do One-Hot não são padronizadas.
+        """
+        if self.standardize:
+            numeric = np.asarray(matrix, dtype=np.float64)[:, :len(NUM_FEATURES)]
+            scale = numeric.std(axis=0)
+            # Mesmo tratamento do StandardScaler para colunas constantes
+            self.mean_[:len(NUM_FEATURES)] = numeric.mean(axis=0)
+            self.scale_[:len(NUM_FEATURES)] = np.where(scale > 0, scale, 1.0)
+        self._prepare()
+        return self
+
+    def build(self, property_type, area_m2, rooms, bathrooms, vacancies) -> np.ndarray:
+        """
+        Monta a matriz de features sem padronização para N imóveis (ver build_feature_matrix).
+        """
+        return build_feature_matrix(property_type, area_m2, rooms, bathrooms, vacancies, categories=self.categories)
+
+    def build_frame(self, df) -> np.ndarray:
+        """
+        Monta a matriz de features a partir de um DataFrame com as colunas dos imóveis.
+        """
+        return self.build(df["property_type"], df["area_m2"], df["rooms"], df["bathrooms"], df["vacancies"])
+
+    def build_row(self, property_type: str, area_m2, rooms, bathrooms, vacancies) -> np.ndarray:
+        """
+        Caminho rápido de `build` para um único imóvel, usado por requisição no /predict:
+        aritmética em Python e uma única alocação NumPy, sem as conversões de sequência.
+
+        Returns:
+            np.ndarray: Matriz (1, features).
+        """
+        rooms_safe = rooms if rooms > 0 else 1
+        row = np.zeros((1, len(NUM_FEATURES) + len(self.categories)), dtype=np.float64)
+        row[0, :len(NUM_FEATURES)] = (
+            area_m2, rooms, bathrooms, vacancies, rooms + bathrooms, area_m2 / rooms_safe, bathrooms / rooms_safe,
+        )
+        column = self._category_columns.get(property_type)
+        if column is not None:
+            row[0, column] = 1.0
+        return row
+
+    def scale(self, matrix: np.ndarray) -> np.ndarray:
+        """
+        Aplica a padronização aprendida a uma matriz montada por `build`/`build_row`.
+        """
+        if self.is_identity:
+            return matrix
+        return (matrix - self.mean_) * self._inverse_scale
+
+    def transform(self, property_type, area_m2, rooms, bathrooms, vacancies) -> np.ndarray:
+        return self.scale(self.build(property_type, area_m2, rooms, bathrooms, vacancies))
+
+    def to_dict(self) -> dict:
+        # Forma JSON, gravada nos metadados das versões do registro
+        return {
+            "categories": self.categories,
+            "standardize": self.standardize,
+            "mean": self.mean_.tolist(),
+            "scale": self.scale_.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        transformer = cls(data["categories"], data.get("standardize", False))
+        transformer.mean_ = np.asarray(data["mean"], dtype=np.float64)
+        transformer.scale_ = np.asarray(data["scale"], dtype=np.float64)
+        transformer._prepare()
+        return transformer
+
+
+class TransformedModel:
+    """
+    Modelo salvo em um único artefato junto com o seu FeatureTransformer.
+
+    Recebe a matriz de features sem padronização (a mesma usada nas chaves do cache de
+    predições) e aplica a padronização do treino antes do estimador.
+    """
+
+    # True quando o artefato era um estimador puro e recebeu a transformação identidade
+    legacy_unscaled = False
+
+    def __init__(self, transformer: FeatureTransformer, estimator):
+        self.transformer = transformer
+        self.estimator = estimator
+
+    @property
+    def n_features_in_(self):
+        return len(self.transformer.feature_names)
+
+    def predict(self, X) -> np.ndarray:
+        return self.estimator.predict(self.transformer.scale(X))
+
+
+LEGACY_ARTIFACT_WARNING = (
+    "Modelo servido é um estimador puro, sem o FeatureTransformer do treino: as features chegam sem "
+    "padronização, embora o notebook o tenha treinado com StandardScaler. Retreine com "
+    "ml.training_pipeline (--register --promote), que salva a padronização junto ao modelo."
+)
+
+
+def with_feature_transformer(model):
+    """
+    Garante que o modelo tenha um FeatureTransformer.
+
+    Artefatos antigos (estimador puro, como o pred_price_model.joblib do notebook) não
+    guardam a padronização do treino e recebem a transformação identidade: continuam
+    servidos sem padronização, ou seja, com a diferença entre treino e predição. O wrapper
+    fica marcado com `legacy_unscaled` e um aviso é registrado; a correção é retreinar
+    pelo ml.training_pipeline.
+    """
+    if isinstance(model, TransformedModel):
+        return model
+    logger.warning(LEGACY_ARTIFACT_WARNING)
+    wrapped = TransformedModel(FeatureTransformer(), model)
+    wrapped.legacy_unscaled = True
+    return wrapped
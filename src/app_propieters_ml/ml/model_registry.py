@@ -0,0 +1,230 @@
+from src.app_propieters_ml.ml.compiled_forest import CompiledForest, export_compiled_forest
+from src.app_propieters_ml.ml.feature_engineering import FeatureTransformer, TransformedModel
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import argparse
+import hashlib
+import logging
+import joblib
+import shutil
+import json
+import os
+import re
+
+# Configurando o logging
+logging.basicConfig(
+    level=logging.INFO, # Nível mínimo para exibir
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S',
+)
+
+# Crie uma instância do logger para este módulo
+logger = logging.getLogger(__name__)
+
+# Diretório padrão do registro, dentro da pasta de modelos treinados
+DEFAULT_REGISTRY_PATH = "./src/app_propieters_ml/ml/models_trained/registry"
+
+MODEL_FILE = "model.joblib"
+COMPILED_DIR = "compiled"
+METADATA_FILE = "metadata.json"
+ACTIVE_FILE = "ACTIVE"
+
+# Nomes de versão aceitos: também chegam pela API, então nunca podem sair do diretório do registro
+VERSION_PATTERN = re.compile(r"[\w.-]+")
+
+
+def is_valid_version(version: str) -> bool:
+    """
+    Indica se `version` é um nome de versão válido (letras, números, '_', '.' e '-', sem começar com '.').
+    """
+    return isinstance(version, str) and VERSION_PATTERN.fullmatch(version) is not None and not version.startswith(".")
+
+
+def hash_training_data(data) -> str:
+    """
+    Gera um hash SHA-256 do conjunto de treino (DataFrame ou array), gravado nos
+    metadados para saber exatamente com quais dados cada versão foi treinada.
+    """
+    digest = hashlib.sha256()
+    if hasattr(data, "columns"):
+        digest.update(",".join(map(str, data.columns)).encode("utf-8"))
+    array = np.ascontiguousarray(data.to_numpy() if hasattr(data, "to_numpy") else data)
+    digest.update(str(array.dtype).encode("utf-8"))
+    digest.update(str(array.shape).encode("utf-8"))
+    digest.update(array.tobytes() if array.dtype != object else repr(array.tolist()).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ModelRegistry:
+    """
+    Registro versionado dos modelos treinados.
+
+    Cada versão fica em `<root>/<versão>/` com o modelo (.joblib), a forma compilada
+    (quando o estimador é um ensemble de árvores) e um metadata.json com features,
+    métricas e hash do conjunto de treino. O arquivo `<root>/ACTIVE` aponta a versão
+    servida pela API e é sempre trocado de forma atômica.
+    """
+
+    def __init__(self, root: str = DEFAULT_REGISTRY_PATH):
+        self.root = Path(root)
+
+    def register(self, estimator, feature_names=None, metrics=None, training_data_hash=None,
+                 version: str = None, extra_metadata: dict = None) -> str:
+        """
+        Salva um novo modelo no registro, sem promovê-lo.
+
+        Args:
+            estimator: Modelo treinado.
+            feature_names (list): Ordem das features esperadas pelo modelo.
+            metrics (dict): Métricas de avaliação (R², MAE, ...).
+            training_data_hash (str): Hash do conjunto de treino (ver hash_training_data).
+            version (str): Nome da versão. Por padrão usa a data/hora UTC atual.
+            extra_metadata (dict): Campos adicionais gravados no metadata.json.
+
+        Returns:
+            str: O nome da versão registrada.
+        """
+        version = version or datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+        if not is_valid_version(version):
+            raise ValueError(f"Nome de versão inválido: '{version}'.")
+        final_dir = self.root / version
+        if final_dir.exists():
+            raise FileExistsError(f"A versão '{version}' já existe no registro.")
+
+        # Gravamos em um diretório temporário e renomeamos no final, assim uma versão nunca fica pela metade
+        tmp_dir = self.root / f".tmp-{version}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_dir.mkdir(parents=True)
+
+        try:
+            joblib.dump(estimator, tmp_dir / MODEL_FILE)
+
+            # Modelos com FeatureTransformer: compila o estimador e guarda a transformação nos metadados
+            transformer = estimator.transformer if isinstance(estimator, TransformedModel) else None
+            base_estimator = estimator.estimator if transformer is not None else estimator
+
+            compiled = False
+            try:
+                export_compiled_forest(base_estimator, tmp_dir / COMPILED_DIR)
+                compiled = True
+            except (ValueError, AttributeError):
+                logger.info(f"Estimador {type(base_estimator).__name__} não suporta o formato compilado, salvando somente o .joblib.")
+
+            metadata = {
+                "version": version,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "estimator": type(base_estimator).__name__,
+                "feature_names": list(feature_names) if feature_names is not None else None,
+                "metrics": metrics or {},
+                "training_data_hash": training_data_hash,
+                "compiled": compiled,
+                "feature_transformer": transformer.to_dict() if transformer is not None else None,
+                **(extra_metadata or {}),
+            }
+            (tmp_dir / METADATA_FILE).write_text(json.dumps(metadata, indent=2), encoding="utf-8")
+
+            os.replace(tmp_dir, final_dir)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        logger.info(f"Modelo registrado na versão '{version}'.")
+        return version
+
+    def list_versions(self) -> list:
+        if not self.root.is_dir():
+            return []
+        return sorted(
+            path.name for path in self.root.iterdir()
+            if path.is_dir() and not path.name.startswith(".") and (path / METADATA_FILE).exists()
+        )
+
+    def _version_dir(self, version: str) -> Path:
+        if not is_valid_version(version):
+            raise KeyError(f"Versão '{version}' não encontrada no registro.")
+        return self.root / version
+
+    def get_metadata(self, version: str) -> dict:
+        path = self._version_dir(version) / METADATA_FILE
+        if not path.exists():
+            raise KeyError(f"Versão '{version}' não encontrada no registro.")
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def active_version(self):
+        """
+        Retorna a versão ativa ou None quando nenhuma versão foi promovida.
+        """
+        try:
+            version = (self.root / ACTIVE_FILE).read_text(encoding="utf-8").strip()
+        except FileNotFoundError:
+            return None
+        return version or None
+
+    def promote(self, version: str):
+        """
+        Torna `version` a versão ativa. A troca do ponteiro é atômica (os.replace),
+        então leitores nunca veem um arquivo ACTIVE parcial.
+        """
+        self.get_metadata(version)
+
+        tmp_file = self.root / f".{ACTIVE_FILE}.tmp"
+        tmp_file.write_text(version, encoding="utf-8")
+        os.replace(tmp_file, self.root / ACTIVE_FILE)
+
+        logger.info(f"Versão '{version}' promovida para ativa.")
+
+    def load(self, version: str, prefer_compiled: bool = True, mmap: bool = False):
+        """
+        Carrega o modelo de uma versão, usando a forma compilada quando disponível.
+
+        Com `mmap=True` os arrays da forma compilada são mapeados em memória (ver CompiledForest.load).
+        """
+        metadata = self.get_metadata(version)
+        version_dir = self._version_dir(version)
+
+        if prefer_compiled and metadata.get("compiled") and (version_dir / COMPILED_DIR).is_dir():
+            model = CompiledForest.load(version_dir / COMPILED_DIR, mmap=mmap)
+            if metadata.get("feature_transformer"):
+                model = TransformedModel(FeatureTransformer.from_dict(metadata["feature_transformer"]), model)
+            return model
+        return joblib.load(version_dir / MODEL_FILE)
+
+
+if __name__ == "__main__":
+    # Ex: python -m src.app_propieters_ml.ml.model_registry register models_trained/pred_price_model.joblib --promote
+    parser = argparse.ArgumentParser(description="Gerencia o registro versionado de modelos.")
+    parser.add_argument("--root", default=DEFAULT_REGISTRY_PATH, help="Diretório do registro.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    register_parser = commands.add_parser("register", help="Registra um modelo .joblib.")
+    register_parser.add_argument("model_path")
+    register_parser.add_argument("--version")
+    register_parser.add_argument("--metrics", help="Métricas em JSON, ex: '{\"r2\": 0.69}'.")
+    register_parser.add_argument("--promote", action="store_true", help="Promove a versão logo após registrar.")
+
+    promote_parser = commands.add_parser("promote", help="Promove uma versão para ativa.")
+    promote_parser.add_argument("version")
+
+    commands.add_parser("list", help="Lista as versões registradas.")
+
+    args = parser.parse_args()
+    registry = ModelRegistry(args.root)
+
+    if args.command == "register":
+        estimator = joblib.load(args.model_path)
+        version = registry.register(
+            estimator,
+            feature_names=getattr(estimator, "feature_names_in_", None),
+            metrics=json.loads(args.metrics) if args.metrics else None,
+            version=args.version,
+        )
+        if args.promote:
+            registry.promote(version)
+    elif args.command == "promote":
+        registry.promote(args.version)
+    elif args.command == "list":
+        active = registry.active_version()
+        for version in registry.list_versions():
+            print(f"{version}{'  (ativa)' if version == active else ''}")
@@ -0,0 +1,342 @@
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401 (habilita o HalvingRandomSearchCV)
+from sklearn.model_selection import train_test_split, RandomizedSearchCV, HalvingRandomSearchCV
+from sklearn.metrics import r2_score, mean_absolute_error, mean_squared_error, mean_absolute_percentage_error
+from sklearn.impute import KNNImputer
+from sklearn.ensemble import RandomForestRegressor
+from scipy.stats import randint, uniform
+from datetime import datetime, timezone
+from pathlib import Path
+
+from src.app_propieters_ml.ml.dataset_export import load_properties_dataset, DEFAULT_DATASET_PATH
+from src.app_propieters_ml.ml.imputation import impute_knn_blocks
+from src.app_propieters_ml.ml.feature_engineering import PROPERTY_TYPE_CATEGORIES, FeatureTransformer, TransformedModel
+from src.app_propieters_ml.ml import imputation, feature_engineering
+from src.app_propieters_ml.ml.model_registry import ModelRegistry, DEFAULT_REGISTRY_PATH, hash_training_data
+
+import numpy as np
+import pandas as pd
+import sklearn
+import argparse
+import hashlib
+import inspect
+import logging
+import joblib
+import time
+import json
+import os
+
+# Configurando o logging
+logging.basicConfig(
+    level=logging.INFO, # Nível mínimo para exibir
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S',
+)
+
+# Crie uma instância do logger para este módulo
+logger = logging.getLogger(__name__)
+
+# Cache em disco das matrizes pré-processadas (joblib.Memory)
+DEFAULT_CACHE_PATH = "./src/app_propieters_ml/ml/cache"
+# Cada execução grava o modelo e o relatório em <saída>/<data e hora UTC>/
+DEFAULT_OUTPUT_PATH = "./src/app_propieters_ml/ml/models_trained/training_runs"
+
+MODEL_FILE = "model.joblib"
+REPORT_FILE = "report.json"
+
+# Colunas usadas pelo KNNImputer (as mesmas do notebook)
+IMPUTED_COLUMNS = ["price", "price_condominium", "iptu", "area_m2", "rooms", "bathrooms", "vacancies"]
+
+
+def _lgbm_search():
+    from lightgbm import LGBMRegressor
+
+    return LGBMRegressor(random_state=42, n_jobs=1, verbose=-1), {
+        'n_estimators': randint(200, 1500),
+        'learning_rate': uniform(0.01, 0.1),
+        'num_leaves': randint(5, 40),
+        'max_depth': randint(3, 10),
+        'subsample': uniform(0.6, 0.4), # Amostra de 60% a 100% dos dados
+        'colsample_bytree': uniform(0.6, 0.4) # Amostra de 60% a 100% das features
+    }
+
+
+def _xgb_search():
+    from xgboost import XGBRegressor
+
+    return XGBRegressor(random_state=42, n_jobs=1, tree_method="hist", device="cpu"), {
+        'booster': ['gbtree'], # Define o tipo de modelo a cada interação
+        'n_estimators': randint(200, 1300), # O número total de árvores a serem construidas
+        'learning_rate': uniform(0.01, 0.2), # Define a complexidade do modelo, valores menores aumenta a robuste a overfitting
+        'gamma': uniform(0.01, 0.7), # A redução mínima de perda (loss) necessária para realizar uma partição em um nó da árvore
+        'lambda': uniform(0.1, 2), # Termo de regularização L2 (Ridge), valores maiores tornam o modelo mais conservador e suave
+        'max_depth': randint(2, 10), # Define a profundidade máxima da arvore
+        'subsample': uniform(0.6, 0.4), # Amostra de 60% a 100% dos dados
+        'colsample_bytree': uniform(0.6, 0.4), # Amostra de 60% a 100% das features
+        'objective': ['reg:squarederror'] # Definindo a função de perda a ser minimizada
+    }
+
+
+def _rf_search():
+    return RandomForestRegressor(random_state=42, n_jobs=1), {
+        'n_estimators': randint(200, 1300),
+        'max_features': ['sqrt', 'log2', 1.0],
+        'max_depth': randint(5, 13),
+        'min_samples_split': randint(2, 9),
+        'min_samples_leaf': randint(1, 8),
+        'bootstrap': [True],  # max_samples só é aceito com bootstrap
+        'max_samples': [None, 0.7, 0.8, 0.9],
+        'ccp_alpha': uniform(0, 0.02)
+    }
+
+
+# Modelos disponíveis: estimador base (sempre com n_jobs=1) e espaço de busca do notebook, sem GPU.
+# LightGBM e XGBoost são importados só quando escolhidos.
+SEARCH_SPACES = {
+    "rf": _rf_search,
+    "lgbm": _lgbm_search,
+    "xgb": _xgb_search,
+}
+
+
+def clean_properties(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aplica as regras de limpeza do notebook de treino.
+
+    Mantém somente os tipos conhecidos pelo modelo e troca por NaN condomínios até R$ 69,
+    IPTUs até R$ 89, valores maiores ou iguais ao preço do imóvel e mais de 15 vagas.
+    """
+    df = df[df["property_type"].isin(PROPERTY_TYPE_CATEGORIES)].copy()
+
+    for column in ["price", "price_condominium", "iptu", "area_m2", "rooms", "bathrooms", "vacancies"]:
+        df[column] = pd.to_numeric(df[column], errors="coerce").astype(np.float64)
+
+    df.loc[df["price_condominium"] <= 69, "price_condominium"] = np.nan
+    df.loc[df["iptu"] <= 89, "iptu"] = np.nan
+    df.loc[df["price_condominium"] >= df["price"], "price_condominium"] = np.nan
+    df.loc[df["iptu"] >= df["price"], "iptu"] = np.nan
+    df.loc[df["vacancies"] > 15, "vacancies"] = np.nan
+
+    return df.reset_index(drop=True)
+
+
+def preprocessing_code_version() -> str:
+    """
+    Hash do código chamado por `prepare_training_data`: a limpeza, os módulos de imputação
+    e de features e a versão do scikit-learn (KNNImputer).
+
+    O joblib.Memory só considera o código da própria função em cache; este hash entra como
+    argumento para que uma mudança nesse código não reaproveite matrizes antigas.
+    """
+    digest = hashlib.sha1(sklearn.__version__.encode("utf-8"))
+    digest.update(inspect.getsource(clean_properties).encode("utf-8"))
+    for module in (imputation, feature_engineering):
+        digest.update(Path(module.__file__).read_bytes())
+    return digest.hexdigest()
+
+
+def prepare_training_data(df: pd.DataFrame, knn_neighbors: int = 30, imputer: str = "blocks", cache_version: str = None):
+    """
+    Limpa, imputa e monta a matriz de features e o alvo (preço).
+
+    A matriz é montada pelo mesmo FeatureTransformer usado na API, sem padronização
+    (aprendida depois, só no conjunto de treino). Esta é a etapa guardada em cache pelo pipeline;
+    `cache_version` não é usado no cálculo, só compõe a chave do cache (ver preprocessing_code_version).
+
+    `imputer="blocks"` usa a imputação KNN por tipo de imóvel com árvore KD (ml/imputation.py);
+    `imputer="knn"` usa o KNNImputer do notebook sobre a tabela inteira (O(n²)).
+
+    Returns:
+        tuple: (X, y) como arrays NumPy.
+    """
+    df = clean_properties(df)
+
+    if imputer == "knn":
+        df[IMPUTED_COLUMNS] = KNNImputer(n_neighbors=knn_neighbors).fit_transform(df[IMPUTED_COLUMNS])
+    else:
+        df = impute_knn_blocks(df, IMPUTED_COLUMNS, n_neighbors=knn_neighbors)
+
+    X = FeatureTransformer().build_frame(df)
+    y = df["price"].to_numpy(dtype=np.float64)
+    return X, y
+
+
+def evaluate(estimator, X_test, y_test) -> dict:
+    predictions = estimator.predict(X_test)
+    return {
+        "r2": float(r2_score(y_test, predictions)),
+        "mae": float(mean_absolute_error(y_test, predictions)),
+        "rmse": float(np.sqrt(mean_squared_error(y_test, predictions))),
+        "mape": float(mean_absolute_percentage_error(y_test, predictions)),
+    }
+
+
+def build_search(model_name: str, search: str = "halving", n_candidates: int = 100, cv: int = 5,
+                 n_jobs: int = None, random_state: int = 42):
+    """
+    Cria a busca de hiperparâmetros de um modelo.
+
+    O paralelismo fica somente no nível da busca (`n_jobs` candidatos/folds ao mesmo tempo)
+    e cada estimador usa 1 thread, evitando o n_jobs=-1 duplo do notebook, que disputava os
+    mesmos núcleos. Com `search="halving"`, todos os candidatos começam com poucas amostras
+    e só o terço melhor segue para a rodada seguinte, com três vezes mais dados.
+    """
+    estimator, param_distributions = SEARCH_SPACES[model_name]()
+    common = dict(
+        estimator=estimator,
+        param_distributions=param_distributions,
+        cv=cv,
+        scoring='neg_mean_squared_error',
+        random_state=random_state,
+        n_jobs=n_jobs,
+        verbose=1,
+    )
+    if search == "halving":
+        return HalvingRandomSearchCV(n_candidates=n_candidates, factor=3, resource="n_samples", **common)
+    return RandomizedSearchCV(n_iter=n_candidates, **common)
+
+
+def run_training(dataset_dir: str = DEFAULT_DATASET_PATH, models: list = ("rf",), search: str = "halving",
+                 n_candidates: int = 100, cv: int = 5, n_jobs: int = None, cache_dir: str = DEFAULT_CACHE_PATH,
+                 output_dir: str = DEFAULT_OUTPUT_PATH, knn_neighbors: int = 30, imputer: str = "blocks",
+                 standardize: bool = True, test_size: float = 0.2,
+                 data: pd.DataFrame = None) -> dict:
+    """
+    Executa o treino completo: carga do snapshot, pré-processamento (em cache), busca de
+    hiperparâmetros de cada modelo, avaliação no conjunto de teste e gravação do melhor modelo.
+
+    Args:
+        dataset_dir (str): Snapshot Parquet gerado por dataset_export.
+        models (list): Modelos a buscar, entre "rf", "lgbm" e "xgb".
+        search (str): "halving" (HalvingRandomSearchCV) ou "random" (RandomizedSearchCV).
+        n_candidates (int): Configurações sorteadas por modelo.
+        cv (int): Quantidade de folds da validação cruzada.
+        n_jobs (int): Processos da busca. Por padrão, todos os núcleos.
+        cache_dir (str): Diretório do cache das matrizes pré-processadas (None desativa).
+        output_dir (str): Diretório onde a execução grava modelo e relatório.
+        knn_neighbors (int): Vizinhos usados na imputação.
+        imputer (str): "blocks" (imputação por tipo de imóvel) ou "knn" (KNNImputer na tabela inteira).
+        standardize (bool): Padroniza as colunas numéricas (StandardScaler do notebook), salvo junto ao modelo.
+        test_size (float): Fração separada para o teste final.
+        data (pd.DataFrame): Usa estes dados no lugar do snapshot.
+
+    Returns:
+        dict: O relatório da execução (também gravado em report.json).
+    """
+    n_jobs = n_jobs or os.cpu_count()
+    timings = {}
+    started = time.perf_counter()
+
+    phase = time.perf_counter()
+    df = data if data is not None else load_properties_dataset(dataset_dir, columns=["property_type", *IMPUTED_COLUMNS])
+    timings["load_s"] = time.perf_counter() - phase
+
+    memory = joblib.Memory(cache_dir, verbose=0)
+    prepare = memory.cache(prepare_training_data)
+    cache_version = preprocessing_code_version()
+    cache_hit = cache_dir is not None and prepare.check_call_in_cache(df, knn_neighbors, imputer, cache_version)
+
+    phase = time.perf_counter()
+    X, y = prepare(df, knn_neighbors, imputer, cache_version)
+    timings["prepare_s"] = time.perf_counter() - phase
+    logger.info(f"Matriz de treino com {X.shape[0]} imóveis pronta em {timings['prepare_s']:.1f}s (cache: {cache_hit}).")
+
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=42)
+
+    # A padronização é aprendida só no treino e vai no mesmo artefato do modelo
+    transformer = FeatureTransformer(standardize=standardize).fit(X_train)
+    X_train_scaled = transformer.scale(X_train)
+
+    results = {}
+    best_name, best_estimator = None, None
+    for model_name in models:
+        phase = time.perf_counter()
+        searcher = build_search(model_name, search=search, n_candidates=n_candidates, cv=cv, n_jobs=n_jobs)
+        searcher.fit(X_train_scaled, y_train)
+        elapsed = time.perf_counter() - phase
+        timings[f"search_{model_name}_s"] = elapsed
+
+        metrics = evaluate(TransformedModel(transformer, searcher.best_estimator_), X_test, y_test)
+        results[model_name] = {
+            "best_params": {key: (value.item() if hasattr(value, "item") else value) for key, value in searcher.best_params_.items()},
+            "cv_best_neg_mse": float(searcher.best_score_),
+            "candidates_evaluated": int(len(searcher.cv_results_["params"])),
+            "test_metrics": metrics,
+            "search_s": elapsed,
+        }
+        logger.info(f"{model_name}: R² {metrics['r2']:.4f}, MAE R$ {metrics['mae']:,.2f} em {elapsed:.1f}s.")
+
+        # O melhor modelo é escolhido pela validação cruzada, não pelo teste
+        if best_name is None or searcher.best_score_ > results[best_name]["cv_best_neg_mse"]:
+            best_name, best_estimator = model_name, searcher.best_estimator_
+
+    timings["total_s"] = time.perf_counter() - started
+
+    run_dir = Path(output_dir) / datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+    run_dir.mkdir(parents=True, exist_ok=True)
+    # Modelo e FeatureTransformer em um único artefato, servido direto pela API
+    joblib.dump(TransformedModel(transformer, best_estimator), run_dir / MODEL_FILE)
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "best_model": best_name,
+        "model_path": str(run_dir / MODEL_FILE),
+        "feature_names": transformer.feature_names,
+        "standardized": standardize,
+        "metrics": results[best_name]["test_metrics"],
+        "models": results,
+        "search": {"strategy": search, "n_candidates": n_candidates, "cv": cv, "n_jobs": n_jobs},
+        "imputer": imputer,
+        "rows": {"train": int(X_train.shape[0]), "test": int(X_test.shape[0])},
+        "training_data_hash": hash_training_data(X_train),
+        "preprocess_cache_hit": bool(cache_hit),
+        "timings": timings,
+    }
+    (run_dir / REPORT_FILE).write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    logger.info(f"Melhor modelo: {best_name}. Modelo e relatório gravados em '{run_dir}' ({timings['total_s']:.1f}s no total).")
+    return report
+
+
+if __name__ == "__main__":
+    # Ex: python -m src.app_propieters_ml.ml.training_pipeline --models rf lgbm --n-jobs 8 --register
+    parser = argparse.ArgumentParser(description="Treina o modelo de preço de imóveis a partir do snapshot Parquet.")
+    parser.add_argument("--dataset", default=DEFAULT_DATASET_PATH, help="Diretório do snapshot (dataset_export).")
+    parser.add_argument("--models", nargs="+", default=["rf"], choices=sorted(SEARCH_SPACES))
+    parser.add_argument("--search", default="halving", choices=["halving", "random"])
+    parser.add_argument("--candidates", type=int, default=100, help="Configurações sorteadas por modelo.")
+    parser.add_argument("--cv", type=int, default=5)
+    parser.add_argument("--n-jobs", type=int, default=None, help="Processos da busca (padrão: todos os núcleos).")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_PATH)
+    parser.add_argument("--no-cache", action="store_true", help="Não usa o cache das matrizes pré-processadas.")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT_PATH)
+    parser.add_argument("--imputer", default="blocks", choices=["blocks", "knn"])
+    parser.add_argument("--no-standardize", action="store_true", help="Não padroniza as colunas numéricas.")
+    parser.add_argument("--register", action="store_true", help="Registra o melhor modelo no registro de modelos.")
+    parser.add_argument("--promote", action="store_true", help="Promove a versão registrada para ativa.")
+    parser.add_argument("--registry", default=DEFAULT_REGISTRY_PATH)
+    args = parser.parse_args()
+
+    report = run_training(
+        dataset_dir=args.dataset,
+        models=args.models,
+        search=args.search,
+        n_candidates=args.candidates,
+        cv=args.cv,
+        n_jobs=args.n_jobs,
+        cache_dir=None if args.no_cache else args.cache_dir,
+        output_dir=args.output,
+        imputer=args.imputer,
+        standardize=not args.no_standardize,
+    )
+
+    if args.register or args.promote:
+        registry = ModelRegistry(args.registry)
+        version = registry.register(
+            joblib.load(report["model_path"]),
+            feature_names=report["feature_names"],
+            metrics=report["metrics"],
+            training_data_hash=report["training_data_hash"],
+            extra_metadata={"training_report": report},
+        )
+        if args.promote:
+            registry.promote(version)
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from src.app_propieters_ml.core.database import Base
+
+class CrawlState(Base):
+    __tablename__ = "crawl_state"
+
+    # Tipo de imóvel buscado (apartamento, casa, quitinete, sobrado)
+    property_type = Column(String, primary_key=True, autoincrement=False)
+    # Última página de resultados alcançada pela coleta mais recente do tipo
+    last_page = Column(Integer, nullable=False, default=0)
+    # Anúncios novos ou alterados encontrados na coleta mais recente
+    last_run_changed = Column(Integer, nullable=False, default=0)
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
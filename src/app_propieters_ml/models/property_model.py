@@ -1,9 +1,20 @@
-from sqlalchemy import Column, Integer, String, Date, Time, Numeric, DateTime
+from sqlalchemy import Column, Integer, String, Date, Time, Numeric, DateTime, Index
 from sqlalchemy.sql import func
 from src.app_propieters_ml.core.database import Base
 
 class Property(Base):
     __tablename__ = "properties"
+
+    # Índices para os filtros usados pela API, pelo resumo de preços e pela engenharia de features.
+    # Em bancos já existentes são criados por core/migrations.py (o create_all não altera tabelas existentes).
+    __table_args__ = (
+        # Agregados por grupo (tipo, cidade, bairro) e filtro por tipo: o prefixo property_type também atende WHERE property_type = ...
+        Index("ix_properties_type_city_neighborhood", "property_type", "city", "neighborhood"),
+        # Filtro por cidade e por cidade + bairro, sem o tipo
+        Index("ix_properties_city_neighborhood", "city", "neighborhood"),
+        # Filtros por período de coleta (exportações e consultas por data)
+        Index("ix_properties_collection_date", "collection_date"),
+    )
     
     id = Column(String, primary_key=True, index=True, autoincrement=False)
     property_type = Column(String, nullable=False)
@@ -20,4 +31,5 @@ class Property(Base):
     collection_date = Column(Date, server_default=func.current_date())
     collection_time = Column(Time, server_default=func.current_time())
     
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
\ No newline at end of file
+    # Preenchido na inserção e a cada upsert (core/property_repository.py); marca d'água das exportações incrementais
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
\ No newline at end of file
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, Date, Numeric, DateTime
+from sqlalchemy.sql import func
+from src.app_propieters_ml.core.database import Base
+
+class PropertySummary(Base):
+    __tablename__ = "property_summary"
+
+    # Um grupo por cidade, bairro e tipo de imóvel
+    city = Column(String, primary_key=True)
+    neighborhood = Column(String, primary_key=True)
+    property_type = Column(String, primary_key=True)
+
+    properties_count = Column(Integer, nullable=False)
+    price_avg = Column(Numeric(13, 2), nullable=False)
+    price_median = Column(Numeric(13, 2), nullable=False)
+    # Preço por m² (somente imóveis com área maior que zero)
+    price_m2_avg = Column(Numeric(11, 2), nullable=True)
+    price_m2_median = Column(Numeric(11, 2), nullable=True)
+    area_m2_avg = Column(Numeric(9, 2), nullable=False)
+    last_collection_date = Column(Date, nullable=True)
+
+    refreshed_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
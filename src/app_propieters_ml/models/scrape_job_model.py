@@ -0,0 +1,33 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean
+from sqlalchemy.sql import func
+from src.app_propieters_ml.core.database import Base
+
+class ScrapeJob(Base):
+    __tablename__ = "scrape_jobs"
+
+    id = Column(String, primary_key=True, autoincrement=False)
+    status = Column(String, nullable=False, index=True)
+    property_type = Column(String, nullable=False)
+    amostras_limit = Column(Integer, nullable=False)
+    workers = Column(Integer, nullable=False, default=1)
+    # Para a coleta quando uma página vem quase toda com anúncios já conhecidos
+    new_only = Column(Boolean, nullable=False, default=False)
+
+    # Progresso da coleta
+    pages_done = Column(Integer, nullable=False, default=0)
+    ads_collected = Column(Integer, nullable=False, default=0)
+    rows_upserted = Column(Integer, nullable=False, default=0)
+    # Anúncios já conhecidos e sem alteração, que não foram gravados de novo
+    ads_skipped = Column(Integer, nullable=False, default=0)
+    # Checkpoint: última página concluída sem lacunas desde o início do job
+    last_page = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+
+    # Lease do job em execução: o processo dono renova `lease_until` enquanto coleta;
+    # um job 'running' com o lease vencido teve o processo encerrado e volta para a fila
+    lease_owner = Column(String, nullable=True)
+    lease_until = Column(DateTime(timezone=True), nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
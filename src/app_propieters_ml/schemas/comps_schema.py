@@ -0,0 +1,47 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List
+
+# Quantidade máxima de comparáveis por consulta e de consultas em uma requisição em lote
+MAX_COMPS_K = 100
+MAX_COMPS_BATCH_SIZE = 1000
+
+
+class CompsQuerySchema(BaseModel):
+
+    property_type: str
+    city: str
+    neighborhood: Optional[str] = None
+    area_m2: int = Field(..., gt=0)
+    rooms: int = Field(..., ge=0)
+    bathrooms: int = Field(..., ge=1)
+    vacancies: Optional[int] = Field(0, ge=0)
+
+
+class CompsBatchSchema(BaseModel):
+    """
+    Consultas de comparáveis em lote, respondidas na mesma ordem.
+    """
+
+    queries: List[CompsQuerySchema] = Field(..., min_length=1, max_length=MAX_COMPS_BATCH_SIZE)
+    k: int = Field(10, gt=0, le=MAX_COMPS_K)
+    neighborhood_weight: Optional[float] = Field(None, ge=0)
+
+
+class CompSchema(BaseModel):
+    id: str
+    neighborhood: str
+    price: float
+    price_m2: Optional[float] = None
+    area_m2: int
+    rooms: int
+    bathrooms: int
+    vacancies: int
+    distance: float
+    same_neighborhood: bool
+
+
+class CompsResponseSchema(BaseModel):
+    property_type: str
+    city: str
+    k: int
+    comps: List[CompSchema]
@@ -1,6 +1,9 @@
-from pydantic import BaseModel, Field
-from typing import Optional
-    
+from pydantic import BaseModel, Field, model_validator
+from typing import Optional, List, Dict, Any
+
+# Quantidade máxima de imóveis aceitos em uma única requisição de predição em lote
+MAX_BATCH_SIZE = 10000
+
 
 class PredictionPriceSchema(BaseModel):
     
@@ -8,4 +11,42 @@ class PredictionPriceSchema(BaseModel):
     area_m2: int = Field(..., gt=0)
     rooms: int = Field(..., ge=0)
     bathrooms: int = Field(..., ge=1)
-    vacancies: Optional[int] = Field(0, ge=0)
\ No newline at end of file
+    vacancies: Optional[int] = Field(0, ge=0)
+
+
+class PredictionBatchSchema(BaseModel):
+    """
+    Payload de predição em lote. Aceita uma lista de imóveis (linhas) ou um payload
+    colunar, onde cada chave é um campo do PredictionPriceSchema e o valor é a lista
+    de valores daquele campo.
+
+    As linhas não são validadas aqui, nem mesmo se são objetos, para que um imóvel
+    inválido (inclusive `null` ou um número no lugar do objeto) não derrube o lote inteiro.
+    """
+
+    properties: Optional[List[Any]] = Field(None, max_length=MAX_BATCH_SIZE)
+    columns: Optional[Dict[str, List[Any]]] = None
+
+    @model_validator(mode='after')
+    def check_single_format(self):
+        if (self.properties is None) == (self.columns is None):
+            raise ValueError("Envie exatamente um dos campos: 'properties' ou 'columns'.")
+
+        if self.columns is not None:
+            lengths = {len(values) for values in self.columns.values()}
+            if len(lengths) > 1:
+                raise ValueError("Todas as colunas devem possuir a mesma quantidade de valores.")
+            if lengths and lengths.pop() > MAX_BATCH_SIZE:
+                raise ValueError(f"O lote excede o limite de {MAX_BATCH_SIZE} imóveis.")
+
+        return self
+
+    def rows(self) -> List[Any]:
+        """
+        Retorna o lote sempre no formato de linhas, preservando a ordem de entrada.
+        """
+        if self.properties is not None:
+            return self.properties
+
+        names = list(self.columns.keys())
+        return [dict(zip(names, values)) for values in zip(*self.columns.values())]
@@ -1,7 +1,39 @@
-from pydantic import BaseModel, Field, field_validator
-from typing import Optional
+from pydantic import BaseModel, field_validator, TypeAdapter, ValidationError
+from typing import Optional, List, TypedDict
 import re
 
+# Números no formato brasileiro, pré-compilados: "1.500.000", "1.500,50", "500", "99,9"
+_BRL_NUMBER = re.compile(r"\d{1,3}(?:\.\d{3})+(?:,\d+)?|\d+(?:,\d+)?")
+# Inteiros com separador de milhar opcional: "1.200", "120"
+_INT_NUMBER = re.compile(r"\d{1,3}(?:\.\d{3})+|\d+")
+
+
+def parse_brl(text: str):
+    """
+    Converte um valor em reais escrito no formato brasileiro para float.
+
+    Ex: "R$ 1.500,00" -> 1500.0 ; "IPTU R$ 120" -> 120.0 ; "Sob consulta" -> None
+    """
+    match = _BRL_NUMBER.search(text)
+    if match is None:
+        return None
+    return float(match.group().replace(".", "").replace(",", "."))
+
+
+def parse_int(text: str):
+    """
+    Extrai o primeiro número inteiro de um texto (áreas em m² e quantidades).
+
+    Ex: "120 m²" -> 120 ; "1.200 m²" -> 1200 ; "3 quartos" -> 3
+    """
+    # Caminho rápido para quantidades que já chegam só com dígitos ("2", "10")
+    if text.isdecimal():
+        return int(text)
+    match = _INT_NUMBER.search(text)
+    if match is None:
+        return None
+    return int(match.group().replace(".", ""))
+
 class PropertySchema(BaseModel):
     id: str
     property_type: str
@@ -15,24 +47,79 @@ class PropertySchema(BaseModel):
     city: str
     neighborhood: str
 
-    # Este validador será aplicado aos campos listados ANTES de qualquer outra validação
-    @field_validator('price', 'price_condominium', 'iptu', 'area_m2', 'rooms', 'bathrooms', 'vacancies', mode='before')
+    # Este validador será aplicado aos campos de valores ANTES de qualquer outra validação
+    @field_validator('price', 'price_condominium', 'iptu', mode='before')
+    @classmethod
+    def clean_currency(cls, v):
+        # Se o valor for nulo ou não for uma string, retorna como está
+        if v is None or not isinstance(v, str):
+            return v
+        # Ex: "R$ 1.500.000" -> 1500000.0 ; "Cond. R$ 1.500,50" -> 1500.5 ; "Sob consulta" -> None
+        return parse_brl(v)
+
+    # Este validador será aplicado aos campos inteiros (área e quantidades) ANTES de qualquer outra validação
+    @field_validator('area_m2', 'rooms', 'bathrooms', 'vacancies', mode='before')
     @classmethod
     def clean_and_extract_numbers(cls, v):
         # Se o valor for nulo ou não for uma string, retorna como está
         if v is None or not isinstance(v, str):
             return v
-        
-        # Usa regex para encontrar todos os dígitos na string
-        # Ex: "R$ 1.500.000,00" -> ["1", "5", "0", "0", "0", "0", "0", "0", "0"]
-        # Ex: "120 m²" -> ["1", "2", "0"]
-        numeros = re.findall(r'\d+', v)
-        
-        if numeros:
-            # Junta os números encontrados e converte
-            # Nota: Para preços com centavos, pode ser necessário um tratamento adicional
-            return "".join(numeros)
-        
-        # Se não encontrar números (ex: "Sob consulta"), retorna None
-        return None
-    
\ No newline at end of file
+        # Ex: "120 m²" -> 120 ; "1.200 m²" -> 1200
+        return parse_int(v)
+
+
+# Campos limpos pelos parsers antes da validação em lote
+CURRENCY_FIELDS = ('price', 'price_condominium', 'iptu')
+INTEGER_FIELDS = ('area_m2', 'rooms', 'bathrooms', 'vacancies')
+
+# Mesmos campos e tipos do PropertySchema, validados como dicionários pelo núcleo do Pydantic (sem
+# validadores em Python e sem criar um modelo por imóvel)
+PropertyRow = TypedDict("PropertyRow", {name: field.annotation for name, field in PropertySchema.model_fields.items()})
+PropertyListAdapter = TypeAdapter(List[PropertyRow])
+
+
+def _clean_row(raw: dict) -> dict:
+    # Uma passada por imóvel: campos na ordem do PropertySchema, ausentes como None e textos numéricos convertidos
+    row = {name: raw.get(name) for name in PropertySchema.model_fields}
+    for name in CURRENCY_FIELDS:
+        value = row[name]
+        if value.__class__ is str:
+            row[name] = parse_brl(value)
+    for name in INTEGER_FIELDS:
+        value = row[name]
+        if value.__class__ is str:
+            row[name] = parse_int(value)
+    return row
+
+
+def validate_properties(raw_properties: list):
+    """
+    Valida e limpa uma página inteira de imóveis brutos de uma só vez.
+
+    Os textos de valores e áreas são convertidos pelos parsers pré-compilados e a lista
+    inteira é validada com um único TypeAdapter, que aplica os mesmos tipos do
+    PropertySchema. Imóveis inválidos vão para a lista de rejeitados, com os erros do
+    Pydantic, e não impedem a validação dos demais.
+
+    Args:
+        raw_properties (list): Dicionários brutos extraídos pelo scraper.
+
+    Returns:
+        tuple: (lista de dicionários validados, lista de rejeitados {"index", "data", "errors"})
+    """
+    rows = [_clean_row(raw) for raw in raw_properties]
+    try:
+        return PropertyListAdapter.validate_python(rows), []
+    except ValidationError as e:
+        errors_by_index = {}
+        for error in e.errors(include_url=False):
+            errors_by_index.setdefault(error["loc"][0], []).append(error)
+
+    rejects = [
+        {"index": index, "data": raw_properties[index], "errors": errors}
+        for index, errors in sorted(errors_by_index.items())
+    ]
+    valid_rows = PropertyListAdapter.validate_python(
+        [row for index, row in enumerate(rows) if index not in errors_by_index]
+    )
+    return valid_rows, rejects
@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import date, datetime
+
+class PropertySummarySchema(BaseModel):
+    city: str
+    neighborhood: str
+    property_type: str
+    properties_count: int
+    price_avg: float
+    price_median: float
+    price_m2_avg: Optional[float] = None
+    price_m2_median: Optional[float] = None
+    area_m2_avg: float
+    last_collection_date: Optional[date] = None
+    refreshed_at: Optional[datetime] = None
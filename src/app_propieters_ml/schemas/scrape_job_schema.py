@@ -0,0 +1,20 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime
+
+class ScrapeJobSchema(BaseModel):
+    id: str
+    status: str
+    property_type: str
+    amostras_limit: int
+    workers: int
+    new_only: bool
+    pages_done: int
+    ads_collected: int
+    rows_upserted: int
+    ads_skipped: int
+    last_page: int
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
@@ -0,0 +1,136 @@
+from src.app_propieters_ml.schemas.property_schema import validate_properties
+from src.app_propieters_ml.core.metrics import SCRAPER_ROWS, span
+
+import logging
+
+# Configura do logger
+logging.basicConfig(
+    level=logging.INFO, # Nível mínimo para exibir
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S',
+)
+
+# Crie uma instância do logger para este módulo
+logger = logging.getLogger(__name__)
+
+# Interpretação dos textos dos cards de anúncio e validação das páginas, sem dependência do
+# Selenium: usada pela coleta ao vivo (scraping_zap_data_property) e pelo reprocessamento
+# offline das páginas salvas (html_snapshot).
+
+
+def build_raw_property(href: str, price_texts: list, area: str, bedroom: str, bathroom: str, parking: str, location: str):
+    """
+    Monta o dicionário bruto de um anúncio a partir dos textos já extraídos do card.
+
+    É a regra única de interpretação dos cards, usada tanto pela extração elemento a
+    elemento do Selenium quanto pela extração em JavaScript e pelo parser das páginas salvas.
+    Textos ausentes chegam como None.
+
+    Args:
+        href (str): URL do anúncio, de onde saem o ID e o tipo do imóvel.
+        price_texts (list): Textos dos parágrafos do container de preço (preço, condomínio/IPTU).
+        area (str): Texto da área do imóvel.
+        bedroom (str): Texto da quantidade de quartos.
+        bathroom (str): Texto da quantidade de banheiros.
+        parking (str): Texto da quantidade de vagas de garagem.
+        location (str): Texto da localização (bairro, cidade).
+
+    Returns:
+        dict | None: Os dados brutos do imóvel, ou None se a URL não contém o ID.
+    """
+    raw_data = {} # -> Dicionario com os dados brutos do anuncio
+    try:
+        # Pegando os dados de ID e Tipo de imovel dentro da URL
+        parts_url = href.split('-')
+        part_url_id = href.split('-id-')
+        part_id = part_url_id[1]
+        id_url = part_id.split('/')
+
+        raw_data["id"] = id_url[0]
+
+        raw_data["property_type"] = parts_url[1]
+    except Exception as e:
+        logger.error(f"Ocorreu um erro inesperado durante a coleta dos dados da URL atual: {e}")
+        return None
+
+    try:
+        # O primeiro parágrafo do container de preço é o preço do imovel
+        raw_data["price"] = price_texts[0]
+
+        prices = price_texts[1]
+        price_parts = prices.split('•')
+
+        # Verificando se o imovel possui somente o dado de IPTU
+        if "IPTU" in prices and "Cond." not in prices:
+            raw_data["iptu"] = prices.strip()
+
+        # Caso passe da ultima verificação, verificamos se ele tem os dados de condominio e IPTU, pois geralmente o condominio vem antes do IPTU no texto
+        if "Cond." in price_parts[0]:
+            raw_data["price_condominium"] = price_parts[0].strip()
+
+            if len(price_parts) > 1 and "IPTU" in price_parts[1]:
+                raw_data["iptu"] = price_parts[1].strip()
+    except Exception as e:
+        logger.error(f"Ocorreu um erro inesperado durante a coleta dos dados de IPTU e condominio: {e}")
+
+    # Pegando os dados de área do imovel
+    if area is not None:
+        raw_data["area_m2"] = area.strip()
+    else:
+        logger.error("Ocorreu um erro inesperado durante a coleta dos dados de área do imovel: área não encontrada.")
+
+    # Pegando os dados de quantos comodos o imovel possui
+    raw_data["rooms"] = bedroom.strip() if bedroom is not None else 0
+
+    # Pegando os dados de quantos banheiros o imovel possui
+    if bathroom is None:
+        raw_data["bathrooms"] = 0
+    elif "-" in bathroom:
+        # Aqui e uma verificação para caso esteja escrito dessa forma "1-2" banheiros, ai pegamos o valor maior
+        bathroom_parts = bathroom.split("-")
+        raw_data["bathrooms"] = bathroom_parts[1].strip()
+    else:
+        raw_data["bathrooms"] = bathroom.strip()
+
+    # Pegando os dados de quantas vagas de estacionamento o imovel possui
+    raw_data["vacancies"] = parking.strip() if parking is not None else 0
+
+    #  Pegando os dados de localização (estado, bairro) do imovel
+    try:
+        location_parts = location.split("\n")
+        location_index = location_parts[-1]
+        locations = location_index.split(",")
+        raw_data["city"] = locations[1].strip()
+        raw_data["neighborhood"] = locations[0].strip()
+    except Exception as e:
+        logger.error(f"Ocorreu um erro inesperado durante a coleta dos dados de estado e bairro onde o imovel se localiza: {e}")
+
+    return raw_data
+
+
+def vefiry_datas_for_send_json(datas_propertys:list):
+    """
+    Valida os dados brutos extraídos contra um esquema definido (Pydantic) e os 
+    prepara para a serialização em JSON.
+
+    Esta etapa é crucial para garantir a qualidade e a consistência dos dados antes
+    de salvá-los ou enviá-los para outro sistema.
+
+    Args:
+        datas_propertys (list): Uma lista de dicionários contendo os dados brutos 
+                                de cada imóvel.
+
+    Returns:
+        list: Uma lista de dicionários validados e prontos para serem convertidos 
+              em JSON.
+    """
+    # Validação da página inteira em uma única passada (TypeAdapter sobre a lista de PropertySchema)
+    with span("validate"):
+        property_list_validate, rejects = validate_properties(datas_propertys)
+    SCRAPER_ROWS.inc(len(property_list_validate), outcome="scraped")
+    SCRAPER_ROWS.inc(len(rejects), outcome="rejected")
+    for reject in rejects:
+        logger.error(f"Dicionário falhou na validação Pydantic: \n{reject['data']}")
+
+    # Retornamos umas lista de dicionarios
+    return property_list_validate
@@ -0,0 +1,197 @@
+from contextlib import contextmanager
+from time import monotonic
+
+import threading
+import logging
+
+# Crie uma instância do logger para este módulo
+logger = logging.getLogger(__name__)
+
+
+class PooledDriver:
+    """
+    Um WebDriver do pool e o seu uso, para decidir quando ele deve ser reciclado.
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages = 0
+        self.created_at = monotonic()
+
+    def mark_page(self, pages: int = 1):
+        # Quem usa o driver informa quantas páginas carregou
+        self.pages += pages
+
+
+class WebDriverPool:
+    """
+    Pool de navegadores Chrome já configurados (stealth), mantidos entre as coletas.
+
+    O pool é criado junto com a aplicação e entrega os navegadores às rotinas de
+    scraping, evitando pagar a inicialização do Chrome a cada requisição. Antes de
+    entregar, cada navegador passa por um health check; navegadores que travaram,
+    que excederam `max_pages` páginas ou `max_age_seconds` de vida são fechados e
+    substituídos por novos.
+
+    Args:
+        size (int): Quantidade máxima de navegadores abertos ao mesmo tempo.
+        driver_factory (callable): Função que cria um WebDriver configurado.
+        max_pages (int): Páginas carregadas antes de reciclar o navegador (limita o crescimento de memória).
+        max_age_seconds (float): Tempo máximo de vida de um navegador.
+    """
+
+    def __init__(self, size: int, driver_factory, max_pages: int = 100, max_age_seconds: float = 3600):
+        self.size = size
+        self.driver_factory = driver_factory
+        self.max_pages = max_pages
+        self.max_age_seconds = max_age_seconds
+
+        self._idle = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+        self._closed = False
+
+        # Contadores expostos em stats()
+        self.created = 0
+        self.recycled = 0
+        self.health_failures = 0
+        self.in_use = 0
+
+    def _create(self) -> PooledDriver:
+        pooled = PooledDriver(self.driver_factory())
+        with self._lock:
+            self.created += 1
+        return pooled
+
+    def _is_healthy(self, pooled: PooledDriver) -> bool:
+        # Import local: o Selenium só é carregado quando já existe um navegador (a API importa este módulo na subida)
+        from selenium.common.exceptions import WebDriverException
+
+        if pooled.pages >= self.max_pages or monotonic() - pooled.created_at >= self.max_age_seconds:
+            return False
+        try:
+            # Uma ida e volta simples ao navegador: falha se o Chrome ou o chromedriver morreram
+            pooled.driver.execute_script("return 1")
+            return True
+        except WebDriverException:
+            with self._lock:
+                self.health_failures += 1
+            return False
+
+    def _discard(self, pooled: PooledDriver):
+        with self._lock:
+            self.recycled += 1
+        try:
+            pooled.driver.quit()
+        except Exception as e:
+            logger.warning(f"Erro ao fechar navegador do pool: {e}")
+
+    def warm_up(self, count: int):
+        """
+        Abre `count` navegadores antecipadamente e os deixa ociosos no pool.
+        """
+        count = min(count, self.size)
+        for _ in range(count):
+            with self._lock:
+                if self._closed or len(self._idle) >= count:
+                    return
+            try:
+                pooled = self._create()
+            except Exception as e:
+                logger.error(f"Falha ao pré-aquecer navegador do pool: {e}", exc_info=True)
+                return
+            with self._lock:
+                self._idle.append(pooled)
+        logger.info(f"Pool de navegadores aquecido com {count} navegadores.")
+
+    def start(self, warm: int = 0):
+        """
+        Pré-aquece `warm` navegadores em segundo plano, sem atrasar a subida da aplicação.
+        """
+        if warm > 0:
+            threading.Thread(target=self.warm_up, args=(warm,), name="driver-pool-warmup", daemon=True).start()
+
+    def acquire(self, timeout: float = None) -> PooledDriver:
+        """
+        Retira um navegador saudável do pool, criando um novo se necessário.
+
+        Raises:
+            TimeoutError: Se nenhum navegador ficou livre dentro de `timeout` segundos.
+        """
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError("Nenhum navegador livre no pool.")
+
+        try:
+            while True:
+                with self._lock:
+                    if self._closed:
+                        raise RuntimeError("O pool de navegadores foi encerrado.")
+                    pooled = self._idle.pop() if self._idle else None
+
+                if pooled is None:
+                    pooled = self._create()
+                    break
+                if self._is_healthy(pooled):
+                    break
+                self._discard(pooled)
+        except BaseException:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self.in_use += 1
+        return pooled
+
+    def release(self, pooled: PooledDriver, broken: bool = False):
+        """
+        Devolve o navegador ao pool. Navegadores quebrados ou no fim da vida útil são fechados.
+        """
+        with self._lock:
+            self.in_use -= 1
+            keep = not broken and not self._closed and pooled.pages < self.max_pages
+            if keep:
+                self._idle.append(pooled)
+
+        if not keep:
+            self._discard(pooled)
+        self._slots.release()
+
+    @contextmanager
+    def driver(self, timeout: float = None):
+        """
+        Context manager que entrega um PooledDriver e o devolve ao final. Se uma exceção do
+        WebDriver escapar do bloco, o navegador é descartado.
+        """
+        from selenium.common.exceptions import WebDriverException
+
+        pooled = self.acquire(timeout=timeout)
+        broken = False
+        try:
+            yield pooled
+        except WebDriverException:
+            broken = True
+            raise
+        finally:
+            self.release(pooled, broken=broken)
+
+    def close(self):
+        """
+        Fecha todos os navegadores ociosos. Navegadores em uso são fechados ao serem devolvidos.
+        """
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for pooled in idle:
+            self._discard(pooled)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": self.size,
+                "idle": len(self._idle),
+                "in_use": self.in_use,
+                "created": self.created,
+                "recycled": self.recycled,
+                "health_failures": self.health_failures,
+                "max_pages": self.max_pages,
+            }
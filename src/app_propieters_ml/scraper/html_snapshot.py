@@ -0,0 +1,247 @@
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
+from time import perf_counter
+from pathlib import Path
+
+from src.app_propieters_ml.scraper.card_parser import build_raw_property, vefiry_datas_for_send_json
+
+import argparse
+import logging
+import gzip
+import json
+import os
+
+# Configura do logger
+logging.basicConfig(
+    level=logging.INFO, # Nível mínimo para exibir
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S',
+)
+
+# Crie uma instância do logger para este módulo
+logger = logging.getLogger(__name__)
+
+# Diretório padrão do arquivo de páginas salvas
+DEFAULT_SNAPSHOT_PATH = "./src/app_propieters_ml/scraper/snapshots"
+SNAPSHOT_PATTERN = "page-*.html.gz"
+
+# data-cy de cada campo do card -> nome do campo no dicionário de textos (o mesmo do EXTRACT_CARDS_JS)
+_CARD_FIELDS = {
+    "rp-cardProperty-price-txt": "price_texts",
+    "rp-cardProperty-propertyArea-txt": "area",
+    "rp-cardProperty-bedroomQuantity-txt": "bedroom",
+    "rp-cardProperty-bathroomQuantity-txt": "bathroom",
+    "rp-cardProperty-parkingSpacesQuantity-txt": "parking",
+    "rp-cardProperty-location-txt": "location",
+}
+
+# Tags sem fechamento, que não alteram a profundidade da árvore
+_VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+
+def snapshot_path(snapshot_dir: str, tipo: str, page: int) -> Path:
+    return Path(snapshot_dir) / tipo / f"page-{page:05d}.html.gz"
+
+
+def save_page_snapshot(page_source: str, snapshot_dir: str, tipo: str, page: int) -> Path:
+    """
+    Salva o HTML de uma página de resultados comprimido com gzip.
+
+    Args:
+        page_source (str): HTML da página (driver.page_source).
+        snapshot_dir (str): Diretório do arquivo de páginas.
+        tipo (str): Tipo de imóvel buscado na página.
+        page (int): Número da página de resultados.
+
+    Returns:
+        Path: Caminho do arquivo salvo.
+    """
+    path = snapshot_path(snapshot_dir, tipo, page)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    # Escrita atômica: um arquivo pela metade nunca entra no corpus
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as file:
+        file.write(page_source)
+    os.replace(tmp_path, path)
+    return path
+
+
+class CardHTMLParser(HTMLParser):
+    """
+    Lê o HTML de uma página de resultados e extrai os textos de cada card de anúncio.
+
+    Produz os mesmos dicionários que o EXTRACT_CARDS_JS devolve no navegador (href,
+    price_texts, area, bedroom, bathroom, parking, location), então o resultado passa
+    pelo mesmo build_raw_property da coleta ao vivo.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.cards = []
+        self._depth = 0
+        self._li_depth = None # -> Profundidade do <li> do card atual
+        self._card = None
+        self._card_depth = None
+        self._field = None
+        self._field_depth = None
+        self._capture_depth = None # -> Profundidade do <p>/<h3> cujo texto está sendo lido
+        self._chunks = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag not in _VOID_TAGS:
+            self._depth += 1
+        depth = self._depth
+
+        if tag == "li" and attrs.get("data-cy") == "rp-property-cd" and self._li_depth is None:
+            self._li_depth = depth
+        elif tag == "a" and self._li_depth is not None and self._card is None:
+            self._card = {"href": attrs.get("href"), "price_texts": None, "area": None, "bedroom": None,
+                          "bathroom": None, "parking": None, "location": None}
+            self._card_depth = depth
+        elif self._card is not None and self._field is None and attrs.get("data-cy") in _CARD_FIELDS:
+            self._field = _CARD_FIELDS[attrs["data-cy"]]
+            self._field_depth = depth
+            self._chunks = []
+            if self._field == "price_texts":
+                self._card["price_texts"] = []
+            elif self._field == "location":
+                self._capture_depth = depth
+        elif self._field is not None and self._capture_depth is None:
+            if (self._field == "price_texts" and tag == "p") or (self._field not in ("price_texts", "location") and tag == "h3"):
+                self._capture_depth = depth
+                self._chunks = []
+
+        # Quebra de linha entre elementos, como o innerText faz com os blocos da localização
+        if self._field == "location" and depth > self._field_depth:
+            self._chunks.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in _VOID_TAGS:
+            return
+        depth = self._depth
+        self._depth -= 1
+
+        if self._field is not None:
+            if self._field == "location" and depth > self._field_depth:
+                self._chunks.append("\n")
+            if self._capture_depth == depth:
+                self._close_capture()
+            if self._field_depth == depth:
+                self._field = None
+                self._field_depth = None
+                self._capture_depth = None
+
+        if self._card_depth == depth:
+            self.cards.append(self._card)
+            self._card = None
+            self._card_depth = None
+        if self._li_depth == depth:
+            self._li_depth = None
+
+    def handle_data(self, data):
+        if self._capture_depth is not None:
+            self._chunks.append(data)
+
+    def _close_capture(self):
+        text = "".join(self._chunks)
+        if self._field == "location":
+            lines = [" ".join(line.split()) for line in text.split("\n")]
+            self._card["location"] = "\n".join(line for line in lines if line)
+        else:
+            text = " ".join(text.split())
+            if self._field == "price_texts":
+                self._card["price_texts"].append(text)
+            else:
+                self._card[self._field] = text
+        self._capture_depth = None
+        self._chunks = []
+
+
+def parse_results_html(html: str) -> list:
+    """
+    Extrai os textos dos cards de anúncio de uma página de resultados salva.
+
+    Returns:
+        list: Um dicionário de textos por card, no formato do EXTRACT_CARDS_JS.
+    """
+    parser = CardHTMLParser()
+    parser.feed(html)
+    parser.close()
+    return parser.cards
+
+
+def parse_snapshot(path: str) -> list:
+    """
+    Lê uma página salva e devolve os dicionários brutos dos anúncios, como na coleta ao vivo.
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        cards = parse_results_html(file.read())
+
+    list_data_propertys = []
+    for card in cards:
+        href = card.pop("href")
+        if not href:
+            continue
+        raw_data = build_raw_property(href=href, **card)
+        if raw_data is not None:
+            list_data_propertys.append(raw_data)
+    return list_data_propertys
+
+
+def _parse_and_validate(path: str) -> list:
+    return vefiry_datas_for_send_json(parse_snapshot(path))
+
+
+def parse_snapshot_archive(snapshot_dir: str = DEFAULT_SNAPSHOT_PATH, workers: int = None, validate: bool = True) -> list:
+    """
+    Reprocessa todas as páginas salvas de um diretório em um pool de processos.
+
+    Cada página é lida, interpretada e (opcionalmente) validada pelo PropertySchema em
+    um processo separado; o resultado mantém a ordem dos arquivos e um anúncio por ID.
+
+    Args:
+        snapshot_dir (str): Diretório do arquivo de páginas (inclui subdiretórios por tipo).
+        workers (int): Quantidade de processos. Por padrão, um por CPU.
+        validate (bool): Valida e limpa os dados com o PropertySchema. Se False, devolve os dados brutos.
+
+    Returns:
+        list: Lista de dicionários dos imóveis, sem IDs duplicados.
+    """
+    paths = sorted(str(path) for path in Path(snapshot_dir).rglob(SNAPSHOT_PATTERN))
+    if not paths:
+        raise FileNotFoundError(f"Nenhuma página salva encontrada em '{snapshot_dir}'.")
+
+    started = perf_counter()
+    func = _parse_and_validate if validate else parse_snapshot
+    # Lotes de arquivos por tarefa reduzem o custo de comunicação entre os processos
+    chunksize = max(1, len(paths) // ((workers or os.cpu_count() or 1) * 4))
+
+    rows = []
+    seen_ids = set()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for page_rows in executor.map(func, paths, chunksize=chunksize):
+            for row in page_rows:
+                if row["id"] not in seen_ids:
+                    seen_ids.add(row["id"])
+                    rows.append(row)
+
+    logger.info(f"{len(paths)} páginas reprocessadas em {perf_counter() - started:.2f}s: {len(rows)} anúncios únicos.")
+    return rows
+
+
+if __name__ == "__main__":
+    # Ex: python -m src.app_propieters_ml.scraper.html_snapshot --workers 4 --output imoveis.json
+    parser = argparse.ArgumentParser(description="Reprocessa as páginas de resultados salvas sem abrir o navegador.")
+    parser.add_argument("snapshot_dir", nargs="?", default=DEFAULT_SNAPSHOT_PATH, help="Diretório das páginas salvas.")
+    parser.add_argument("--workers", type=int, default=None, help="Quantidade de processos.")
+    parser.add_argument("--raw", action="store_true", help="Não valida os dados com o PropertySchema.")
+    parser.add_argument("--output", default=None, help="Arquivo JSON de saída.")
+    args = parser.parse_args()
+
+    properties = parse_snapshot_archive(args.snapshot_dir, workers=args.workers, validate=not args.raw)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(properties, file, ensure_ascii=False, default=str)
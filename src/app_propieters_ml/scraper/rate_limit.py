@@ -0,0 +1,197 @@
+from collections import deque, Counter
+from time import monotonic, sleep
+from random import uniform
+from src.app_propieters_ml.core.metrics import SCRAPER_PAGES
+
+import threading
+import logging
+
+# Crie uma instância do logger para este módulo
+logger = logging.getLogger(__name__)
+
+# Resultados de uma página informados ao AdaptivePacer
+PAGE_OK = "ok"
+PAGE_SLOW = "slow"
+PAGE_TIMEOUT = "timeout"
+PAGE_CAPTCHA = "captcha"
+PAGE_EMPTY = "empty"
+
+
+class RateLimiter:
+    """
+    Limitador de taxa global (token bucket), compartilhado entre os navegadores do pool.
+
+    Cada carregamento de página consome um token. Os tokens são repostos a
+    `rate` por segundo, até o limite de `burst`, então o site nunca recebe mais
+    que `rate` páginas por segundo somando todos os workers.
+
+    Args:
+        rate (float): Páginas por segundo permitidas no total.
+        burst (int): Quantidade máxima de páginas que podem sair de uma vez.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _wait_time(self) -> float:
+        # Tempo até o próximo token; chamado com o lock
+        return (1 - self._tokens) / self.rate
+
+    def acquire(self, stop_event: threading.Event = None) -> bool:
+        """
+        Bloqueia até haver um token disponível.
+
+        Returns:
+            bool: False se `stop_event` foi sinalizado durante a espera.
+        """
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait_time = self._wait_time()
+
+            if stop_event is not None:
+                if stop_event.wait(wait_time):
+                    return False
+            else:
+                sleep(wait_time)
+
+
+class Backoff:
+    """
+    Espera exponencial com jitter, usada por cada worker após falhas consecutivas.
+
+    Args:
+        base (float): Espera, em segundos, após a primeira falha.
+        maximum (float): Espera máxima, em segundos.
+    """
+
+    def __init__(self, base: float = 5.0, maximum: float = 120.0):
+        self.base = base
+        self.maximum = maximum
+        self.failures = 0
+
+    def next_delay(self) -> float:
+        self.failures += 1
+        delay = min(self.maximum, self.base * 2 ** (self.failures - 1))
+        # Jitter: evita que vários workers voltem ao mesmo tempo
+        return uniform(delay / 2, delay)
+
+    def reset(self):
+        self.failures = 0
+
+
+class AdaptivePacer(RateLimiter):
+    """
+    Token bucket cuja taxa se ajusta ao comportamento do site (AIMD).
+
+    Substitui as pausas fixas do scraper: cada carregamento de página consome um token,
+    e o resultado observado de cada página ajusta a taxa. Páginas que carregam rápido
+    aumentam a taxa aos poucos (aumento aditivo); timeouts, páginas sem anúncios e
+    captchas a cortam pela metade (redução multiplicativa). Um captcha também pausa
+    todas as coletas por `captcha_cooldown` segundos.
+
+    Qualquer objeto com `acquire(stop_event)` e `record(page, load_seconds, outcome)`
+    pode ser usado no lugar desta classe pelos scrapers.
+
+    Args:
+        rate (float): Páginas por segundo no início.
+        min_rate (float): Taxa mínima após reduções.
+        max_rate (float): Taxa máxima após aumentos.
+        increase (float): Páginas por segundo somadas à taxa a cada página rápida.
+        decrease (float): Fator multiplicado à taxa a cada sinal de bloqueio ou lentidão grave.
+        slow_load_seconds (float): Tempo de carregamento acima do qual a página é considerada lenta (a taxa não sobe).
+        captcha_cooldown (float): Pausa global, em segundos, após um captcha.
+        jitter (float): Variação aleatória das esperas (0.2 -> até 20% a mais), evitando um ritmo fixo.
+        stats_window (int): Quantidade de páginas recentes usadas nas estatísticas.
+    """
+
+    def __init__(self, rate: float = 0.2, min_rate: float = 0.02, max_rate: float = 1.0, increase: float = 0.02,
+                 decrease: float = 0.5, slow_load_seconds: float = 8.0, captcha_cooldown: float = 120.0,
+                 jitter: float = 0.2, stats_window: int = 200):
+        super().__init__(rate=rate, burst=1)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.slow_load_seconds = slow_load_seconds
+        self.captcha_cooldown = captcha_cooldown
+        self.jitter = jitter
+
+        self._paused_until = 0.0
+        self._pages = deque(maxlen=stats_window)
+        self._outcomes = Counter()
+        self._local = threading.local() # -> Espera do último acquire de cada worker
+
+    def _wait_time(self) -> float:
+        # Respeita a pausa após captcha e adiciona jitter à espera do token
+        pause = self._paused_until - monotonic()
+        wait_time = (1 - self._tokens) / self.rate * uniform(1, 1 + self.jitter)
+        return max(wait_time, pause)
+
+    def _refill(self):
+        super()._refill()
+        if monotonic() < self._paused_until:
+            # Durante a pausa nenhum token fica disponível
+            self._tokens = min(self._tokens, 0.0)
+
+    def acquire(self, stop_event: threading.Event = None) -> bool:
+        started = monotonic()
+        acquired = super().acquire(stop_event)
+        self._local.waited = monotonic() - started
+        return acquired
+
+    def record(self, page, load_seconds: float, outcome: str = PAGE_OK):
+        """
+        Informa o resultado de uma página e ajusta a taxa.
+
+        Args:
+            page: Identificação da página nos logs (ex: "casa#3").
+            load_seconds (float): Tempo até a lista de anúncios estar pronta no DOM.
+            outcome (str): PAGE_OK, PAGE_TIMEOUT, PAGE_CAPTCHA ou PAGE_EMPTY.
+        """
+        with self._lock:
+            if outcome == PAGE_OK and load_seconds > self.slow_load_seconds:
+                outcome = PAGE_SLOW
+
+            previous_rate = self.rate
+            if outcome == PAGE_OK:
+                self.rate = min(self.max_rate, self.rate + self.increase)
+            elif outcome in (PAGE_TIMEOUT, PAGE_CAPTCHA, PAGE_EMPTY):
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+            if outcome == PAGE_CAPTCHA:
+                self._paused_until = monotonic() + self.captcha_cooldown
+
+            self._pages.append(load_seconds)
+            self._outcomes[outcome] += 1
+        SCRAPER_PAGES.inc(outcome=outcome)
+        waited = getattr(self._local, "waited", 0.0)
+
+        logger.info(
+            f"Ritmo página {page}: carregada em {load_seconds:.2f}s, resultado={outcome}, "
+            f"espera={waited:.2f}s, taxa {previous_rate:.3f} -> {self.rate:.3f} pág/s."
+        )
+        return outcome
+
+    def stats(self) -> dict:
+        with self._lock:
+            loads = sorted(self._pages)
+            return {
+                "rate": round(self.rate, 4),
+                "pages": sum(self._outcomes.values()),
+                "outcomes": dict(self._outcomes),
+                "load_seconds_p50": round(loads[len(loads) // 2], 3) if loads else None,
+                "load_seconds_max": round(loads[-1], 3) if loads else None,
+                "paused": monotonic() < self._paused_until,
+            }
@@ -0,0 +1,340 @@
+from selenium.common.exceptions import WebDriverException
+from concurrent.futures import ThreadPoolExecutor
+from typing import Literal, Union, List
+from time import perf_counter
+
+from src.app_propieters_ml.scraper.scraping_zap_data_property import (
+    build_chrome_driver,
+    build_search_url,
+    extract_page_cards,
+    vefiry_datas_for_send_json,
+    wait_for_results_page,
+)
+from src.app_propieters_ml.scraper.html_snapshot import save_page_snapshot
+from src.app_propieters_ml.scraper.rate_limit import AdaptivePacer, Backoff, PAGE_OK, PAGE_SLOW, PAGE_EMPTY
+from src.app_propieters_ml.core.metrics import SCRAPER_ROWS
+
+import threading
+import logging
+import queue
+
+# Configura do logger
+logging.basicConfig(
+    level=logging.INFO, # Nível mínimo para exibir
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S',
+)
+
+# Crie uma instância do logger para este módulo
+logger = logging.getLogger(__name__)
+
+TipoImovel = Literal["apartamento", "casa", "quitinete", "sobrado"]
+
+# Intervalo, em segundos, entre as verificações de cancelamento enquanto um worker espera um navegador do pool
+DRIVER_ACQUIRE_POLL_SECONDS = 1.0
+
+class PageScheduler:
+    """
+    Distribui as páginas de resultados entre os workers.
+
+    Cada tipo de imóvel tem o seu contador de páginas. Os tipos são atendidos em
+    rodízio até que cada um atinja `amostras_limit` anúncios únicos ou chegue a uma
+    página sem anúncios (fim dos resultados).
+    """
+
+    def __init__(self, tipos: List[str], amostras_limit: int, start_page: int = 1):
+        self.tipos = list(tipos)
+        self.amostras_limit = amostras_limit
+        self._next_page = {tipo: start_page for tipo in self.tipos}
+        self._last_page = {tipo: None for tipo in self.tipos}
+        self._collected = {tipo: 0 for tipo in self.tipos}
+        self._turn = 0
+        self._lock = threading.Lock()
+
+    def _is_active(self, tipo: str) -> bool:
+        last_page = self._last_page[tipo]
+        return self._collected[tipo] < self.amostras_limit and (last_page is None or self._next_page[tipo] <= last_page)
+
+    def next_task(self):
+        """
+        Retorna o próximo (tipo, página) a ser raspado, ou None quando não há mais trabalho.
+        """
+        with self._lock:
+            for offset in range(len(self.tipos)):
+                tipo = self.tipos[(self._turn + offset) % len(self.tipos)]
+                if self._is_active(tipo):
+                    self._turn = (self._turn + offset + 1) % len(self.tipos)
+                    page = self._next_page[tipo]
+                    self._next_page[tipo] += 1
+                    return tipo, page
+            return None
+
+    def report(self, tipo: str, page: int, new_ads: int, empty: bool):
+        """
+        Registra o resultado de uma página: anúncios novos coletados ou fim dos resultados.
+        """
+        with self._lock:
+            self._collected[tipo] += new_ads
+            if empty:
+                last_page = self._last_page[tipo]
+                self._last_page[tipo] = page - 1 if last_page is None else min(last_page, page - 1)
+
+    def collected(self) -> dict:
+        with self._lock:
+            return dict(self._collected)
+
+
+def scrape_results_page(driver, tipo: str, page: int, extraction_mode: Literal["js", "elements"] = "js",
+                        snapshot_dir: str = None, pacer=None):
+    """
+    Abre uma página de resultados pela URL e extrai os anúncios validados.
+
+    O tempo de carregamento e o resultado da página (ok, captcha, sem anúncios, timeout)
+    são informados ao `pacer`. Se `snapshot_dir` for informado, o HTML da página também é
+    salvo para reprocessamento offline.
+
+    Returns:
+        tuple: (resultado da página, lista de dicionários validados). A lista é None quando a
+               página não foi lida: sem anúncios (PAGE_EMPTY) ou bloqueada (PAGE_CAPTCHA, PAGE_TIMEOUT).
+    """
+    started = perf_counter()
+    driver.get(build_search_url(tipo, page))
+
+    # Espera explícita pelos anúncios no DOM
+    load_seconds, outcome = wait_for_results_page(driver, started)
+    if pacer is not None:
+        outcome = pacer.record(f"{tipo}#{page}", load_seconds, outcome)
+    if outcome not in (PAGE_OK, PAGE_SLOW):
+        return outcome, None
+
+    datas_propertys, _ = extract_page_cards(driver, extraction_mode)
+    if snapshot_dir is not None:
+        save_page_snapshot(driver.page_source, snapshot_dir, tipo, page)
+    return outcome, vefiry_datas_for_send_json(datas_propertys)
+
+
+def iter_parallel_scraping_pages(tipos: Union[TipoImovel, List[TipoImovel]], amostras_limit: int, n_workers: int = 3,
+                                 pages_per_second: float = 0.5, max_retries: int = 3, driver_factory=build_chrome_driver,
+                                 driver_pool=None, extraction_mode: Literal["js", "elements"] = "js", snapshot_dir: str = None,
+                                 stop_event: threading.Event = None, start_page: int = 1, pacer=None):
+    """
+    Executa a raspagem com vários navegadores em paralelo e gera os anúncios página a página.
+
+    Cada worker tem o seu próprio Chrome com stealth e pega páginas do PageScheduler,
+    acessando-as diretamente pela URL (parâmetro `pagina`). Um conjunto compartilhado
+    de IDs descarta anúncios repetidos entre páginas e workers. Todos os workers passam
+    pelo mesmo AdaptivePacer, que ajusta o ritmo global pelos tempos de carregamento e
+    sinais de bloqueio, e cada um aplica backoff exponencial após falhas.
+
+    As páginas passam por uma fila limitada até quem consome: se o consumidor demora
+    (ex: salvando no banco), os workers esperam em vez de acumular dados em memória.
+
+    Args:
+        tipos (str | list): Um tipo de imóvel ou uma lista de tipos a serem divididos entre os workers.
+        amostras_limit (int): Número máximo de anúncios únicos a coletar por tipo de imóvel.
+        n_workers (int): Quantidade de navegadores em paralelo.
+        pages_per_second (float): Taxa global inicial de carregamento de páginas.
+        max_retries (int): Tentativas por página antes de desistir dela.
+        driver_factory (callable): Função que cria um WebDriver configurado.
+        driver_pool (WebDriverPool): Pool de navegadores aquecidos. Quando informado, os workers
+                                     pegam os navegadores do pool em vez de usar `driver_factory`.
+        extraction_mode (Literal): "js" extrai cada página com um único execute_script;
+                                   "elements" consulta cada campo de cada card separadamente.
+        snapshot_dir (str): Diretório onde o HTML de cada página é salvo (gzip) para reprocessamento offline.
+        stop_event (threading.Event): Quando sinalizado (cancelamento externo), os workers param.
+        start_page (int): Página de resultados onde a coleta de cada tipo começa (retomada de um checkpoint).
+        pacer (AdaptivePacer): Controla o ritmo global. Por padrão, um AdaptivePacer iniciando em `pages_per_second`.
+
+    Yields:
+        tuple: (tipo, número da página, lista de dicionários validados ainda não vistos)
+    """
+    tipos = [tipos] if isinstance(tipos, str) else list(tipos)
+    scheduler = PageScheduler(tipos, amostras_limit, start_page=start_page)
+    pacer = pacer if pacer is not None else AdaptivePacer(rate=pages_per_second)
+    stop_event = stop_event if stop_event is not None else threading.Event()
+
+    seen_ids = set() # -> IDs já coletados por qualquer worker
+    seen_lock = threading.Lock()
+    pages = queue.Queue(maxsize=max(2, n_workers * 2)) # -> Páginas prontas aguardando o consumidor
+    done = object() # -> Marca o fim da coleta na fila
+
+    def take_unique(rows: list) -> list:
+        new_rows = []
+        with seen_lock:
+            for row in rows:
+                if row["id"] not in seen_ids:
+                    seen_ids.add(row["id"])
+                    new_rows.append(row)
+        SCRAPER_ROWS.inc(len(rows) - len(new_rows), outcome="deduplicated")
+        return new_rows
+
+    def emit(item) -> bool:
+        # Espera espaço na fila, desistindo se a coleta foi interrompida
+        while not stop_event.is_set():
+            try:
+                pages.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def open_driver():
+        if driver_pool is None:
+            return driver_factory()
+        # Com mais workers que navegadores no pool, espera um ficar livre sem deixar de ver o cancelamento
+        while not stop_event.is_set():
+            try:
+                return driver_pool.acquire(timeout=DRIVER_ACQUIRE_POLL_SECONDS)
+            except TimeoutError:
+                continue
+        return None
+
+    def close_driver(handle, broken: bool):
+        if driver_pool is not None:
+            driver_pool.release(handle, broken=broken)
+            return
+        try:
+            handle.quit()
+        except Exception:
+            pass
+
+    def worker(worker_id: int):
+        handle = None
+        backoff = Backoff()
+        try:
+            while not stop_event.is_set():
+                task = scheduler.next_task()
+                if task is None:
+                    break
+                tipo, page = task
+                last_failure = None # -> Motivo da última tentativa sem anúncios (erro do navegador, captcha ou timeout)
+                last_error = None # -> Erro do navegador na última tentativa
+                empty = False # -> Alguma tentativa carregou a página sem anúncios (PAGE_EMPTY)
+
+                for attempt in range(1, max_retries + 1):
+                    if not pacer.acquire(stop_event):
+                        return
+                    try:
+                        if handle is None:
+                            handle = open_driver()
+                            if handle is None:
+                                return
+                        driver = handle.driver if driver_pool is not None else handle
+                        outcome, rows = scrape_results_page(driver, tipo, page, extraction_mode, snapshot_dir, pacer)
+                        if driver_pool is not None:
+                            handle.mark_page()
+                            # Navegador no fim da vida útil: devolvemos (o pool fecha) e pegamos outro na próxima página
+                            if handle.pages >= driver_pool.max_pages:
+                                close_driver(handle, broken=False)
+                                handle = None
+                    except WebDriverException as e:
+                        logger.warning(f"[worker {worker_id}] Falha na página {page} de '{tipo}' (tentativa {attempt}): {e.msg}")
+                        # O navegador pode ter travado: descartamos e criamos outro na próxima tentativa
+                        if handle is not None:
+                            close_driver(handle, broken=True)
+                            handle = None
+                        rows = None
+                        last_error = e
+                        last_failure = e.msg
+                    else:
+                        if outcome == PAGE_EMPTY:
+                            empty = True
+                        elif rows is None:
+                            # Captcha ou timeout: bloqueio temporário, não o fim dos resultados
+                            last_failure = outcome
+
+                    if rows is not None:
+                        backoff.reset()
+                        new_rows = take_unique(rows)
+                        scheduler.report(tipo, page, len(new_rows), empty=False)
+                        logger.info(f"[worker {worker_id}] Página {page} de '{tipo}': {len(new_rows)} anúncios novos.")
+                        if not emit((tipo, page, new_rows)):
+                            return
+                        break
+
+                    # Página vazia, bloqueada ou com erro: tentamos de novo após o backoff
+                    delay = backoff.next_delay()
+                    if attempt < max_retries and stop_event.wait(delay):
+                        return
+                else:
+                    if not empty:
+                        # Nenhuma tentativa viu a página sem anúncios (erro do navegador, captcha ou timeout):
+                        # não é o fim dos resultados, a coleta falha
+                        raise RuntimeError(
+                            f"Página {page} de '{tipo}' falhou em todas as {max_retries} tentativas: {last_failure}"
+                        ) from last_error
+                    # Após todas as tentativas sem anúncios, consideramos o fim dos resultados do tipo
+                    logger.info(f"[worker {worker_id}] Página {page} de '{tipo}' sem anúncios após {max_retries} tentativas.")
+                    scheduler.report(tipo, page, 0, empty=True)
+        finally:
+            if handle is not None:
+                close_driver(handle, broken=False)
+
+    def coordinator():
+        error = None
+        with ThreadPoolExecutor(max_workers=n_workers, thread_name_prefix="scraper") as executor:
+            futures = [executor.submit(worker, worker_id) for worker_id in range(n_workers)]
+            for future in futures:
+                try:
+                    future.result()
+                except BaseException as e:
+                    # Qualquer erro inesperado encerra todos os workers
+                    stop_event.set()
+                    error = error or e
+        pages.put(error if error is not None else done)
+
+    logger.info(f"Iniciando scraping paralelo de {tipos} com {n_workers} navegadores.")
+    coordinator_thread = threading.Thread(target=coordinator, name="scraper-coordinator", daemon=True)
+    coordinator_thread.start()
+
+    finished = False
+    try:
+        while True:
+            item = pages.get()
+            if item is done:
+                finished = True
+                break
+            if isinstance(item, BaseException):
+                finished = True
+                raise item
+            yield item
+    finally:
+        if not finished:
+            # O consumidor parou antes do fim (cancelamento ou erro): paramos os workers e esvaziamos a fila
+            stop_event.set()
+            while True:
+                item = pages.get()
+                if item is done or isinstance(item, BaseException):
+                    break
+        coordinator_thread.join()
+
+    logger.info(f"--- COLETA PARALELA CONCLUÍDA --- {len(seen_ids)} anúncios únicos: {scheduler.collected()}")
+
+
+def parallel_scraping_ad_and_url(tipos: Union[TipoImovel, List[TipoImovel]], amostras_limit: int, n_workers: int = 3,
+                                 pages_per_second: float = 0.5, max_retries: int = 3, driver_factory=build_chrome_driver,
+                                 driver_pool=None, extraction_mode: Literal["js", "elements"] = "js", snapshot_dir: str = None,
+                                 stop_event: threading.Event = None, progress=None, pacer=None):
+    """
+    Executa a raspagem com vários navegadores em paralelo e retorna todos os anúncios de uma vez.
+
+    Os parâmetros são os mesmos de iter_parallel_scraping_pages, mais:
+
+    Args:
+        progress (callable): Chamada após cada página com (páginas processadas, anúncios únicos).
+        pacer (AdaptivePacer): Controla o ritmo global das páginas.
+
+    Returns:
+        list: Lista de dicionários validados e sem IDs duplicados.
+    """
+    results = []
+    pages_done = 0
+    for _, _, rows in iter_parallel_scraping_pages(tipos, amostras_limit, n_workers=n_workers, pages_per_second=pages_per_second,
+                                                   max_retries=max_retries, driver_factory=driver_factory, driver_pool=driver_pool,
+                                                   extraction_mode=extraction_mode, snapshot_dir=snapshot_dir, stop_event=stop_event,
+                                                   pacer=pacer):
+        results.extend(rows)
+        pages_done += 1
+        if progress is not None:
+            progress(pages_done, len(results))
+    return results
@@ -5,15 +5,19 @@ from selenium.webdriver.chrome.service import Service as ChromeService
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.common.exceptions import TimeoutException
-from time import sleep
-from random import uniform
+from selenium.common.exceptions import TimeoutException, WebDriverException, NoSuchElementException
+from time import perf_counter
 from urllib.parse import urljoin
 from selenium_stealth import stealth
-from src.app_propieters_ml.schemas.property_schema import PropertySchema
-from pydantic import ValidationError
+from src.app_propieters_ml.core.metrics import span, observe_stage
+from src.app_propieters_ml.scraper.card_parser import build_raw_property, vefiry_datas_for_send_json
+from src.app_propieters_ml.scraper.html_snapshot import save_page_snapshot
+from src.app_propieters_ml.scraper.rate_limit import AdaptivePacer, PAGE_OK, PAGE_SLOW, PAGE_CAPTCHA, PAGE_EMPTY, PAGE_TIMEOUT
 
 import logging
+import json
+import os
+from pathlib import Path
 from typing import Literal
 
 # Configura do logger
@@ -27,23 +31,75 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-# Função de main de raspagem
-def main_scraping_ad_and_url(tipo: Literal["apartamento", "casa", "quitinete", "sobrado"], amostras_limit: int):
+AD_SELECTOR = 'li[data-cy="rp-property-cd"] a' # -> Elementos de anuncios da página
+
+# URLs utilizadas na raspagem
+URL_BASE = "https://www.zapimoveis.com.br/venda/"
+URLS_ALTER = {"apartamento":"apartamentos/?transacao=venda&tipos=apartamento_residencial&ordem=MOST_RELEVANT", "casa":"casas/?transacao=venda&tipos=casa_residencial&ordem=MOST_RELEVANT",
+            "quitinete":"quitinetes/?transacao=venda&tipos=kitnet_residencial&ordem=MOST_RELEVANT","sobrado":"sobrados/?transacao=venda&tipos=sobrado_residencial&ordem=MOST_RELEVANT"
+}
+
+
+def build_search_url(tipo: Literal["apartamento", "casa", "quitinete", "sobrado"], page: int = 1):
+    """
+    Monta a URL de resultados de um tipo de imóvel. As páginas são endereçáveis pelo
+    parâmetro `pagina`, o que permite abrir qualquer página sem clicar em "próxima".
+    """
+    full_url = urljoin(URL_BASE, URLS_ALTER[tipo]) # -> URL que efetua a junção da URL main mais a URL determinada pelo tipo de imovel
+    if page > 1:
+        full_url = f"{full_url}&pagina={page}"
+    return full_url
+
+
+# Arquivo onde guardamos o caminho do chromedriver já resolvido pelo webdriver-manager
+DRIVER_PATH_CACHE = Path(os.getenv("SCRAPER_DRIVER_PATH_CACHE", Path.home() / ".cache" / "app_propieters_ml" / "chromedriver.json"))
+_resolved_driver_path = None
+
+
+def resolve_chromedriver_path():
+    """
+    Retorna o caminho do chromedriver sem consultar o webdriver-manager a cada navegador.
+
+    A ordem é: variável CHROMEDRIVER_PATH, caminho já resolvido neste processo, caminho
+    gravado em DRIVER_PATH_CACHE (se o arquivo ainda existir) e, por último, o
+    ChromeDriverManager, cujo resultado é gravado no cache local.
     """
-    Função principal que orquestra o processo de web scraping no site Zap Imóveis.
+    global _resolved_driver_path
+
+    env_path = os.getenv("CHROMEDRIVER_PATH")
+    if env_path:
+        return env_path
+    if _resolved_driver_path and os.path.exists(_resolved_driver_path):
+        return _resolved_driver_path
+
+    try:
+        cached_path = json.loads(DRIVER_PATH_CACHE.read_text(encoding="utf-8"))["path"]
+        if os.path.exists(cached_path):
+            _resolved_driver_path = cached_path
+            return cached_path
+    except (FileNotFoundError, KeyError, ValueError):
+        pass
+
+    # O ChromeDriverManager cuida de baixar e gerenciar a versão correta do driver automaticamente.
+    _resolved_driver_path = ChromeDriverManager().install()
+    try:
+        DRIVER_PATH_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        DRIVER_PATH_CACHE.write_text(json.dumps({"path": _resolved_driver_path}), encoding="utf-8")
+    except OSError as e:
+        logger.warning(f"Não foi possível gravar o cache do chromedriver: {e}")
+    return _resolved_driver_path
 
-    Esta função navega pelas páginas de resultados para um determinado tipo de imóvel, 
-    coleta os links de todos os anúncios até atingir um limite especificado e gerencia
-    a extração e validação dos dados de cada anúncio.
+
+def build_chrome_driver(max_memory_mb: int = None):
+    """
+    Cria um Chrome headless com as opções e o selenium-stealth usados na raspagem.
 
     Args:
-        tipo (Literal): O tipo de imóvel a ser buscado. 
-                        Valores aceitos: "apartamento", "casa", "quitinete", "sobrado".
-        amostras_limit (int): O número máximo de anúncios a serem coletados antes de parar o processo.
+        max_memory_mb (int): Limite de heap JavaScript por aba, em MB. Por padrão usa
+                             a variável SCRAPER_BROWSER_MAX_MEMORY_MB, se definida.
 
     Returns:
-        list: Uma lista de dicionários, onde cada dicionário contém os dados de um imóvel,
-              validados e prontos para serem salvos em JSON.
+        WebDriver: O navegador pronto para uso. Quem cria é responsável por chamar `driver.quit()`.
     """
     # --- Configuração das Opções do Navegador Chrome ---
 
@@ -78,12 +134,19 @@ def main_scraping_ad_and_url(tipo: Literal["apartamento", "casa", "quitinete", "
     user_agent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/128.0.0.0 Safari/537.36"
     chrome_options.add_argument(f"user-agent={user_agent}")
 
+    # Limita a memória de cada navegador: heap do JavaScript, um único processo de renderização e sem cache em disco.
+    max_memory_mb = max_memory_mb or os.getenv("SCRAPER_BROWSER_MAX_MEMORY_MB")
+    if max_memory_mb:
+        chrome_options.add_argument(f"--js-flags=--max-old-space-size={int(max_memory_mb)}")
+        chrome_options.add_argument("--renderer-process-limit=1")
+        chrome_options.add_argument("--disk-cache-size=1")
+
 
     # --- Inicialização do WebDriver ---
 
     # Inicializa o WebDriver do Chrome, aplicando todas as configurações definidas acima.
-    # O ChromeDriverManager cuida de baixar e gerenciar a versão correta do driver automaticamente.
-    driver = webdriver.Chrome(service=ChromeService(ChromeDriverManager().install()), options=chrome_options)
+    # O caminho do chromedriver é resolvido uma única vez e reaproveitado (ver resolve_chromedriver_path).
+    driver = webdriver.Chrome(service=ChromeService(resolve_chromedriver_path()), options=chrome_options)
 
 
     # --- Configuração do Selenium Stealth ---
@@ -104,63 +167,147 @@ def main_scraping_ad_and_url(tipo: Literal["apartamento", "casa", "quitinete", "
             fix_hairline=True,
             )
 
+    return driver
+
+
+# Script que descreve o estado da página de resultados: DOM carregado, quantidade de anúncios e sinais de captcha
+PAGE_STATE_JS = """
+const title = (document.title || "").toLowerCase();
+const captcha = Boolean(document.querySelector(
+    "iframe[src*='captcha'], iframe[src*='challenge'], #px-captcha, .g-recaptcha, .h-captcha, #challenge-form"
+)) || title.includes("just a moment") || title.includes("attention required");
+return {ready: document.readyState === "complete", cards: document.querySelectorAll(arguments[0]).length, captcha: captcha};
+"""
+
+
+def wait_for_results_page(driver, started: float = None, timeout: float = 15.0):
+    """
+    Espera a página de resultados ficar pronta: DOM carregado e anúncios presentes.
+
+    A cada verificação o estado da página é lido com um único execute_script, que
+    também detecta páginas de captcha/desafio.
+
+    Args:
+        driver (WebDriver): Navegador com a página de resultados.
+        started (float): perf_counter() do início da navegação. Por padrão, o momento da chamada.
+        timeout (float): Tempo máximo de espera, em segundos.
+
+    Returns:
+        tuple: (tempo de carregamento em segundos, resultado: PAGE_OK, PAGE_CAPTCHA, PAGE_EMPTY ou PAGE_TIMEOUT)
+    """
+    started = perf_counter() if started is None else started
+    state = {}
+
+    def page_ready(d):
+        state.update(d.execute_script(PAGE_STATE_JS, AD_SELECTOR))
+        return state["captcha"] or (state["ready"] and state["cards"] > 0)
+
+    try:
+        with span("page_wait"):
+            WebDriverWait(driver, timeout, poll_frequency=0.25).until(page_ready)
+    except TimeoutException:
+        # DOM carregado e nenhum anúncio: fim dos resultados ou bloqueio silencioso
+        return perf_counter() - started, PAGE_EMPTY if state.get("ready") else PAGE_TIMEOUT
+
+    return perf_counter() - started, PAGE_CAPTCHA if state["captcha"] else PAGE_OK
+
+
+# Função de main de raspagem
+def iter_scraping_pages(tipo: Literal["apartamento", "casa", "quitinete", "sobrado"], amostras_limit: int, driver_pool=None,
+                        extraction_mode: Literal["js", "elements"] = "js", snapshot_dir: str = None,
+                        stop_event=None, start_page: int = 1, pacer=None, max_retries: int = 3):
+    """
+    Percorre as páginas de resultados de um tipo de imóvel e gera os anúncios validados página a página.
+
+    Cada página é entregue assim que é extraída, então quem consome pode salvar os dados
+    sem esperar o fim da coleta (memória constante e progresso preservado em caso de falha).
+    Erros do navegador são propagados; o navegador é devolvido ao pool (ou fechado) também
+    quando o consumidor interrompe a iteração.
+
+    Args:
+        tipo (Literal): O tipo de imóvel a ser buscado. 
+                        Valores aceitos: "apartamento", "casa", "quitinete", "sobrado".
+        amostras_limit (int): O número máximo de anúncios a serem coletados antes de parar o processo.
+        driver_pool (WebDriverPool): Pool de navegadores já aquecidos. Se não informado, um
+                                     navegador novo é criado e fechado nesta chamada.
+        extraction_mode (Literal): "js" extrai cada página com um único execute_script;
+                                   "elements" consulta cada campo de cada card separadamente.
+        snapshot_dir (str): Se informado, o HTML de cada página de resultados é salvo (gzip)
+                            nesse diretório para ser reprocessado offline (ver html_snapshot).
+        stop_event (threading.Event): Quando sinalizado, a coleta para antes da próxima página.
+        start_page (int): Página de resultados onde a coleta começa (retomada de um checkpoint).
+        pacer (AdaptivePacer): Controla o ritmo das páginas. Por padrão, um AdaptivePacer novo.
+        max_retries (int): Tentativas de carregar uma página (timeout, captcha ou sem anúncios) antes de desistir.
+
+    Yields:
+        tuple: (número da página, lista de dicionários validados da página)
+    """
+    # --- Inicialização do WebDriver com as configurações de stealth ---
+    pooled = driver_pool.acquire() if driver_pool is not None else None
+    driver = pooled.driver if pooled is not None else build_chrome_driver()
+    driver_broken = False
+
     # Criação de um driver de espera
     wait = WebDriverWait(driver, 10)
 
+    # Ritmo das requisições: ajustado pelo tempo de carregamento e pelos sinais de bloqueio de cada página
+    pacer = pacer if pacer is not None else AdaptivePacer()
+
     try:
-    # URLs utilizadas na raspagem
-        url_base = "https://www.zapimoveis.com.br/venda/"
-        urls_alter = {"apartamento":"apartamentos/?transacao=venda&tipos=apartamento_residencial&ordem=MOST_RELEVANT", "casa":"casas/?transacao=venda&tipos=casa_residencial&ordem=MOST_RELEVANT",
-                    "quitinete":"quitinetes/?transacao=venda&tipos=kitnet_residencial&ordem=MOST_RELEVANT","sobrado":"sobrados/?transacao=venda&tipos=sobrado_residencial&ordem=MOST_RELEVANT"
-        }
-        
-        logger.info(f"Iniciando o processo de scraping da Zap Imoveis em {tipo}.")
+        logger.info(f"Iniciando o processo de scraping da Zap Imoveis em {tipo} a partir da página {start_page}.")
         
-        
-        ad_links = [] # -> Lista auxiliar para verificação interna de volume
-        list_data_propertys_json = [] # -> Lista principal, a cada interação e devolvida para uma função
-
-        full_url = urljoin(url_base, urls_alter[tipo]) # -> URL que efetua a junção da URL main mais a URL determinada pelo tipo de imovel
-        driver.get(full_url) # -> Acessando a URL 
+        ad_links = 0 # -> Contador auxiliar para verificação interna de volume
+        number_page = start_page
+
+        if not pacer.acquire(stop_event):
+            return
+        started = perf_counter()
+        with span("webdriver_get"):
+            driver.get(build_search_url(tipo, start_page)) # -> Acessando a URL da página de resultados do tipo de imovel
         
         logger.info(f"Página acessada: {driver.title}")
-            
-        number_page = 1 
-        sleep(3)
+        attempts = 1
     
         while True:
-            ad_links_current_page = [] # -> Lista que recebe os links dos anuncios da página atual
-            ad_selector = 'li[data-cy="rp-property-cd"] a' # -> Variavel que contem o valor dos elementos de anuncios da página
-                
-            wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, ad_selector))) # -> Arguarde até os anuncios aparecem na página
+            if stop_event is not None and stop_event.is_set():
+                logger.info(f"Coleta cancelada antes da página {number_page}.")
+                break
+
+            # Espera a lista de anúncios estar pronta no DOM (em vez de pausas fixas) e informa o resultado ao pacer
+            outcome = pacer.record(f"{tipo}#{number_page}", *wait_for_results_page(driver, started))
+            if outcome not in (PAGE_OK, PAGE_SLOW):
+                if attempts >= max_retries:
+                    raise TimeoutException(f"Página {number_page} sem anúncios após {attempts} tentativas ({outcome}).")
+                # Recarregamos a mesma página pela URL quando o pacer liberar (após a pausa, em caso de captcha)
+                if not pacer.acquire(stop_event):
+                    break
+                attempts += 1
+                started = perf_counter()
+                with span("webdriver_get"):
+                    driver.get(build_search_url(tipo, number_page))
+                continue
+            attempts = 1
 
-            property_listing = driver.find_elements(By.CSS_SELECTOR, ad_selector) # -> Salvamos cada anuncio (elementos) em uma variavel que se torna uma lista
             logger.info(f"Coletando links da página: {number_page}.")
             
             # Verificação para ver se ultrapassamos o limite de amostras solicitadas ou já atingimos
-            if len(ad_links) >= amostras_limit:
+            if ad_links >= amostras_limit:
                 logger.info(f"Limite de amostras atingido ou ultrapassado (limite={amostras_limit}).")
                 break
-            
-            # Pausas longas para fingir comportamento humano quando atingimos uma quantidade de amostras
-            if len(ad_links) == 250 or len(ad_links) == 500 or len(ad_links) == 750 or len(ad_links) == 1000 or len(ad_links) == 1500 or len(ad_links) == 1750:
-                sleep(uniform(10, 15))
                 
-            # Pegamos o endpoint de cada anuncio, pois e neles que contém o ID do imovel, e salvamos em 2 listas
-            for property_link in property_listing:
-                href = property_link.get_attribute('href')
-                if href:
-                    ad_links.append(str(href))
-                    ad_links_current_page.append(str(href))
-            
-            logger.info(f"Quantidade de dados coletados até o momento: {len(list_data_propertys_json)}")
-            
-            # Enviamos os dados de elementos e endpoints dos anuncios e recebemos os retorno e repassamos para a próxima função que efetua a verificação desses dados       
-            datas_propertys = scraping_data_ad_and_endpoints(property_listing, ad_links_current_page)
-            property_json = vefiry_datas_for_send_json(datas_propertys)
+            # Extraímos os dados e os endpoints dos anuncios (no endpoint está o ID do imovel)
+            datas_propertys, ad_links_current_page = extract_page_cards(driver, extraction_mode)
+            ad_links += len(ad_links_current_page)
+
+            if snapshot_dir is not None:
+                save_page_snapshot(driver.page_source, snapshot_dir, tipo, number_page)
             
-            # Adicionamos os dados retornados a uma lista
-            list_data_propertys_json.extend(property_json)
+            # Repassamos os dados brutos para a próxima função que efetua a verificação desses dados
+            # e entregamos a página validada para quem está consumindo a coleta
+            validated_page = vefiry_datas_for_send_json(datas_propertys)
+            # Da navegação até a página validada (sem o tempo de quem consome a coleta)
+            observe_stage("scrape_page", perf_counter() - started)
+            yield number_page, validated_page
             
             # Verificação do botão next-page para irmos para a próxima página caso ainda não tenhamos suprido a necessidade de amostras
             try:
@@ -169,32 +316,51 @@ def main_scraping_ad_and_url(tipo: Literal["apartamento", "casa", "quitinete", "
                     
                 # 2. ROLAR a página até o botão (para garantir que seja clicável)
                 driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", botao_next)
-                sleep(uniform(3, 5)) # Pequena pausa para a rolagem acontecer
-
-                # 3. CLICAR no botão
-                botao_next.click()
-                number_page += 1
-                    
-                # Pausa aleatória para simular comportamento humano
-                sleep(uniform(3, 6))
 
             except TimeoutException:
-                # Se o botão não for encontrado após 15 segundos, significa que chegamos ao fim
+                # Se o botão não for encontrado após 10 segundos, significa que chegamos ao fim
                 logger.info("Botão 'Próxima página' não encontrado. Fim do scraping.")
                 break # Sai do loop while
+
+            # 3. CLICAR no botão quando o pacer liberar a próxima página
+            if not pacer.acquire(stop_event):
+                break
+            first_card = driver.find_element(By.CSS_SELECTOR, AD_SELECTOR)
+            started = perf_counter()
+            botao_next.click()
+            number_page += 1
+            if pooled is not None:
+                pooled.mark_page()
+
+            # A página seguinte só começa a ser lida depois que os cards antigos saírem do DOM
+            try:
+                wait.until(EC.staleness_of(first_card))
+            except TimeoutException:
+                logger.warning(f"Os anúncios da página {number_page - 1} continuaram no DOM após o clique.")
         
-    except Exception as e:
-        logger.error(f"Ocorreu um erro inesperado durante o scraping: {e}")
+    except WebDriverException:
+        # Erros do WebDriver indicam que o navegador pode estar travado e não deve voltar ao pool
+        driver_broken = True
+        raise
         
     finally:
-        # Por fim retornamos uma lista de dicionarios com os dados dos imoveis validados
-        logger.info("Fechando o navegador.")
-        driver.quit()
-        
-    logger.info(f"--- COLETA DE DADOS CONCLUÍDA ---")
-    return list_data_propertys_json
-        
-    
+        if pooled is not None:
+            logger.info("Devolvendo o navegador ao pool.")
+            driver_pool.release(pooled, broken=driver_broken)
+        else:
+            logger.info("Fechando o navegador.")
+            driver.quit()
+
+
+def _element_text(parent, css_selector: str, tag_name: str = None):
+    # Retorna o texto do elemento (ou do seu filho `tag_name`), ou None se ele não existir no card
+    try:
+        element = parent.find_element(By.CSS_SELECTOR, css_selector)
+        if tag_name is not None:
+            element = element.find_element(By.TAG_NAME, tag_name)
+        return element.text
+    except NoSuchElementException:
+        return None
 
 
 def scraping_data_ad_and_endpoints(ad_features:list, URLs:list):
@@ -205,6 +371,9 @@ def scraping_data_ad_and_endpoints(ad_features:list, URLs:list):
     extrai dados como preço, área, número de quartos, etc. Também utiliza a URL
     para extrair o ID único do anúncio.
 
+    Cada campo é uma chamada separada ao chromedriver; é o caminho de reserva da
+    extração em JavaScript (ver extract_page_cards).
+
     Args:
         ad_features (list): Lista de elementos web do Selenium, onde cada elemento 
                             corresponde a um card de anúncio.
@@ -216,146 +385,152 @@ def scraping_data_ad_and_endpoints(ad_features:list, URLs:list):
               brutos de um imóvel.
     """
     list_data_propertys = [] # -> Lista principal que recebe o dicionarios de dados dos imoveis
-    sleep(3)
     
     for index, data_ad in enumerate(ad_features):
-        raw_data = {} # -> Dicionario que e resetado a cada ciclo
         try:
-            # Pegando os dados de ID e Tipo de imovel dentro da URL
-            data_links = URLs[index]
-            parts_url = data_links.split('-')
-            part_url_id = data_links.split('-id-')
-            part_id = part_url_id[1]
-            id_url = part_id.split('/')
-                
-            raw_data["id"] = id_url[0]
-                
-            raw_data["property_type"] = parts_url[1]
-           
+            # container_price contêm todos os dados de preços, IPTU e condominio
             try:
-                # container_price contêm todos os dados de preços, IPTU e condominio
                 container_price = data_ad.find_element(By.CSS_SELECTOR, "[data-cy='rp-cardProperty-price-txt']")
-                price = container_price.find_element(By.TAG_NAME, 'p')
-                
-                # Pegando os dados de preço do imovel
-                price_text = price.text
-                raw_data["price"] = price_text
-                    
-                parags = container_price.find_elements(By.TAG_NAME, 'p')
-                prices = parags[1].text
-                    
-                price_parts = prices.split('•')
-                  
-                # Verificando se o imovel possui somente o dado de IPTU  
-                try:
-                    if "IPTU" in prices and "Cond." not in prices:
-                        raw_data["iptu"] = prices.strip()
-                except Exception as e:
-                        logger.error(f"Ocorreu um erro inesperado durante a coleta dos dados de IPTU sem condominio: {e}")
-                
-                # Caso passe da ultima verificação, verificamos se ele tem os dados de condominio e IPTU, pois geralmente o condominio vem antes do IPTU no texto 
-                try:
-                    if "Cond." in price_parts[0]:
-                        raw_data["price_condominium"] = price_parts[0].strip()
-                            
-                        if len(price_parts) > 1 and "IPTU" in price_parts[1]:
-                            raw_data["iptu"] = price_parts[1].strip()
-                except Exception as e:
-                    logger.error(f"Ocorreu um erro inesperado durante a coleta dos dados do imovel com IPTU e condominio: {e}")
-                        
-            except Exception as e:
-                logger.error(f"Ocorreu um erro inesperado durante a coleta dos dados de IPTU e condominio: {e}")
-            
-            # Pegando os dados de área do imovel
-            try:
-                li_area = data_ad.find_element(By.CSS_SELECTOR, "[data-cy='rp-cardProperty-propertyArea-txt']")
-                h3_area = li_area.find_element(By.TAG_NAME, "h3")
-                area_m2 = h3_area.text
-                raw_data["area_m2"] = area_m2.strip()
-            except Exception as e:
-                logger.error(f"Ocorreu um erro inesperado durante a coleta dos dados de área do imovel: {e}")
-            
-            # Pegando os dados de quantos comodos o imovel possui       
-            try:
-                li_room = data_ad.find_element(By.CSS_SELECTOR, "[data-cy='rp-cardProperty-bedroomQuantity-txt']")
-                h3_room = li_room.find_element(By.TAG_NAME, "h3")
-                room = h3_room.text
-                raw_data["rooms"] = room.strip()
-            except Exception as e:
-                raw_data["rooms"] = 0
-                logger.error(f"Ocorreu um erro inesperado durante a coleta dos dados dos comodos do imovel: {e}")
-            
-            # Pegando os dados de quantos banheiros o imovel possui            
-            try:
-                li_bathroom = data_ad.find_element(By.CSS_SELECTOR, "[data-cy='rp-cardProperty-bathroomQuantity-txt']")
-                h3_bathroom = li_bathroom.find_element(By.TAG_NAME, "h3")
-                bathroom = h3_bathroom.text
-                # Aqui e uma verificação para caso esteja escrito dessa forma "1-2" banheiros, ai pegamos o valor maior
-                if "-" in bathroom:
-                    bathroom_parts = bathroom.split("-")
-                    raw_data["bathrooms"] = bathroom_parts[1].strip()
-                else:
-                    raw_data["bathrooms"] = bathroom.strip()
-            except Exception as e:
-                raw_data["bathrooms"] = 0
-                logger.error(f"Ocorreu um erro inesperado durante a coleta dos dados de banheiros do imovel: {e}")
-            
-            # Pegando os dados de quantas vagas de estacionamento o imovel possui           
-            try:
-                li_parking = data_ad.find_element(By.CSS_SELECTOR, "[data-cy='rp-cardProperty-parkingSpacesQuantity-txt']")
-                h3_parking = li_parking.find_element(By.TAG_NAME, "h3")
-                parking = h3_parking.text
-                raw_data["vacancies"] = parking.strip()
-            except Exception as e:
-                raw_data["vacancies"] = 0
-                logger.error(f"Ocorreu um erro inesperado durante a coleta dos dados de vagas de garagem do imovel: {e}")
-            
-            #  Pegando os dados de localização (estado, bairro) do imovel    
-            try:
-                li_location = data_ad.find_element(By.CSS_SELECTOR, "[data-cy='rp-cardProperty-location-txt']")
-                location = li_location.text
-                location_parts = location.split("\n")
-                location_index = location_parts[-1]
-                locations = location_index.split(",")
-                raw_data["city"] = locations[1].strip()
-                raw_data["neighborhood"] = locations[0].strip()
-            except Exception as e:
-                logger.error(f"Ocorreu um erro inesperado durante a coleta dos dados de estado e bairro onde o imovel se localiza: {e}")
-                
-            list_data_propertys.append(raw_data)
+                price_texts = [parag.text for parag in container_price.find_elements(By.TAG_NAME, 'p')]
+            except NoSuchElementException:
+                price_texts = None
+
+            raw_data = build_raw_property(
+                href=URLs[index],
+                price_texts=price_texts,
+                area=_element_text(data_ad, "[data-cy='rp-cardProperty-propertyArea-txt']", "h3"),
+                bedroom=_element_text(data_ad, "[data-cy='rp-cardProperty-bedroomQuantity-txt']", "h3"),
+                bathroom=_element_text(data_ad, "[data-cy='rp-cardProperty-bathroomQuantity-txt']", "h3"),
+                parking=_element_text(data_ad, "[data-cy='rp-cardProperty-parkingSpacesQuantity-txt']", "h3"),
+                location=_element_text(data_ad, "[data-cy='rp-cardProperty-location-txt']"),
+            )
+
+            if raw_data is not None:
+                list_data_propertys.append(raw_data)
                     
         except Exception as e:
             logger.error(f"Ocorreu um erro inesperado durante a coleta dos dados da URL atual: {e}")
     
     # Retornamos uma lista de dicionarios
     return list_data_propertys
-   
-   
-def vefiry_datas_for_send_json(datas_propertys:list):
+
+
+# Script executado no navegador: lê todos os cards da página e devolve os textos de cada campo
+# em uma única ida e volta ao chromedriver (innerText equivale ao .text do Selenium)
+EXTRACT_CARDS_JS = """
+const text = (root, selector) => {
+    const element = root.querySelector(selector);
+    return element ? element.innerText : null;
+};
+return Array.from(document.querySelectorAll(arguments[0]), (card) => {
+    const priceBox = card.querySelector("[data-cy='rp-cardProperty-price-txt']");
+    return {
+        href: card.getAttribute("href") ? card.href : null,
+        price_texts: priceBox ? Array.from(priceBox.querySelectorAll("p"), (p) => p.innerText) : null,
+        area: text(card, "[data-cy='rp-cardProperty-propertyArea-txt'] h3"),
+        bedroom: text(card, "[data-cy='rp-cardProperty-bedroomQuantity-txt'] h3"),
+        bathroom: text(card, "[data-cy='rp-cardProperty-bathroomQuantity-txt'] h3"),
+        parking: text(card, "[data-cy='rp-cardProperty-parkingSpacesQuantity-txt'] h3"),
+        location: text(card, "[data-cy='rp-cardProperty-location-txt']"),
+    };
+});
+"""
+
+
+def scraping_data_ad_js(driver, ad_selector: str = AD_SELECTOR):
     """
-    Valida os dados brutos extraídos contra um esquema definido (Pydantic) e os 
-    prepara para a serialização em JSON.
+    Extrai todos os cards da página atual com um único `execute_script`.
 
-    Esta etapa é crucial para garantir a qualidade e a consistência dos dados antes
-    de salvá-los ou enviá-los para outro sistema.
+    Returns:
+        tuple: (lista de dicionários brutos, lista de URLs dos anúncios)
+    """
+    cards = driver.execute_script(EXTRACT_CARDS_JS, ad_selector)
+
+    list_data_propertys = []
+    ad_links = []
+    for card in cards:
+        href = card.pop("href")
+        if not href:
+            continue
+        ad_links.append(str(href))
+        raw_data = build_raw_property(href=str(href), **card)
+        if raw_data is not None:
+            list_data_propertys.append(raw_data)
 
-    Args:
-        datas_propertys (list): Uma lista de dicionários contendo os dados brutos 
-                                de cada imóvel.
+    return list_data_propertys, ad_links
+
+
+def scraping_data_ad_elements(driver, ad_selector: str = AD_SELECTOR):
+    """
+    Extrai todos os cards da página atual elemento a elemento (uma chamada ao chromedriver por campo).
 
     Returns:
-        list: Uma lista de dicionários validados e prontos para serem convertidos 
-              em JSON.
+        tuple: (lista de dicionários brutos, lista de URLs dos anúncios)
     """
-    property_validate = [] # -> Cada dado validado pelo modelo do Pydantic vai ser adicionado aqui
-    for property in datas_propertys:
-        try: 
-            valid_property = PropertySchema(**property) # -> Validando o imovel com o modelo do Pydantic
-            
-            property_validate.append(valid_property) # -> Adicinando a lista
-        except ValidationError:
-            logger.error(f"Dicionário falhou na validação Pydantic: \n{property}")
-    
-    property_list_validate = [property_for_json.model_dump() for property_for_json in property_validate]
-    # Retornamos umas lista de dicionarios
-    return property_list_validate
\ No newline at end of file
+    property_listing = driver.find_elements(By.CSS_SELECTOR, ad_selector)
+
+    # Pegamos o endpoint de cada anuncio, pois e neles que contém o ID do imovel
+    cards = []
+    ad_links = []
+    for property_link in property_listing:
+        href = property_link.get_attribute('href')
+        if href:
+            cards.append(property_link)
+            ad_links.append(str(href))
+
+    return scraping_data_ad_and_endpoints(cards, ad_links), ad_links
+
+
+def extract_page_cards(driver, extraction_mode: Literal["js", "elements"] = "js"):
+    """
+    Extrai os anúncios da página atual no modo escolhido.
+
+    O modo "js" faz uma única chamada ao navegador por página. Se o script falhar, a
+    extração cai automaticamente para o modo "elements", que consulta cada campo
+    de cada card separadamente.
+
+    Returns:
+        tuple: (lista de dicionários brutos, lista de URLs dos anúncios)
+    """
+    started = perf_counter()
+    with span("extract_cards"):
+        if extraction_mode == "js":
+            try:
+                result = scraping_data_ad_js(driver)
+                logger.debug(f"Extração em JavaScript: {len(result[1])} cards em {perf_counter() - started:.3f}s.")
+                return result
+            except WebDriverException as e:
+                logger.warning(f"Extração em JavaScript falhou, usando a extração por elementos: {e.msg}")
+
+        result = scraping_data_ad_elements(driver)
+        logger.debug(f"Extração por elementos: {len(result[1])} cards em {perf_counter() - started:.3f}s.")
+        return result
+
+
+def compare_extraction_modes(driver) -> dict:
+    """
+    Executa os dois modos de extração na página atual e compara tempo e resultado.
+
+    Útil para medir o ganho do modo JavaScript e para conferir que os dois modos
+    produzem os mesmos dados brutos.
+
+    Returns:
+        dict: Tempos de cada modo (segundos), quantidade de cards, ganho e se os resultados são idênticos.
+    """
+    started = perf_counter()
+    js_data, _ = scraping_data_ad_js(driver)
+    js_seconds = perf_counter() - started
+
+    started = perf_counter()
+    elements_data, _ = scraping_data_ad_elements(driver)
+    elements_seconds = perf_counter() - started
+
+    comparison = {
+        "cards": len(js_data),
+        "js_seconds": round(js_seconds, 4),
+        "elements_seconds": round(elements_seconds, 4),
+        "speedup": round(elements_seconds / js_seconds, 1) if js_seconds > 0 else None,
+        "identical": js_data == elements_data,
+    }
+    logger.info(f"Comparação dos modos de extração: {comparison}")
+    return comparison